@@ -9,7 +9,8 @@ this program.
 The AI decision is based on a pre-defined weight matirx, which will direct the
 AI to place at better positions (e.g., the 4 corners). In the easy difficulty
 level, the AI will use a greedy algorithm, and in the hard level, the AI will
-use a min-max algorithm.
+use a min-max algorithm. Both algorithms can also use the feature evaluation
+of "evaluation.py" instead of the weight matrix.
 
 """
 
@@ -17,6 +18,7 @@ __author__ = "Tiansong Cui"
 __email__ = "tcui@usc.edu"
 
 from control import *
+from evaluation import *
 
 # weight matrix used in this program
 WEIGHT_MATRIX = [[99, -8, 8, 6, 6, 8, -8, 99],
@@ -52,7 +54,30 @@ def Weight_Calculation(table, side):
     return weight
 
 
-def Greedy(current_table, side):
+def Get_Evaluation(name):
+    """Get an evaluation function by its name.
+
+    Args:
+        name (str): "weights" for Weight_Calculation or "features" for
+                    Feature_Evaluation.
+
+    Returns:
+        evaluation (function): The evaluation function.
+
+    Raises:
+        ValueError: The name is unknown.
+
+    """
+
+    if name == "weights":
+        return Weight_Calculation
+    if name == "features":
+        return Feature_Evaluation
+
+    raise ValueError("unknown evaluation: %s" % name)
+
+
+def Greedy(current_table, side, evaluation=None):
     """Find the best location to place a piece based on greedy algorithm.
     
     This algorithm tries to place the piece at every possible location and
@@ -63,6 +88,8 @@ def Greedy(current_table, side):
                                   of the board.
         side (int): 1 if we calculate the weight of the black side,
                     -1 if it is thethe weight of the white side.
+        evaluation (function): Evaluation of a table, Weight_Calculation if
+                               None.
     
     Returns:
         location (array): x and y axes of the calculated location.
@@ -72,6 +99,8 @@ def Greedy(current_table, side):
 
     """
     
+    if evaluation is None:
+        evaluation = Weight_Calculation
     max_weight = -65535
     location = [-1, -1]
     
@@ -83,7 +112,7 @@ def Greedy(current_table, side):
             # try to place the piece at a given location
             # calculate the weight from the result
             if Place_Piece(temp_table, [x,y], side):
-                temp_weight = Weight_Calculation(temp_table, side)
+                temp_weight = evaluation(temp_table, side)
                 # keey the best location and maximum weight
                 if temp_weight > max_weight:
                     max_weight = temp_weight
@@ -92,7 +121,7 @@ def Greedy(current_table, side):
     return (location, max_weight)
 
 
-def Min_Max(current_table, side, depth):
+def Min_Max(current_table, side, depth, evaluation=None, table=None):
     """Find the best location to place a piece based on min-max algorithm.
 
     This algorithm tries to place the piece at every possible location.
@@ -105,6 +134,10 @@ def Min_Max(current_table, side, depth):
         side (int): 1 if we calculate the weight of the black side,
                     -1 if it is thethe weight of the white side.
         depth (int): Depth of the min-max algorithm.
+        evaluation (function): Evaluation of a table, Weight_Calculation if
+                               None.
+        table (Search_Table): Results of the positions searched before, they
+                              are looked up and stored if given.
     
     Returns:
         location (array): x and y axes of the calculated location.
@@ -114,23 +147,79 @@ def Min_Max(current_table, side, depth):
 
     """
 
+    if table is not None:
+        own, opp = Table_To_Bitboard(current_table, side)
+        result = table.probe(own, opp, depth)
+        if result is not None:
+            return result
+
     # when depth is 0, it is equavilent to greedy algorithm
     if depth == 0:
-        return Greedy(current_table, side)
+        result = Greedy(current_table, side, evaluation)
+    else:
+        max_weight = -65535
+        location = [-1, -1]
+
+        for x in range(8):
+            for y in range(8):
+                temp_table = [[current_table[i][j] for j in range(8)]
+                              for i in range(8)]
+
+                if Place_Piece(temp_table, [x,y], side):
+                    # calculate the opponent's optimal decision
+                    temp_weight = -Min_Max(temp_table, -side, depth-1,
+                                           evaluation, table)[1]
+                    if temp_weight >= max_weight:
+                        max_weight = temp_weight
+                        location[:] = [x, y]
+
+        result = (location, max_weight)
+
+    if table is not None:
+        table.store(own, opp, depth, result[0], result[1])
+
+    return result
+
+
+def Score_Moves(current_table, side, depth, evaluation=None, table=None):
+    """Score every possible location with the min-max algorithm.
+
+    Different from Min_Max, which only returns the best location, this
+    function returns the weight of every location. It is used to analyze a
+    given position.
+
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if we calculate the weight of the black side,
+                    -1 if it is thethe weight of the white side.
+        depth (int): Depth of the min-max algorithm, 0 for the greedy
+                     algorithm.
+        evaluation (function): Evaluation of a table, Weight_Calculation if
+                               None.
+        table (Search_Table): Results of the positions searched before, used
+                              by Min_Max if given.
+
+    Returns:
+        scores (list): (location, weight) of every possible location.
+
+    """
+
+    if evaluation is None:
+        evaluation = Weight_Calculation
+    scores = []
 
-    max_weight = -65535
-    location = [-1, -1]
-    
     for x in range(8):
         for y in range(8):
             temp_table = [[current_table[i][j] for j in range(8)]
                           for i in range(8)]
-            
-            if Place_Piece(temp_table, [x,y], side):
-                # calculate the opponent's optimal decision
-                temp_weight = -Min_Max(temp_table, -side, depth-1)[1]
-                if temp_weight >= max_weight:
-                    max_weight = temp_weight
-                    location[:] = [x, y]
 
-    return (location, max_weight)
\ No newline at end of file
+            if Place_Piece(temp_table, [x,y], side):
+                if depth == 0:
+                    weight = evaluation(temp_table, side)
+                else:
+                    weight = -Min_Max(temp_table, -side, depth-1,
+                                      evaluation, table)[1]
+                scores.append(([x, y], weight))
+
+    return scores
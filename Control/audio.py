@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""audio.py: Reversi Game Background Music.
+
+This program plays the background music of the game on a background thread,
+so the game windows never wait for the audio. The thread, pygame and its
+mixer are only started by the first track that is played: a game without
+music never touches the audio device.
+
+Every failure degrades to silence: if pygame or the audio device is missing,
+the music is turned off for the rest of the program, and a track that cannot
+be loaded is skipped. When the tracks are requested faster than they can be
+loaded, only the last request is played.
+
+Example:
+    MUSIC.play("Music/start.mp3")
+    MUSIC.stop()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import sys
+import threading
+
+
+class Music_Player:
+    """Plays looping tracks with pygame.mixer on a background thread.
+
+    Attributes:
+        track (str): The last requested track, None to stop the music.
+        changed (bool): Whether a request has not been handled yet.
+        failed (bool): Whether the mixer could not be started, all requests
+                       are ignored afterwards.
+        condition (Condition): Protects the attributes above.
+        thread (Thread): The audio thread, None until the first track.
+        mixer (module): pygame.mixer once it is initialized, only used by
+                        the audio thread.
+
+    """
+
+    def __init__(self):
+        self.track = None
+        self.changed = False
+        self.failed = False
+        self.condition = threading.Condition()
+        self.thread = None
+        self.mixer = None
+
+
+    def play(self, path):
+        # Loop a track, replacing the current one
+        self.request(path)
+
+
+    def stop(self):
+        # Stop the music
+        self.request(None)
+
+
+    def request(self, track):
+        # Hand a request to the audio thread, starting it if needed
+        with self.condition:
+            if self.failed or (self.thread is None and track is None):
+                return
+            self.track = track
+            self.changed = True
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+
+    def run(self):
+        # Handle the requests until the mixer fails
+        while True:
+            with self.condition:
+                while not self.changed:
+                    self.condition.wait()
+                track = self.track
+                self.changed = False
+
+            if self.mixer is None:
+                try:
+                    import pygame
+                    pygame.mixer.init()
+                    self.mixer = pygame.mixer
+                except Exception as error:
+                    sys.stderr.write("music is off: %s\n" % error)
+                    with self.condition:
+                        self.failed = True
+                    return
+
+            try:
+                if track is None:
+                    self.mixer.music.stop()
+                else:
+                    self.mixer.music.load(track)
+                    self.mixer.music.play(-1)
+            except Exception as error:
+                sys.stderr.write("cannot play %s: %s\n" % (track, error))
+
+
+MUSIC = Music_Player()  # the background music of the game
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""autosave.py: Reversi Game Autosave.
+
+This program saves the condition of the game after every move, so that a
+crashed game can be restored with "Restore from Previous Game". The last
+move of a game is saved as well, so restoring a finished game shows its
+final position and result. The file has the format of Write_To_File.
+
+The model only hands a copy of the table to the Autosaver, the file is
+written by a background thread. Every snapshot is written at once to a
+temporary file that replaces the old file when it is complete, so the file
+always holds a whole position. When the moves come faster than the disk,
+only the newest snapshot is written.
+
+Example:
+    autosave = Autosaver("Model/current.log")
+    autosave.save(current_table, side)
+    autosave.close()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import os
+import sys
+import threading
+from control import *
+
+
+class Autosaver:
+    """Writes the snapshots of the game on a background thread.
+
+    Attributes:
+        path (str): The saved file.
+        pending (tuple): (table, side) of the snapshot to write next, None if
+                         there is none.
+        writing (bool): Whether a snapshot is being written.
+        closed (bool): Whether the thread should stop after the pending
+                       snapshot.
+        condition (Condition): Protects the attributes above.
+        thread (Thread): The writing thread.
+        saves (int): Number of written snapshots.
+        error (Exception): The last error of a write, None if there is none.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.writing = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.saves = 0
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def save(self, current_table, side):
+        """Save a snapshot of the game without waiting for the disk.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the current
+                                      condition of the board.
+            side (int): 1 if it is the black side to play, -1 if it is the
+                        write side to play.
+
+        """
+
+        snapshot = ([row[:] for row in current_table], side)
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify_all()
+
+
+    def run(self):
+        # Write the pending snapshots until the autosaver is closed
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                snapshot, self.pending = self.pending, None
+                self.writing = True
+
+            try:
+                self.write(*snapshot)
+            except (IOError, OSError) as error:
+                self.error = error
+                sys.stderr.write("autosave failed: %s\n" % error)
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+    def write(self, current_table, side):
+        # Write one snapshot with a single write and replace the old file
+        text = Table_Text(current_table, side)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        Replace_File(temp_path, self.path)
+        self.saves += 1
+
+
+    def flush(self):
+        # Wait until the pending snapshot is written
+        with self.condition:
+            while self.pending is not None or self.writing:
+                self.condition.wait()
+
+
+    def close(self):
+        # Write the pending snapshot and stop the thread
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+"""bitboard.py: Reversi Game Compact Board Representation.
+
+This program provides a compact representation of the reversi board that is
+used by the fast AI engines. Instead of an 8*8 list of lists, the board is
+stored as two 64-bit integers, one for the pieces of the side to play and one
+for the pieces of the other side. The square (x, y) of the current_table
+corresponds to the bit x * 8 + y.
+
+The move generator shifts all pieces of one side in the 8 directions at the
+same time, which is much faster than checking each location one by one as
+Check_Location does.
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import random
+
+FULL = 0xFFFFFFFFFFFFFFFF  # all 64 squares
+
+# masks that clear the squares wrapped around the y edge after a shift
+NOT_Y0 = 0xFEFEFEFEFEFEFEFE
+NOT_Y7 = 0x7F7F7F7F7F7F7F7F
+
+CORNERS = 0x8100000000000081  # (0,0), (0,7), (7,0) and (7,7)
+
+# 8 directions as (shift, mask) pairs, a positive shift moves to higher bits
+DIRECTIONS = [(-9, NOT_Y7), (-8, FULL), (-7, NOT_Y0), (-1, NOT_Y7),
+              (1, NOT_Y0), (7, NOT_Y7), (8, FULL), (9, NOT_Y0)]
+
+PASS = -1  # move value used when the side to play has no legal move
+
+
+def Square(x, y):
+    # Convert the x and y coordinates to the bit index
+    return x * 8 + y
+
+
+def Location(square):
+    # Convert the bit index to the x and y coordinates
+    return [square // 8, square % 8]
+
+
+def Count(bits):
+    # Count the number of occupied squares in a bitboard
+    return bin(bits).count("1")
+
+
+def Squares(bits):
+    """List the bit indexes of all squares in a bitboard.
+
+    Args:
+        bits (int): 64-bit board.
+
+    Returns:
+        squares (list): Bit indexes in increasing order.
+
+    """
+
+    squares = []
+    while bits:
+        low = bits & -bits
+        squares.append(low.bit_length() - 1)
+        bits ^= low
+
+    return squares
+
+
+def Table_To_Bitboard(current_table, side):
+    """Convert a current_table to the compact representation.
+
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the
+                    write side to play.
+
+    Returns:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+
+    """
+
+    own = 0
+    opp = 0
+    for x in range(8):
+        row = current_table[x]
+        for y in range(8):
+            if row[y] == side:
+                own |= 1 << (x * 8 + y)
+            elif row[y] == -side:
+                opp |= 1 << (x * 8 + y)
+
+    return (own, opp)
+
+
+def Bitboard_To_Table(own, opp, side):
+    """Convert the compact representation back to a current_table.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        side (int): 1 if it is the black side to play, -1 if it is the
+                    write side to play.
+
+    Returns:
+        current_table (2D array): 8*8 values indicating the condition of the
+                                  board.
+
+    """
+
+    current_table = [[0 for j in range(8)] for i in range(8)]
+    for square in Squares(own):
+        current_table[square // 8][square % 8] = side
+    for square in Squares(opp):
+        current_table[square // 8][square % 8] = -side
+
+    return current_table
+
+
+def Get_Moves(own, opp):
+    """Get all legal moves of the side to play.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+
+    Returns:
+        moves (int): Bitboard of all legal locations.
+
+    """
+
+    empty = ~(own | opp) & FULL
+    moves = 0
+
+    for shift, mask in DIRECTIONS:
+        # only the opponent pieces that can be reached in this direction
+        flank = opp & mask
+        if shift > 0:
+            x = (own << shift) & flank
+            x |= (x << shift) & flank
+            x |= (x << shift) & flank
+            x |= (x << shift) & flank
+            x |= (x << shift) & flank
+            x |= (x << shift) & flank
+            moves |= (x << shift) & mask
+        else:
+            shift = -shift
+            x = (own >> shift) & flank
+            x |= (x >> shift) & flank
+            x |= (x >> shift) & flank
+            x |= (x >> shift) & flank
+            x |= (x >> shift) & flank
+            x |= (x >> shift) & flank
+            moves |= (x >> shift) & mask
+
+    return moves & empty
+
+
+def Get_Flips(own, opp, square):
+    """Get the pieces flipped by placing a piece at the given square.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        square (int): Bit index of the new piece.
+
+    Returns:
+        flips (int): Bitboard of the flipped pieces, 0 if the move is illegal.
+
+    """
+
+    flips = 0
+    start = 1 << square
+
+    for shift, mask in DIRECTIONS:
+        line = 0
+        if shift > 0:
+            bit = (start << shift) & mask
+            while bit & opp:
+                line |= bit
+                bit = (bit << shift) & mask
+        else:
+            bit = (start >> -shift) & mask
+            while bit & opp:
+                line |= bit
+                bit = (bit >> -shift) & mask
+        if bit & own:
+            flips |= line
+
+    return flips
+
+
+def Play(own, opp, square):
+    """Play a move and return the board from the view of the other side.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        square (int): Bit index of the new piece, or PASS.
+
+    Returns:
+        own (int): Pieces of the next side to play.
+        opp (int): Pieces of the side that just played.
+
+    """
+
+    if square == PASS:
+        return (opp, own)
+
+    flips = Get_Flips(own, opp, square)
+
+    return (opp & ~flips, own | flips | (1 << square))
+
+
+def Random_Playout(own, opp, corners=True, rand=random.random):
+    """Play random moves until the end of the game.
+
+    The light policy takes a corner whenever one is available, which makes
+    the playouts much closer to real games at almost no cost.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        corners (bool): Whether to use the corner-first light policy.
+        rand (function): Random number generator in [0, 1).
+
+    Returns:
+        diff (int): Final piece difference from the view of the side to play.
+
+    """
+
+    sign = 1
+    passed = False
+
+    while True:
+        moves = Get_Moves(own, opp)
+        if moves == 0:
+            if passed:
+                break
+            passed = True
+            own, opp = opp, own
+            sign = -sign
+            continue
+        passed = False
+
+        if corners and moves & CORNERS:
+            moves &= CORNERS
+
+        # pick a random set bit without listing all of them
+        for _ in range(int(rand() * Count(moves))):
+            moves &= moves - 1
+        square = (moves & -moves).bit_length() - 1
+
+        flips = Get_Flips(own, opp, square)
+        own, opp = opp & ~flips, own | flips | (1 << square)
+        sign = -sign
+
+    return sign * (Count(own) - Count(opp))
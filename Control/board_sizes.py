@@ -0,0 +1,640 @@
+#!/usr/bin/env python
+
+"""board_sizes.py: Reversi Game Boards of Any Size.
+
+This program provides the rules, the evaluation and the searches of "AI.py"
+and "bitboard.py" for an N*N board, N even from 4 to 16 (and beyond). The
+board is stored as two packed bitboards as in "bitboard.py", but since
+python integers have no fixed width, a bitboard has N*N bits: the square
+(x, y) is the bit x * N + y. All masks and shifts of the move generator are
+computed for the size when the Board is created.
+
+The game itself and the 8*8 engines keep their own code, which is written
+for 64-bit boards: this program is for the experiments with other sizes,
+e.g. how the move generation and the search scale with the size, and the
+exact solution of the 6*6 game.
+
+Example:
+    board = Board(6)
+    own, opp = board.start()
+    score = board.solve(own, opp)
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+from AI import *
+from search_table import *
+
+SHALLOW_EMPTIES = 7  # fewer empties are solved without the table
+TABLE_EMPTIES = 8  # fewer empties are not kept in the table
+TABLE_ENTRIES = 1 << 20  # entries of a new table of solve
+SYMMETRY_PIECES = 12  # positions with fewer pieces are kept by symmetry
+BOUND_BITS = 10  # bits of each bound in the weight of a table entry
+BOUND_OFFSET = 1 << (BOUND_BITS - 1)  # added to the bounds to store them
+KEY_PRIME = (1 << 64) - 59  # reduces the bitboards of more than 64 squares
+
+
+class Board:
+    """Rules and searches of an N*N board.
+
+    Attributes:
+        size (int): Number of rows and columns.
+        squares (int): Number of squares.
+        full (int): Bitboard of all squares.
+        corners (int): Bitboard of the 4 corners.
+        directions (list): 8 (shift, mask) pairs, the mask clears the squares
+                           wrapped around the y edge after the shift.
+        steps (int): Longest line of pieces that can be flipped.
+        rays (list): For every square, the lines of single-bit bitboards
+                     from the square to the edges that can flip a piece.
+        neighbours (list): For every square, the bitboard of the first
+                           squares of its rays.
+        quarters (list): Bitboards of the 4 quarters of the board.
+        square_quarters (list): For every square, the bitboard of its
+                                quarter.
+        weight_masks (list): (weight, bitboard) of the squares of every
+                             weight of WEIGHT_MATRIX, extended to the size.
+        max_score (int): Bound beyond every piece difference of solve.
+        infinity (int): Bound beyond every weight of search.
+        nodes (int): Number of searched positions.
+
+    """
+
+    def __init__(self, size):
+        if size < 4 or size % 2:
+            raise ValueError("the board size must be even and at least 4")
+        n = size
+        self.size = n
+        self.squares = n * n
+        self.full = (1 << (n * n)) - 1
+        first_column = sum(1 << (x * n) for x in range(n))
+        not_first = self.full & ~first_column
+        not_last = self.full & ~(first_column << (n - 1))
+        self.corners = ((1 << 0) | (1 << (n - 1)) | (1 << (n * (n - 1))) |
+                        (1 << (n * n - 1)))
+        self.directions = [(-(n + 1), not_last), (-n, self.full),
+                           (-(n - 1), not_first), (-1, not_last),
+                           (1, not_first), (n - 1, not_last),
+                           (n, self.full), (n + 1, not_first)]
+        self.steps = n - 2
+
+        # the lines of at least 2 squares from every square to the edges
+        self.rays = []
+        for x in range(n):
+            for y in range(n):
+                rays = []
+                for dx, dy in ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1),
+                               (1, -1), (1, 0), (1, 1)):
+                    ray = []
+                    i, j = x + dx, y + dy
+                    while 0 <= i < n and 0 <= j < n:
+                        ray.append(1 << (i * n + j))
+                        i, j = i + dx, j + dy
+                    if len(ray) > 1:
+                        rays.append(ray)
+                self.rays.append(rays)
+        self.neighbours = [sum(ray[0] for ray in rays) for rays in self.rays]
+
+        half = n // 2
+        quarter = sum(1 << (x * n + y) for x in range(half)
+                      for y in range(half))
+        self.quarters = [quarter, quarter << half, quarter << (half * n),
+                         quarter << (half * n + half)]
+        self.square_quarters = [
+            self.quarters[(x >= half) * 2 + (y >= half)]
+            for x in range(n) for y in range(n)]
+
+        # the weight of a square depends on its distance to the edges
+        masks = {}
+        for x in range(n):
+            for y in range(n):
+                weight = WEIGHT_MATRIX[min(x, n - 1 - x, 3)][
+                    min(y, n - 1 - y, 3)]
+                masks[weight] = masks.get(weight, 0) | (1 << (x * n + y))
+        self.weight_masks = [(weight, masks[weight])
+                             for weight in sorted(masks) if weight != 0]
+        # the game ends are weighted by 1000 per piece of difference
+        self.max_score = self.squares + 1
+        self.infinity = 1000 * self.squares + 1
+        self.nodes = 0
+
+
+    def square(self, x, y):
+        # Convert the x and y coordinates to the bit index
+        return x * self.size + y
+
+
+    def location(self, square):
+        # Convert the bit index to the x and y coordinates
+        return [square // self.size, square % self.size]
+
+
+    def start(self):
+        """Get the start position, the black side plays first.
+
+        Returns:
+            own (int): Pieces of the black side.
+            opp (int): Pieces of the write side.
+
+        """
+
+        c = self.size // 2
+
+        return ((1 << self.square(c - 1, c)) | (1 << self.square(c, c - 1)),
+                (1 << self.square(c - 1, c - 1)) | (1 << self.square(c, c)))
+
+
+    def get_moves(self, own, opp):
+        """Get all legal moves of the side to play.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+
+        Returns:
+            moves (int): Bitboard of all legal locations.
+
+        """
+
+        empty = ~(own | opp) & self.full
+        moves = 0
+
+        for shift, mask in self.directions:
+            # only the opponent pieces that can be reached in this direction
+            flank = opp & mask
+            if shift > 0:
+                x = (own << shift) & flank
+                for _ in range(self.steps - 1):
+                    x |= (x << shift) & flank
+                moves |= (x << shift) & mask
+            else:
+                shift = -shift
+                x = (own >> shift) & flank
+                for _ in range(self.steps - 1):
+                    x |= (x >> shift) & flank
+                moves |= (x >> shift) & mask
+
+        return moves & empty
+
+
+    def get_flips(self, own, opp, square):
+        """Get the pieces flipped by placing a piece at the given square.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            square (int): Bit index of the new piece.
+
+        Returns:
+            flips (int): Bitboard of the flipped pieces, 0 if the move is
+                         illegal.
+
+        """
+
+        flips = 0
+        for ray in self.rays[square]:
+            line = 0
+            for bit in ray:
+                if not bit & opp:
+                    if bit & own:
+                        flips |= line
+                    break
+                line |= bit
+
+        return flips
+
+
+    def play(self, own, opp, square):
+        """Play a move and return the board from the view of the other side.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            square (int): Bit index of the new piece, or PASS.
+
+        Returns:
+            own (int): Pieces of the next side to play.
+            opp (int): Pieces of the side that just played.
+
+        """
+
+        if square == PASS:
+            return (opp, own)
+
+        flips = self.get_flips(own, opp, square)
+
+        return (opp & ~flips, own | flips | (1 << square))
+
+
+    def evaluate(self, own, opp):
+        # Weight of the position for the side to play, as Weight_Calculation
+        weight = 0
+        for value, mask in self.weight_masks:
+            weight += value * (Count(own & mask) - Count(opp & mask))
+
+        return weight
+
+
+    def ordered_squares(self, own, opp, moves):
+        # The squares of the moves, the fewest replies first with the corners
+        # counted twice, the quarters with an odd number of empty squares
+        # first on a tie
+        squares = Squares(moves)
+        if len(squares) > 1:
+            odd = self.odd_regions(own | opp)
+            squares.sort(key=lambda square: (
+                self.mobility(*self.play(own, opp, square)),
+                not (odd >> square & 1)))
+
+        return squares
+
+
+    def mobility(self, own, opp):
+        # Number of moves of the side to play, the corners counted twice
+        moves = self.get_moves(own, opp)
+
+        return Count(moves) + Count(moves & self.corners)
+
+
+    def search(self, own, opp, depth, alpha=None, beta=None):
+        """Search a position with alpha-beta pruning.
+
+        The positions are weighted with the weight matrix like Min_Max,
+        and the ends of the game by their piece difference. The moves that
+        cannot change the result are skipped.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            depth (int): Number of moves to look ahead.
+            alpha (int): The side to play already has a weight of alpha,
+                         -infinity if None.
+            beta (int): The other side already has a weight of -beta,
+                        infinity if None.
+
+        Returns:
+            square (int): Bit index of the best move, PASS if there is none.
+            weight (int): Weight of the best move for the side to play, or a
+                          bound if it is outside the window.
+
+        """
+
+        if alpha is None:
+            alpha = -self.infinity
+        if beta is None:
+            beta = self.infinity
+        self.nodes += 1
+        moves = self.get_moves(own, opp)
+        if depth == 0 or moves == 0:
+            if moves == 0 and self.get_moves(opp, own) == 0:
+                # the game is over, the piece difference decides
+                return (PASS, 1000 * (Count(own) - Count(opp)))
+            if depth == 0:
+                return (PASS, self.evaluate(own, opp))
+            return (PASS, -self.search(opp, own, depth - 1, -beta,
+                                       -alpha)[1])
+
+        # the first move is the best one until a better one is found
+        best = (PASS, -self.infinity)
+        for square in (self.ordered_squares(own, opp, moves) if depth > 2
+                       else Squares(moves)):
+            weight = -self.search(*(self.play(own, opp, square) +
+                                    (depth - 1, -beta,
+                                     -max(alpha, best[1]))))[1]
+            if best[0] == PASS or weight > best[1]:
+                best = (square, weight)
+                if weight >= beta:
+                    break
+
+        return best
+
+
+    def odd_regions(self, occupied):
+        # The quarters of the board with an odd number of empty squares
+        empty = self.full & ~occupied
+        odd = 0
+        for quarter in self.quarters:
+            if Count(empty & quarter) & 1:
+                odd |= quarter
+
+        return odd
+
+
+    def table_key(self, bits):
+        # A bitboard reduced to the 64 bits hashed by Search_Table
+        if self.squares <= 64:
+            return bits
+
+        return bits % KEY_PRIME
+
+
+    def table_probe(self, table, own, opp):
+        """Look up the bounds of a position in a table.
+
+        Args:
+            table (Search_Table): The table.
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+
+        Returns:
+            lower (int): Lower bound of the score.
+            upper (int): Upper bound of the score.
+            square (int): Bit index of the best move, PASS if unknown. None
+                          is returned if the position is not in the table.
+
+        """
+
+        result = table.probe(self.table_key(own), self.table_key(opp), 0)
+        if result is None:
+            return None
+        location, weight = result
+
+        return ((weight >> BOUND_BITS) - BOUND_OFFSET,
+                (weight & ((1 << BOUND_BITS) - 1)) - BOUND_OFFSET,
+                PASS if location[0] < 0 else Square(*location))
+
+
+    def table_store(self, table, own, opp, lower, upper, square):
+        # Keep the bounds as the weight and the best move as the location of
+        # a Search_Table entry, which only has room for the squares of 8*8
+        location = [-1, -1]
+        if PASS < square < NO_MOVE:
+            location = Location(square)
+        table.store(self.table_key(own), self.table_key(opp), 0, location,
+                    ((lower + BOUND_OFFSET) << BOUND_BITS) |
+                    (upper + BOUND_OFFSET))
+
+
+    def solve_last(self, own, opp, empty):
+        # Solve a position with at most one empty square without recursion
+        self.nodes += 1
+        score = Count(own) - Count(opp)
+        if empty:
+            square = empty.bit_length() - 1
+            flips = self.get_flips(own, opp, square)
+            if flips:
+                return score + 2 * Count(flips) + 1
+            flips = self.get_flips(opp, own, square)
+            if flips:
+                return score - 2 * Count(flips) - 1
+
+        return score
+
+
+    def solve_shallow(self, own, opp, alpha, beta, odd=None, passed=False):
+        # Solve as solve without the table, trying the empty squares next to
+        # an opponent piece instead of generating the moves, those in the
+        # quarters with an odd number of empty squares first
+        empty = self.full & ~(own | opp)
+        if empty & (empty - 1) == 0:
+            return self.solve_last(own, opp, empty)
+        self.nodes += 1
+        if odd is None:
+            odd = self.odd_regions(own | opp)
+        best = -self.max_score
+        moved = False
+        for square in Squares(empty & odd) + Squares(empty & ~odd):
+            if not opp & self.neighbours[square]:
+                continue
+            flips = self.get_flips(own, opp, square)
+            if flips == 0:
+                continue
+            score = -self.solve_shallow(opp & ~flips,
+                                        own | flips | (1 << square),
+                                        -beta, -max(alpha, best),
+                                        odd ^ self.square_quarters[square])
+            if not moved or score > best:
+                best = score
+                moved = True
+                if best >= beta:
+                    break
+
+        if moved:
+            return best
+        # the game is over if the other side cannot move either
+        if passed or empty == 0:
+            return Count(own) - Count(opp)
+
+        return -self.solve_shallow(opp, own, -beta, -alpha, odd, True)
+
+
+    def solve(self, own, opp, alpha=None, beta=None, table=None):
+        """Search a position to the end of the game.
+
+        The results of the positions with at least TABLE_EMPTIES empty
+        squares are kept in a Search_Table as lower and upper bounds with the
+        best move, so the positions reached by several move orders are
+        searched once, and a position searched again with another window
+        tries the best move of the last search first. The table has a fixed
+        size and a new result replaces the old one of its entry. A move to a
+        position whose bounds in the table already cut off is not searched,
+        the other moves are searched with the fewest replies first. The
+        positions with fewer than SHALLOW_EMPTIES empty squares are solved
+        by solve_shallow, and the openings with fewer than SYMMETRY_PIECES
+        pieces are kept once for all their rotations and reflections.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            alpha (int): The side to play already has a result of alpha,
+                         -max_score if None.
+            beta (int): The other side already has a result of -beta,
+                        max_score if None.
+            table (Search_Table): Bounds of the searched positions, a new
+                                  table of TABLE_ENTRIES if None.
+
+        Returns:
+            score (int): Final piece count of the side to play minus the one
+                         of the other side if it is between alpha and beta,
+                         else a bound on the same side of the window.
+
+        """
+
+        if alpha is None:
+            alpha = -self.max_score
+        if beta is None:
+            beta = self.max_score
+        empties = self.squares - Count(own | opp)
+        if empties < SHALLOW_EMPTIES:
+            return self.solve_shallow(own, opp, alpha, beta)
+        if table is None:
+            table = Search_Table(TABLE_ENTRIES)
+
+        self.nodes += 1
+        moves = self.get_moves(own, opp)
+        if moves == 0:
+            if self.get_moves(opp, own) == 0:
+                return Count(own) - Count(opp)
+            return -self.solve(opp, own, -beta, -alpha, table)
+
+        # the rotations and reflections of an opening have the same result
+        if Count(own | opp) < SYMMETRY_PIECES:
+            return self.solve_symmetric(own, opp, alpha, beta, table)
+
+        lower, upper, first = -self.max_score, self.max_score, PASS
+        stored = empties >= TABLE_EMPTIES
+        entry = self.table_probe(table, own, opp) if stored else None
+        if entry is not None:
+            lower, upper, first = entry
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha, beta = max(alpha, lower), min(beta, upper)
+            # a move of another position that has the same hash
+            if first != PASS and not moves >> first & 1:
+                first = PASS
+
+        # a move to a position of the table that already has a result bad
+        # enough for the other side needs no search
+        best = -self.max_score
+        best_square = PASS
+        if empties > TABLE_EMPTIES:
+            for square in Squares(moves):
+                entry = self.table_probe(table, *self.play(own, opp, square))
+                if entry is not None and -entry[1] >= beta:
+                    best = -entry[1]
+                    best_square = square
+                    break
+
+        # the best move of the last search first, the others only if needed
+        if best_square != PASS:
+            squares = []
+        elif first == PASS:
+            squares = self.ordered_squares(own, opp, moves)
+        else:
+            squares = [first]
+        while squares:
+            square = squares.pop(0)
+            flips = self.get_flips(own, opp, square)
+            score = -self.solve(opp & ~flips, own | flips | (1 << square),
+                                -beta, -max(alpha, best), table)
+            if best_square == PASS or score > best:
+                best = score
+                best_square = square
+                if best >= beta:
+                    break
+            if square == first:
+                squares = self.ordered_squares(own, opp,
+                                               moves & ~(1 << first))
+
+        if stored:
+            if best >= beta:
+                self.table_store(table, own, opp, best, upper, best_square)
+            elif best <= alpha:
+                self.table_store(table, own, opp, lower, best, best_square)
+            else:
+                self.table_store(table, own, opp, best, best, best_square)
+
+        return best
+
+
+    def symmetric(self, bits):
+        # The bitboards of the 8 rotations and reflections of a bitboard
+        n = self.size
+        results = []
+        for transform in (lambda x, y: (x, y), lambda x, y: (y, x),
+                          lambda x, y: (n - 1 - x, y),
+                          lambda x, y: (x, n - 1 - y),
+                          lambda x, y: (n - 1 - x, n - 1 - y),
+                          lambda x, y: (y, n - 1 - x),
+                          lambda x, y: (n - 1 - y, x),
+                          lambda x, y: (n - 1 - y, n - 1 - x)):
+            result = 0
+            for square in Squares(bits):
+                result |= 1 << self.square(*transform(*self.location(square)))
+            results.append(result)
+
+        return results
+
+
+    def solve_symmetric(self, own, opp, alpha, beta, table):
+        # Solve as solve, keeping the bounds of all symmetric positions
+        own_key, opp_key = min(zip(self.symmetric(own), self.symmetric(opp)))
+        lower, upper = -self.max_score, self.max_score
+        entry = self.table_probe(table, own_key, opp_key)
+        if entry is not None:
+            lower, upper = entry[:2]
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha, beta = max(alpha, lower), min(beta, upper)
+
+        best = -self.max_score
+        searched = set()
+        for square in self.ordered_squares(own, opp, self.get_moves(own,
+                                                                    opp)):
+            child = self.play(own, opp, square)
+            if child in searched:
+                continue
+            first = not searched
+            searched.update(zip(self.symmetric(child[0]),
+                                self.symmetric(child[1])))
+            score = -self.solve(child[0], child[1], -beta,
+                                -max(alpha, best), table)
+            if first or score > best:
+                best = score
+                if best >= beta:
+                    break
+
+        if best >= beta:
+            self.table_store(table, own_key, opp_key, best, upper, PASS)
+        elif best <= alpha:
+            self.table_store(table, own_key, opp_key, lower, best, PASS)
+        else:
+            self.table_store(table, own_key, opp_key, best, best, PASS)
+
+        return best
+
+
+    def solve_move(self, own, opp, table=None):
+        """Find the best move of a position by solving it exactly.
+
+        The score is found by MTD(f): a series of searches with a window of
+        one point, which cut off much more than a search with the full
+        window and reuse the bounds of each other in the table. Then the
+        moves are tested one by one against the score, the moves that lead
+        to a rotation or reflection of a tested position are skipped.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            table (Search_Table): Bounds of the searched positions, a new
+                                  table of TABLE_ENTRIES if None.
+
+        Returns:
+            square (int): Bit index of the best move, PASS if there is none.
+            score (int): Final piece count of the side to play minus the one
+                         of the other side.
+
+        """
+
+        if table is None:
+            table = Search_Table(TABLE_ENTRIES)
+        lower, upper = -self.max_score, self.max_score
+        score = 0
+        while lower < upper:
+            beta = score + 1 if score == lower else score
+            score = self.solve(own, opp, beta - 1, beta, table)
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+
+        moves = self.get_moves(own, opp)
+        tested = set()
+        for square in self.ordered_squares(own, opp, moves):
+            child = self.play(own, opp, square)
+            if child in tested:
+                continue
+            tested.update(zip(self.symmetric(child[0]),
+                              self.symmetric(child[1])))
+            # the move reaches the score if the reply cannot keep it lower
+            if -self.solve(child[0], child[1], -score, -score + 1,
+                           table) >= score:
+                return (square, score)
+
+        return (PASS, score)
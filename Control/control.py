@@ -12,6 +12,8 @@ the game model.
 __author__ = "Tiansong Cui"
 __email__ = "tcui@usc.edu"
 
+import os
+
 def Check_Location(current_table, side, x_ref, y_ref):
     """Check whether it is legal to place a piece at a given location.
         
@@ -252,37 +254,114 @@ def Write_To_File(current_table, side, file, end=False):
         
     """
     
+    # the whole text is written at once
+    file.write(Table_Text(current_table, side, end))
+    
+    return
+
+def Table_Text(current_table, side, end=False):
+    """Get the text that Write_To_File writes for a table.
+    
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the
+                    write side to play.
+        end (bool): Whether it is the end-of-game condition.
+    
+    Returns:
+        text (str): The side to play, the 8 rows of the board and, if end is
+                    True, the game results.
+        
+    """
+    
     # first line indicates which player to play next
     # will be used when the player chooses to restore the game
     if side == 1:
-        file.write("B\n")
+        lines = ["B"]
     else:
-        file.write("W\n")
+        lines = ["W"]
     
-    # write the current or final board condition
+    # the current or final board condition
+    symbols = {0: "*", 1: "B", -1: "W"}
     black_count = 0
     write_count = 0
     for i in range(8):
-        for j in range(8):
-            if current_table[j][i] == 0:
-                file.write("*")
-            elif current_table[j][i] == 1:
-                file.write("B")
-                black_count += 1
-            else:
-                file.write("W")
-                write_count += 1
-        file.write("\n")
+        lines.append("".join(symbols[current_table[j][i]] for j in range(8)))
+        black_count += lines[-1].count("B")
+        write_count += lines[-1].count("W")
     
-    # write the game results
+    # the game results
     if end == True:
-        file.write("black score: %d\n" % black_count)
-        file.write("write score: %d\n" % write_count)
+        lines.append("black score: %d" % black_count)
+        lines.append("write score: %d" % write_count)
         if black_count > write_count:
-            file.write("black wins\n")
+            lines.append("black wins")
         elif black_count < write_count:
-            file.write("write wins\n")
+            lines.append("write wins")
         else:
-            file.write("draw game\n")
+            lines.append("draw game")
     
-    return
\ No newline at end of file
+    return "\n".join(lines) + "\n"
+
+def Replace_File(temp_path, path):
+    """Replace a file by a completely written temporary file.
+
+    The temporary file is renamed over the old one in one step (except on
+    python 2 outside POSIX systems), so a crash leaves either the old or the
+    new file, never a partly written one.
+
+    Args:
+        temp_path (str): The written temporary file, in the same directory.
+        path (str): The file to replace.
+
+    """
+
+    if hasattr(os, "replace"):
+        os.replace(temp_path, path)
+    else:
+        # python 2 can only replace a file by renaming on POSIX systems
+        if os.name != "posix" and os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+def Location_Name(location):
+    """Get the name of a location, such as "d3".
+
+    The letter is the x coordinate (column) and the number is the y
+    coordinate (row) as they are written in the log files.
+
+    Args:
+        location (array): x and y coordinates of the location.
+
+    Returns:
+        name (str): Name of the location, "pass" if x is negative.
+
+    """
+
+    if location[0] < 0:
+        return "pass"
+
+    return "abcdefgh"[location[0]] + str(location[1] + 1)
+
+
+def Parse_Location(name):
+    """Get the location from its name, the reverse of Location_Name.
+
+    Args:
+        name (str): Name of the location, such as "d3" or "pass".
+
+    Returns:
+        location (array): x and y coordinates, [-1, -1] for "pass", None if
+                          the name is not valid.
+
+    """
+
+    name = name.strip().lower()
+    if name == "pass":
+        return [-1, -1]
+    if (len(name) != 2 or name[0] not in "abcdefgh" or
+            name[1] not in "12345678"):
+        return None
+
+    return ["abcdefgh".index(name[0]), int(name[1]) - 1]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+
+"""endgame.py: Reversi Game Exact Endgame Solver.
+
+This program solves positions with few empty squares exactly: Solve searches
+every move to the end of the game with alpha-beta pruning and returns the
+final piece count of the side to play minus the one of the other side.
+
+The same endgame positions come back in thousands of self-play and analysis
+games, so the exact results are kept in an Endgame_Database, a sqlite file
+that can be shared by several processes. The positions are stored by their
+canonical form, the smallest of the 8 rotations and reflections of the
+board, since all of them have the same result. Solve looks a position up
+before searching it and inserts its result after solving it. Only exact
+results are inserted: a result outside the alpha-beta window is a bound.
+
+Example:
+    database = Endgame_Database("endgame.db")
+    location, score = Solve_Endgame(current_table, side, database)
+    database.close()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import struct
+from bitboard import *
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+KEY = struct.Struct("<QQ")
+DB_MIN_EMPTIES = 6  # positions with fewer empties are solved, not stored
+DB_BATCH = 1000  # inserts kept in memory before they are committed
+
+
+def Flip_Vertical(bits):
+    # Reflect a bitboard on the horizontal axis, x becomes 7 - x
+    bits = (((bits >> 8) & 0x00FF00FF00FF00FF) |
+            ((bits & 0x00FF00FF00FF00FF) << 8))
+    bits = (((bits >> 16) & 0x0000FFFF0000FFFF) |
+            ((bits & 0x0000FFFF0000FFFF) << 16))
+
+    return (bits >> 32) | ((bits & 0xFFFFFFFF) << 32)
+
+
+def Mirror(bits):
+    # Reflect a bitboard on the vertical axis, y becomes 7 - y
+    for shift, mask in ((1, 0x5555555555555555), (2, 0x3333333333333333),
+                        (4, 0x0F0F0F0F0F0F0F0F)):
+        bits = ((bits >> shift) & mask) | ((bits & mask) << shift)
+
+    return bits
+
+
+def Transpose(bits):
+    # Reflect a bitboard on the diagonal, (x, y) becomes (y, x)
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+
+    return bits ^ t ^ (t >> 7)
+
+
+def Canonical(own, opp):
+    """Get the canonical form of a position.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+
+    Returns:
+        own (int): Pieces of the side to play in the smallest of the 8
+                   symmetric positions.
+        opp (int): Pieces of the other side in that position.
+
+    """
+
+    best = (own, opp)
+    for _ in range(2):
+        for _ in range(2):
+            for _ in range(2):
+                if (own, opp) < best:
+                    best = (own, opp)
+                own, opp = Mirror(own), Mirror(opp)
+            own, opp = Flip_Vertical(own), Flip_Vertical(opp)
+        own, opp = Transpose(own), Transpose(opp)
+
+    return best
+
+
+class Endgame_Database:
+    """Exact endgame results in a sqlite file.
+
+    Attributes:
+        path (str): The database file.
+        min_empties (int): Positions with fewer empty squares are not stored.
+        connection (Connection): The sqlite connection.
+        pending (dict): Inserted results that are not committed yet, by key.
+        hits (int): Number of lookups that found a result.
+        misses (int): Number of lookups that did not.
+        inserts (int): Number of inserted results.
+
+    """
+
+    def __init__(self, path, min_empties=DB_MIN_EMPTIES):
+        if sqlite3 is None:
+            raise ImportError("the endgame database needs sqlite3")
+        self.path = path
+        self.min_empties = min_empties
+        self.connection = sqlite3.connect(path, timeout=60)
+        # readers do not wait for the writers of other processes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results "
+                                "(key BLOB PRIMARY KEY, empties INTEGER, "
+                                "score INTEGER) WITHOUT ROWID")
+        self.connection.commit()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+
+
+    def lookup(self, own, opp):
+        """Look up the result of a position.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+
+        Returns:
+            score (int): The exact result, None if it is not stored.
+
+        """
+
+        key = KEY.pack(*Canonical(own, opp))
+        item = self.pending.get(key)
+        if item is not None:
+            self.hits += 1
+            return item[1]
+        row = self.connection.execute("SELECT score FROM results WHERE key=?",
+                                      (sqlite3.Binary(key),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0]
+
+
+    def insert(self, own, opp, score):
+        # Store the exact result of a position, committed in batches
+        empties = 64 - Count(own | opp)
+        self.pending[KEY.pack(*Canonical(own, opp))] = (empties, score)
+        self.inserts += 1
+        if len(self.pending) >= DB_BATCH:
+            self.commit()
+
+
+    def commit(self):
+        # Write the pending results in one transaction
+        if not self.pending:
+            return
+        self.connection.executemany("INSERT OR REPLACE INTO results "
+                                    "VALUES (?, ?, ?)",
+                                    [(sqlite3.Binary(key), empties, score)
+                                     for key, (empties, score)
+                                     in self.pending.items()])
+        self.connection.commit()
+        self.pending.clear()
+
+
+    def count(self):
+        """Count the stored results by the number of empty squares.
+
+        Returns:
+            counts (dict): Number of committed results for every number of
+                           empty squares.
+
+        """
+
+        self.commit()
+        rows = self.connection.execute("SELECT empties, COUNT(*) FROM "
+                                       "results GROUP BY empties")
+
+        return dict(rows.fetchall())
+
+
+    def compact(self, min_empties=0):
+        """Remove the cheap results and shrink the file.
+
+        Args:
+            min_empties (int): Results of positions with fewer empty squares
+                               are removed, since they are solved quickly.
+
+        Returns:
+            removed (int): Number of removed results.
+
+        """
+
+        self.commit()
+        removed = self.connection.execute("DELETE FROM results WHERE "
+                                          "empties < ?",
+                                          (min_empties,)).rowcount
+        self.connection.commit()
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.execute("VACUUM")
+
+        return removed
+
+
+    def close(self):
+        # Commit the pending results and close the file
+        if self.connection is None:
+            return
+        self.commit()
+        self.connection.close()
+        self.connection = None
+
+
+def Ordered_Squares(moves):
+    # The squares of the moves, the corners first
+    squares = []
+    for bits in (moves & CORNERS, moves & ~CORNERS):
+        while bits:
+            bit = bits & -bits
+            squares.append(bit.bit_length() - 1)
+            bits ^= bit
+
+    return squares
+
+
+def Solve(own, opp, alpha=-65, beta=65, database=None):
+    """Search a position to the end of the game.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        alpha (int): The side to play already has a result of alpha, -65
+                     (below every result) if it has none.
+        beta (int): The other side already has a result of -beta, 65 if it
+                    has none.
+        database (Endgame_Database): Exact results of the positions solved
+                                     before, looked up and inserted if given.
+
+    Returns:
+        score (int): Final piece count of the side to play minus the one of
+                     the other side if it is between alpha and beta, else a
+                     bound on the same side of the window.
+
+    """
+
+    moves = Get_Moves(own, opp)
+    if moves == 0:
+        if Get_Moves(opp, own) == 0:
+            return Count(own) - Count(opp)
+        return -Solve(opp, own, -beta, -alpha, database)
+
+    stored = database is not None and \
+        64 - Count(own | opp) >= database.min_empties
+    if stored:
+        score = database.lookup(own, opp)
+        if score is not None:
+            return score
+
+    best = -65
+    for square in Ordered_Squares(moves):
+        flips = Get_Flips(own, opp, square)
+        score = -Solve(opp & ~flips, own | flips | (1 << square),
+                       -beta, -max(alpha, best), database)
+        if score > best:
+            best = score
+            if best >= beta:
+                break
+
+    if stored and alpha < best < beta:
+        database.insert(own, opp, best)
+
+    return best
+
+
+def Solve_Endgame(current_table, side, database=None):
+    """Find the best location of a position by solving it exactly.
+
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the write
+                    side to play.
+        database (Endgame_Database): Exact results of the positions solved
+                                     before, looked up and inserted if given.
+
+    Returns:
+        location (array): x and y axes of the best location, [-1, -1] if
+                          there is none.
+        score (int): Final piece count of the side minus the one of the
+                     other side.
+
+    """
+
+    own, opp = Table_To_Bitboard(current_table, side)
+    moves = Get_Moves(own, opp)
+    if moves == 0:
+        return ([-1, -1], Solve(own, opp, -65, 65, database))
+
+    # with a stored result, only the move that reaches it is searched for
+    alpha, beta = -65, 65
+    known = None
+    if database is not None and \
+            64 - Count(own | opp) >= database.min_empties:
+        known = database.lookup(own, opp)
+        if known is not None:
+            alpha, beta = known - 1, known + 1
+
+    location = [-1, -1]
+    for square in Ordered_Squares(moves):
+        flips = Get_Flips(own, opp, square)
+        score = -Solve(opp & ~flips, own | flips | (1 << square),
+                       -beta, -alpha, database)
+        if score > alpha:
+            alpha = score
+            location = Location(square)
+            if score == known:
+                break
+
+    if known is None and database is not None and \
+            64 - Count(own | opp) >= database.min_empties:
+        database.insert(own, opp, alpha)
+
+    return (location, alpha)
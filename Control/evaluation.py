@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+
+"""evaluation.py: Reversi Game Feature Evaluation.
+
+This program provides the board features that matter in reversi, computed on
+the compact representation of "bitboard.py", and an evaluation function that
+combines them with weights that change during the game:
+
+    mobility              number of possible locations
+    potential mobility    empty squares next to the pieces of the other side,
+                          i.e. the locations that may become possible later
+    frontier              pieces next to an empty square, which give the
+                          other side new possible locations
+    stable                pieces that can never be flipped
+    corners, pieces       number of corners and of all pieces
+
+The stable pieces on the 4 edges are looked up in a table of all 3^8 edge
+conditions, which is built once by trying every sequence of moves on the
+edge. The stability then spreads to the inner pieces: a piece is stable if,
+in each of the 4 line directions, its line is full or one of its neighbors
+on the line is a stable piece of the same side or the border.
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+from bitboard import *
+
+# the pieces (x, 0) to (x, 7) of a row and (0, y) to (7, y) of a column
+ROW = 0xFF
+COLUMN = 0x0101010101010101
+
+# multiplying a column by COLUMN_MAGIC gathers its 8 bits in the top byte
+COLUMN_MAGIC = 0x0102040810204080
+
+# borders of the 4 line directions: the squares that have no neighbor on
+# one side of the line
+BORDER_Y = COLUMN | (COLUMN << 7)
+BORDER_X = ROW | (ROW << 56)
+BORDER = BORDER_X | BORDER_Y
+
+# the 4 line directions as (shift, mask) pairs of both neighbors, the
+# squares at the border and all lines in this direction
+LINES = [((-1, NOT_Y7), (1, NOT_Y0), BORDER_Y,
+          [ROW << (8 * x) for x in range(8)]),
+         ((-8, FULL), (8, FULL), BORDER_X,
+          [COLUMN << y for y in range(8)]),
+         ((-9, NOT_Y7), (9, NOT_Y0), BORDER,
+          [sum(1 << Square(x, x - k) for x in range(8) if 0 <= x - k < 8)
+           for k in range(-7, 8)]),
+         ((-7, NOT_Y0), (7, NOT_Y7), BORDER,
+          [sum(1 << Square(x, k - x) for x in range(8) if 0 <= k - x < 8)
+           for k in range(15)])]
+
+# weights of the features (opening, endgame), interpolated by the number of
+# empty squares
+FEATURES = ["mobility", "potential", "frontier", "stable", "corners",
+            "pieces"]
+WEIGHTS = {"mobility": (10, 4), "potential": (4, 0), "frontier": (-5, -1),
+           "stable": (12, 20), "corners": (30, 20), "pieces": (-1, 10)}
+
+# the interpolated weights of every number of empty squares, times 60
+PHASE_WEIGHTS = [[WEIGHTS[name][0] * min(empties, 60) +
+                  WEIGHTS[name][1] * (60 - min(empties, 60))
+                  for name in FEATURES] for empties in range(65)]
+
+
+def Shift(bits, shift, mask):
+    # Move all pieces one square in a direction
+    if shift > 0:
+        return (bits << shift) & mask & FULL
+
+    return (bits >> -shift) & mask
+
+
+def Neighbors(bits):
+    # All squares next to the given pieces
+    neighbors = 0
+    for shift, mask in DIRECTIONS:
+        neighbors |= Shift(bits, shift, mask)
+
+    return neighbors
+
+
+def Get_Frontier(own, opp):
+    # Pieces of the side to play that are next to an empty square
+    empty = ~(own | opp) & FULL
+
+    return own & Neighbors(empty)
+
+
+def Potential_Mobility(own, opp):
+    # Number of empty squares next to the pieces of the other side
+    empty = ~(own | opp) & FULL
+
+    return Count(Neighbors(opp) & empty)
+
+
+def Line_Moves(own, opp):
+    """List the conditions after every move on a line of 8 squares.
+
+    Every empty square may be taken by either side, since a move that flips
+    nothing on the line may still be possible in another direction.
+
+    Args:
+        own (int): 8 bits of the pieces of one side.
+        opp (int): 8 bits of the pieces of the other side.
+
+    Returns:
+        lines (list): (own, opp) after every move.
+
+    """
+
+    lines = []
+    for square in range(8):
+        bit = 1 << square
+        if (own | opp) & bit:
+            continue
+        for first in (True, False):
+            player, other = (own, opp) if first else (opp, own)
+            flips = 0
+            for step in (-1, 1):
+                line = 0
+                x = square + step
+                while 0 <= x < 8 and other & (1 << x):
+                    line |= 1 << x
+                    x += step
+                if 0 <= x < 8 and player & (1 << x):
+                    flips |= line
+            player, other = player | bit | flips, other & ~flips
+            if first:
+                lines.append((player, other))
+            else:
+                lines.append((other, player))
+
+    return lines
+
+
+def Edge_Stable(own, opp, memo):
+    """Find the pieces of a line that keep their side after any moves.
+
+    Args:
+        own (int): 8 bits of the pieces of one side.
+        opp (int): 8 bits of the pieces of the other side.
+        memo (dict): Results of the conditions already solved.
+
+    Returns:
+        stable (int): 8 bits of the stable pieces of both sides.
+
+    """
+
+    key = own | (opp << 8)
+    if key in memo:
+        return memo[key]
+
+    stable = own | opp
+    if stable != 0xFF:
+        for next_own, next_opp in Line_Moves(own, opp):
+            stable &= (((next_own & own) | (next_opp & opp)) &
+                       Edge_Stable(next_own, next_opp, memo))
+            if not stable:
+                break
+    memo[key] = stable
+
+    return stable
+
+
+EDGE_STABLE = []  # stable pieces of every edge condition, built on first use
+COLUMN_BITS = [sum(COLUMN & (0xFF << (8 * x)) for x in range(8)
+                   if pattern >> x & 1) for pattern in range(256)]
+
+
+def Build_Edge_Table():
+    # Solve all 3^8 edge conditions, indexed by own | opp << 8
+    memo = {}
+    table = [0] * 65536
+    for own in range(256):
+        for opp in range(256):
+            if not own & opp:
+                table[own | (opp << 8)] = Edge_Stable(own, opp, memo)
+    EDGE_STABLE[:] = table
+
+
+def Full_Lines(occupied):
+    # The squares of the full lines of each of the 4 line directions
+    full = []
+    for first, second, border, lines in LINES:
+        bits = 0
+        for line in lines:
+            if occupied & line == line:
+                bits |= line
+        full.append(bits)
+
+    return full
+
+
+def Get_Stable(own, opp, full=None):
+    """Find the stable pieces of the side to play.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        full (list): Full_Lines of the board, calculated if None.
+
+    Returns:
+        stable (int): Bitboard of the pieces that can never be flipped.
+
+    """
+
+    if not EDGE_STABLE:
+        Build_Edge_Table()
+    table = EDGE_STABLE
+
+    # stable pieces on the 4 edges
+    stable = table[(own & ROW) | ((opp & ROW) << 8)]
+    stable |= table[(own >> 56) | ((opp >> 56) << 8)] << 56
+    stable |= COLUMN_BITS[table[
+        (((own & COLUMN) * COLUMN_MAGIC) >> 56 & 0xFF) |
+        ((((opp & COLUMN) * COLUMN_MAGIC) >> 56 & 0xFF) << 8)]]
+    stable |= COLUMN_BITS[table[
+        ((((own >> 7) & COLUMN) * COLUMN_MAGIC) >> 56 & 0xFF) |
+        (((((opp >> 7) & COLUMN) * COLUMN_MAGIC) >> 56 & 0xFF) << 8)]] << 7
+    stable &= own
+
+    if full is None:
+        full = Full_Lines(own | opp)
+
+    # spread the stability to the inner pieces
+    while True:
+        candidates = own & ~stable
+        for (first, second, border, lines), bits in zip(LINES, full):
+            candidates &= (bits | border | Shift(stable, *first) |
+                           Shift(stable, *second))
+            if not candidates:
+                break
+        if not candidates:
+            return stable
+        stable |= candidates
+
+
+def Evaluate(own, opp):
+    """Evaluate a condition with the features and the phase weights.
+
+    Args:
+        own (int): Pieces of the side to evaluate.
+        opp (int): Pieces of the other side.
+
+    Returns:
+        weight (int): Weight of the condition for the own side.
+
+    """
+
+    occupied = own | opp
+    empty = ~occupied & FULL
+    near_empty = Neighbors(empty)
+    full = Full_Lines(occupied)
+    weights = PHASE_WEIGHTS[64 - Count(occupied)]
+
+    # the features in the order of FEATURES
+    weight = (weights[0] * (Count(Get_Moves(own, opp)) -
+                            Count(Get_Moves(opp, own))) +
+              weights[1] * (Count(Neighbors(opp) & empty) -
+                            Count(Neighbors(own) & empty)) +
+              weights[2] * (Count(own & near_empty) -
+                            Count(opp & near_empty)) +
+              weights[3] * (Count(Get_Stable(own, opp, full)) -
+                            Count(Get_Stable(opp, own, full))) +
+              weights[4] * (Count(own & CORNERS) - Count(opp & CORNERS)) +
+              weights[5] * (Count(own) - Count(opp)))
+
+    return weight // 60
+
+
+def Feature_Evaluation(table, side):
+    """Calculate the feature weight of a given table for one player side.
+
+    It can replace Weight_Calculation in Greedy and Min_Max.
+
+    Args:
+        table (2D array): 8*8 values indicating the current condition
+                          of the board.
+        side (int): 1 if we calculate the weight of the black side,
+                    -1 if it is the weight of the white side.
+
+    Returns:
+        weight (int): Calculated weight of the given table.
+
+    """
+
+    own, opp = Table_To_Bitboard(table, side)
+
+    return Evaluate(own, opp)
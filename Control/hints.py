@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+"""hints.py: Reversi Game Move Hints.
+
+This program scores every possible location of a position on a background
+thread, for the hint overlay of the game view. The scores are refined by
+iterative deepening: all locations are scored with depth 1, then depth 2 and
+so on, and every finished depth replaces the previous scores, so the view can
+show a first result at once and better ones later.
+
+The results are kept per Position: moving the cursor reuses them, and after
+an undo the scores of the earlier position come back at once. When the
+position changes, or it is set to None while the AI is searching, the search
+of the old one stops at its next evaluated table, and its scores are never
+shown for the new position. The Min_Max results are kept in a Search_Table,
+so the positions searched for one hint are not searched again for the next
+move.
+
+Example:
+    hints = Hint_Search(3)
+    hints.set_position(Table_To_Position(current_table, side))
+    ...
+    result = hints.result(position)  # (depth, scores) or None
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import threading
+from AI import *
+from position import *
+from search_table import *
+from time_manager import *
+
+HINT_CACHE = 256  # positions whose scores are kept
+HINT_TABLE_ENTRIES = 1 << 16  # Min_Max results kept between the positions
+
+
+class Hint_Search:
+    """Scores the locations of the current position on a background thread.
+
+    Attributes:
+        max_depth (int): Deepest search of every position.
+        position (Position): The position to score, None to stay idle.
+        results (dict): (depth, scores) of the scored positions, scores are
+                        (location, weight) of every possible location, the
+                        best first.
+        closed (bool): Whether the thread should stop.
+        condition (Condition): Protects the attributes above.
+        table (Search_Table): Min_Max results, only used by the thread.
+        thread (Thread): The search thread, None until the first position.
+
+    """
+
+    def __init__(self, max_depth=3):
+        self.max_depth = max_depth
+        self.position = None
+        self.results = {}
+        self.closed = False
+        self.condition = threading.Condition()
+        self.table = Search_Table(HINT_TABLE_ENTRIES)
+        self.thread = None
+
+
+    def set_position(self, position):
+        """Select the position to score.
+
+        Args:
+            position (Position): The new position, None to stop searching.
+
+        """
+
+        with self.condition:
+            if position == self.position:
+                return
+            self.position = position
+            if position is not None and self.thread is None:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+
+    def result(self, position):
+        # The deepest finished (depth, scores) of a position, None if none
+        with self.condition:
+            return self.results.get(position)
+
+
+    def next_depth(self):
+        # The position and the depth to search next, called with the lock
+        if self.position is None:
+            return (None, 0)
+        done = self.results.get(self.position, (0, None))[0]
+        if done >= self.max_depth:
+            return (None, 0)
+
+        return (self.position, done + 1)
+
+
+    def run(self):
+        # Search the selected positions one depth after the other
+        while True:
+            with self.condition:
+                position, depth = self.next_depth()
+                while position is None and not self.closed:
+                    self.condition.wait()
+                    position, depth = self.next_depth()
+                if self.closed:
+                    return
+
+            scores = self.score(position, depth)
+            if scores is None:
+                continue
+
+            with self.condition:
+                if len(self.results) >= HINT_CACHE:
+                    self.results.clear()
+                self.results[position] = (depth, scores)
+
+
+    def score(self, position, depth):
+        """Score all possible locations of a position.
+
+        Args:
+            position (Position): The position.
+            depth (int): Depth of the search, as in Score_Moves.
+
+        Returns:
+            scores (list): (location, weight) of every possible location, the
+                           best first, None if the position changed before
+                           all locations were scored.
+
+        """
+
+        current_table = position.table()
+        side = position.side()
+        scores = []
+
+        def checked_evaluation(table, side):
+            # stop as soon as the view shows another position
+            if self.position != position or self.closed:
+                raise Search_Timeout()
+            return Weight_Calculation(table, side)
+
+        for square in Squares(position.moves()):
+            location = [square // 8, square % 8]
+            temp_table = [row[:] for row in current_table]
+            Place_Piece(temp_table, location, side)
+            try:
+                weight = -Min_Max(temp_table, -side, depth - 1,
+                                  checked_evaluation, self.table)[1]
+            except Search_Timeout:
+                return None
+            scores.append((location, weight))
+        scores.sort(key=lambda item: -item[1])
+
+        return scores
+
+
+    def close(self):
+        # Stop the thread at its next evaluated table
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+
+"""instrument.py: Reversi Game AI Search Instrumentation.
+
+This program measures what the AI engines do during a search: the number of
+searched nodes, the depth reached, the branching factor, the time per move
+and the time spent in every phase of the search (move generation, evaluation
+and search cache). It can also run the searches under cProfile and write one
+JSON line per move to a log file.
+
+The AI code itself is not changed. Enable() replaces the search functions by
+counting and timing wrappers in every loaded module that uses them, and
+Disable() puts the original functions back. When the instrumentation is
+disabled, the searches therefore run at exactly the original speed.
+
+Example:
+    PROBE.log = open("moves.jsonl", "w")
+    Enable()
+    PROBE.begin_move()
+    location = Min_Max(current_table, side, 3)[0]
+    PROBE.end_move("minmax:depth=3", side, location)
+    Disable()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import cProfile
+import json
+import pstats
+import sys
+import time
+import AI
+import bitboard
+import control
+import evaluation
+import mcts
+import search_table
+
+# instrumented functions and methods with their phase: "search" functions
+# are counted as nodes of the search tree, "minmax" is a search function that
+# hands its depth 0 positions to Greedy, "node" methods are counted as nodes
+# without a depth, the others are timed as their phase
+PHASES = [(AI, "Min_Max", "minmax"), (AI, "Greedy", "search"),
+          (AI, "Score_Moves", "search"),
+          (AI, "Weight_Calculation", "eval"),
+          (evaluation, "Feature_Evaluation", "eval"),
+          (control, "Place_Piece", "movegen"),
+          (control, "Check_Location", "movegen"),
+          (control, "Get_Available_Table", "movegen"),
+          (bitboard, "Get_Moves", "movegen"),
+          (bitboard, "Random_Playout", "playout"),
+          (mcts.MCTS, "expand", "node"),
+          (mcts.MCTS, "find_root", "cache"),
+          (search_table.Search_Table, "probe", "cache"),
+          (search_table.Search_Table, "store", "cache")]
+
+# calls inside the rule and feature modules belong to the phase of their
+# caller
+RULE_MODULES = [control, bitboard, evaluation]
+
+
+class Probe:
+    """Counters and timers of the AI searches.
+
+    Attributes:
+        enabled (bool): Whether the wrappers are installed.
+        counters (dict): Counters of the current move: "nodes" (search
+                         function calls), "edges" (legal moves tried by the
+                         searches), "leaves" (evaluations) and "playouts".
+        timers (dict): Seconds spent in every phase during the current move.
+        level (int): Current nesting level of the search functions.
+        depth (int): Deepest level reached during the current move, i.e. the
+                     number of plies searched (1 for Greedy).
+        log (file): Stream of the JSON lines, None to keep no log.
+        profiler (cProfile.Profile): Profiler of the moves, None if unused.
+        summary (dict): Totals of every engine over all moves.
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.log = None
+        self.profiler = None
+        self.summary = {}
+        self.originals = {}
+        self.reset()
+
+
+    def reset(self):
+        # Clear the counters of the current move
+        self.counters = {"nodes": 0, "edges": 0, "leaves": 0, "playouts": 0}
+        self.timers = {"movegen": 0.0, "eval": 0.0, "cache": 0.0,
+                       "playout": 0.0}
+        self.level = 0
+        self.depth = 0
+        self.start = time.time()
+
+
+    def add_time(self, phase, seconds):
+        # Add the duration of a phase, e.g. a search cache lookup
+        self.timers[phase] = self.timers.get(phase, 0.0) + seconds
+
+
+    def begin_move(self):
+        # Start measuring a move
+        self.reset()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+
+    def end_move(self, engine, side, location, extra=None):
+        """Finish measuring a move, log it and add it to the summary.
+
+        Args:
+            engine (str): Name or player specification of the engine.
+            side (int): Side that played the move.
+            location (array): x and y axes of the chosen location.
+            extra (dict): More fields of the log line, e.g. MCTS statistics.
+
+        Returns:
+            entry (dict): The measurements of the move.
+
+        """
+
+        elapsed = time.time() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        counters = self.counters
+        inner = counters["nodes"] + counters["playouts"]
+        entry = {"engine": engine, "side": side,
+                 "move": control.Location_Name(location),
+                 "time_ms": round(1000.0 * elapsed, 3),
+                 "nodes": counters["nodes"], "edges": counters["edges"],
+                 "leaves": counters["leaves"],
+                 "playouts": counters["playouts"], "depth": self.depth,
+                 "branching": round(counters["edges"] /
+                                    float(max(counters["nodes"], 1)), 3),
+                 "nps": round((inner + counters["leaves"]) /
+                              max(elapsed, 1e-9), 1)}
+        for phase, seconds in self.timers.items():
+            entry[phase + "_ms"] = round(1000.0 * seconds, 3)
+        if extra:
+            entry.update(extra)
+
+        if self.log is not None:
+            self.log.write(json.dumps(entry, sort_keys=True) + "\n")
+        Add_To_Summary(self.summary, entry)
+
+        return entry
+
+
+PROBE = Probe()
+
+
+def Wrap(function, phase):
+    """Create the counting and timing wrapper of a function.
+
+    Args:
+        function (function): The original function.
+        phase (str): "search" to count nodes and depth, otherwise the name of
+                     the timed phase.
+
+    Returns:
+        wrapper (function): The wrapper.
+
+    """
+
+    probe = PROBE
+
+    if phase in ("search", "minmax"):
+        def wrapper(*args, **kwargs):
+            # the Greedy call counts the node of a depth 0 Min_Max call
+            if phase == "minmax" and kwargs.get(
+                    "depth", args[2] if len(args) > 2 else None) == 0:
+                return function(*args, **kwargs)
+            probe.counters["nodes"] += 1
+            probe.level += 1
+            if probe.level > probe.depth:
+                probe.depth = probe.level
+            try:
+                return function(*args, **kwargs)
+            finally:
+                probe.level -= 1
+    elif phase == "node":
+        def wrapper(*args, **kwargs):
+            probe.counters["nodes"] += 1
+            return function(*args, **kwargs)
+    elif phase == "eval":
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            result = function(*args, **kwargs)
+            probe.timers["eval"] += time.time() - start
+            probe.counters["leaves"] += 1
+            return result
+    elif phase == "playout":
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            result = function(*args, **kwargs)
+            probe.timers["playout"] += time.time() - start
+            probe.counters["playouts"] += 1
+            return result
+    elif function.__name__ == "Place_Piece":
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            result = function(*args, **kwargs)
+            probe.timers["movegen"] += time.time() - start
+            if result:
+                probe.counters["edges"] += 1
+            return result
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            result = function(*args, **kwargs)
+            probe.timers[phase] += time.time() - start
+            return result
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    wrapper.original = function
+
+    return wrapper
+
+
+def Replace(old, new):
+    # Replace a function in all loaded modules that imported it
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not namespace or module in RULE_MODULES:
+            continue
+        for name, value in list(namespace.items()):
+            if value is old:
+                namespace[name] = new
+
+
+def Enable(profile=False):
+    """Install the wrappers of all instrumented functions.
+
+    Args:
+        profile (bool): Whether to also run every move under cProfile.
+
+    """
+
+    if PROBE.enabled:
+        return
+
+    for owner, name, phase in PHASES:
+        original = owner.__dict__[name]
+        wrapper = Wrap(original, phase)
+        PROBE.originals[(owner, name)] = (original, wrapper)
+        if isinstance(owner, type(sys)):
+            Replace(original, wrapper)
+        else:
+            setattr(owner, name, wrapper)
+
+    if profile:
+        PROBE.profiler = cProfile.Profile()
+    PROBE.enabled = True
+
+
+def Disable():
+    # Put the original functions back
+    if not PROBE.enabled:
+        return
+
+    for (owner, name), (original, wrapper) in PROBE.originals.items():
+        if isinstance(owner, type(sys)):
+            Replace(wrapper, original)
+        else:
+            setattr(owner, name, original)
+    PROBE.originals = {}
+    PROBE.enabled = False
+
+
+def MCTS_Stats(engine):
+    """Measure the tree of an MCTS engine after a search.
+
+    Args:
+        engine (MCTS): The engine.
+
+    Returns:
+        stats (dict): "depth" (deepest node below the root) and "tree_nodes"
+                      (nodes in use), to be added to the log line.
+
+    """
+
+    depth = 0
+    level = [engine.root]
+    while level:
+        children = []
+        for node in level:
+            c = engine.child[node]
+            while c != mcts.NO_CHILD:
+                children.append(c)
+                c = engine.sibling[c]
+        if children:
+            depth += 1
+        level = children
+
+    return {"depth": depth,
+            "tree_nodes": engine.capacity - len(engine.free)}
+
+
+def Dump_Profile(path, lines=20):
+    """Save the profile of the moves and print the most expensive functions.
+
+    Args:
+        path (str): File of the pstats data, e.g. for snakeviz.
+        lines (int): Number of functions to print.
+
+    """
+
+    PROBE.profiler.dump_stats(path)
+    stats = pstats.Stats(path)
+    stats.sort_stats("cumulative").print_stats(lines)
+
+
+def Add_To_Summary(summary, entry):
+    # Add the measurements of one move to the totals of its engine
+    totals = summary.setdefault(entry["engine"], {"moves": 0})
+    totals["moves"] += 1
+    for key, value in entry.items():
+        if (isinstance(value, (int, float)) and
+                key not in ("side", "branching", "nps")):
+            if key == "depth":
+                totals["max_depth"] = max(totals.get("max_depth", 0), value)
+            totals[key] = totals.get(key, 0) + value
+
+
+def Read_Summary(stream):
+    """Aggregate a JSON lines log of moves.
+
+    Args:
+        stream (file): The log written by Probe.end_move.
+
+    Returns:
+        summary (dict): Totals of every engine.
+
+    """
+
+    summary = {}
+    for line in stream:
+        line = line.strip()
+        if line:
+            Add_To_Summary(summary, json.loads(line))
+
+    return summary
+
+
+def Print_Summary(summary):
+    # Print the averages of every engine in a summary
+    for engine in sorted(summary):
+        totals = summary[engine]
+        moves = float(totals["moves"])
+        seconds = max(totals.get("time_ms", 0) / 1000.0, 1e-9)
+        work = (totals.get("nodes", 0) + totals.get("leaves", 0) +
+                totals.get("playouts", 0))
+        print("%s: %d moves, %.1f ms per move, %.0f nodes per second"
+              % (engine, totals["moves"], totals.get("time_ms", 0) / moves,
+                 work / seconds))
+        branching = "-"
+        if totals.get("edges"):
+            branching = "%.2f" % (totals["edges"] /
+                                  float(max(totals.get("nodes", 0), 1)))
+        print("    average depth %.2f (max %d), branching %s, "
+              "%.0f nodes + %.0f leaves + %.0f playouts per move"
+              % (totals.get("depth", 0) / moves, totals.get("max_depth", 0),
+                 branching, totals.get("nodes", 0) / moves,
+                 totals.get("leaves", 0) / moves,
+                 totals.get("playouts", 0) / moves))
+        phases = ["%s %.1f ms" % (key[:-3], totals[key] / moves)
+                  for key in sorted(totals) if key.endswith("_ms") and
+                  key != "time_ms"]
+        print("    per move: " + ", ".join(phases))
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+
+"""mcts.py: Reversi Game Monte Carlo Tree Search.
+
+This program provides a Monte Carlo Tree Search (MCTS) AI engine. Different
+from the Greedy and Min_Max algorithms in "AI.py", it does not use the weight
+matrix. It repeatedly selects a path in the search tree with the UCT formula,
+plays random games (playouts) from the end of the path and keeps the winning
+rate of each node.
+
+The playouts run on the compact board representation of "bitboard.py". The
+tree nodes are stored in a fixed-size node pool (parallel lists indexed by the
+node number). When the game goes on, the part of the tree below the new
+position is kept, so the work of the previous move is reused. The rest of the
+tree is only returned to the pool when the pool runs low, which also keeps
+the statistics of the earlier positions when the player takes moves back.
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import math
+import random
+import time
+from bitboard import *
+
+NO_CHILD = -1  # end of the sibling list
+PASS_BIT = 1 << 64  # untried moves of a node that can only pass
+
+
+class MCTS:
+    """Monte Carlo Tree Search engine with a reusable node pool.
+
+    Every node stores the board from the view of its side to play. The wins
+    of a node are counted for the side that played the move leading to it, so
+    that a parent simply picks the child with the best winning rate.
+
+    Attributes:
+        capacity (int): Maximum number of nodes in the pool.
+        nodes (int): Playout budget of one search, 0 for no limit.
+        ms (int): Time budget of one search in milliseconds, 0 for no limit.
+        batch (int): Number of playouts run from every new leaf.
+        exploration (float): Exploration constant of the UCT formula.
+        corners (bool): Whether the playouts use the corner-first policy.
+        root (int): Node of the last searched position, NO_CHILD if none.
+        playouts (int): Number of playouts of the last search.
+        elapsed (float): Duration of the last search in seconds.
+        progress (function): Called as progress(engine, playouts, elapsed)
+                             every progress_ms during a search, None to
+                             disable the progress reports.
+        progress_ms (int): Interval of the progress reports in milliseconds.
+
+    """
+
+    def __init__(self, nodes=0, ms=1000, batch=1, exploration=1.0,
+                 corners=True, capacity=200000, seed=None):
+        """Initialize the engine and allocate the node pool.
+
+        Args:
+            nodes (int): Playout budget of one search, 0 for no limit.
+            ms (int): Time budget of one search in milliseconds, 0 for no
+                      limit. At least one budget should be given.
+            batch (int): Number of playouts run from every new leaf.
+            exploration (float): Exploration constant of the UCT formula.
+            corners (bool): Whether the playouts use the corner-first policy.
+            capacity (int): Maximum number of nodes in the pool.
+            seed (int): Seed of the random generator, None for a random seed.
+
+        """
+
+        if nodes <= 0 and ms <= 0:
+            raise ValueError("MCTS needs a node or a time budget")
+
+        self.nodes = nodes
+        self.ms = ms
+        self.batch = max(1, batch)
+        self.exploration = exploration
+        self.corners = corners
+        self.capacity = capacity
+        self.random = random.Random(seed)
+
+        # node pool, one entry of every list per node
+        self.own = [0] * capacity
+        self.opp = [0] * capacity
+        self.move = [PASS] * capacity
+        self.parent = [NO_CHILD] * capacity
+        self.child = [NO_CHILD] * capacity  # first child
+        self.sibling = [NO_CHILD] * capacity  # next child of the parent
+        self.untried = [0] * capacity  # legal moves not expanded yet
+        self.visits = [0] * capacity
+        self.wins = [0.0] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+
+        self.root = NO_CHILD
+        self.playouts = 0
+        self.elapsed = 0.0
+        self.progress = None
+        self.progress_ms = 500
+
+
+    def new_node(self, own, opp, move, parent):
+        # Take a node from the pool and initialize it, NO_CHILD if it is full
+        if not self.free:
+            return NO_CHILD
+
+        node = self.free.pop()
+        self.own[node] = own
+        self.opp[node] = opp
+        self.move[node] = move
+        self.parent[node] = parent
+        self.child[node] = NO_CHILD
+        self.sibling[node] = NO_CHILD
+        self.visits[node] = 0
+        self.wins[node] = 0.0
+
+        moves = Get_Moves(own, opp)
+        if moves == 0 and Get_Moves(opp, own) != 0:
+            # the only move is to pass
+            self.untried[node] = PASS_BIT
+        else:
+            self.untried[node] = moves
+
+        if parent != NO_CHILD:
+            self.sibling[node] = self.child[parent]
+            self.child[parent] = node
+
+        return node
+
+
+    def reset(self):
+        # Return all nodes to the pool
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.root = NO_CHILD
+
+
+    def find_root(self, own, opp):
+        """Find the node of the given position near the last root.
+
+        The given position is usually 1 or 2 moves after the last searched
+        position (the opponent's move or a pass in between), or one of its
+        ancestors after an undo. When a later position is found and less than
+        a quarter of the pool is free, only its subtree is kept and all other
+        nodes are freed.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+
+        Returns:
+            node (int): Node of the given position.
+
+        """
+
+        found = NO_CHILD
+        if self.root != NO_CHILD:
+            # the same position or an earlier one after an undo
+            node = self.root
+            while node != NO_CHILD:
+                if self.own[node] == own and self.opp[node] == opp:
+                    return node
+                node = self.parent[node]
+
+            frontier = [self.root]
+            for _ in range(3):
+                next_frontier = []
+                for node in frontier:
+                    c = self.child[node]
+                    while c != NO_CHILD:
+                        if self.own[c] == own and self.opp[c] == opp:
+                            found = c
+                            break
+                        next_frontier.append(c)
+                        c = self.sibling[c]
+                    if found != NO_CHILD:
+                        break
+                if found != NO_CHILD:
+                    break
+                frontier = next_frontier
+
+        if found == NO_CHILD:
+            self.reset()
+            return self.new_node(own, opp, PASS, NO_CHILD)
+        if len(self.free) >= self.capacity // 4:
+            return found
+
+        # keep the subtree of the new root and rebuild the free list
+        keep = [False] * self.capacity
+        stack = [found]
+        while stack:
+            node = stack.pop()
+            keep[node] = True
+            c = self.child[node]
+            while c != NO_CHILD:
+                stack.append(c)
+                c = self.sibling[c]
+
+        self.free = [i for i in range(self.capacity - 1, -1, -1)
+                     if not keep[i]]
+        self.parent[found] = NO_CHILD
+        self.sibling[found] = NO_CHILD
+
+        return found
+
+
+    def select(self, node):
+        # Select the child with the best UCT value
+        log_visits = math.log(self.visits[node])
+        best = NO_CHILD
+        best_value = -1.0
+
+        c = self.child[node]
+        while c != NO_CHILD:
+            n = self.visits[c]
+            value = (self.wins[c] / n +
+                     self.exploration * math.sqrt(log_visits / n))
+            if value > best_value:
+                best_value = value
+                best = c
+            c = self.sibling[c]
+
+        return best
+
+
+    def expand(self, node):
+        # Expand one untried move of the node
+        untried = self.untried[node]
+        own = self.own[node]
+        opp = self.opp[node]
+
+        if untried == PASS_BIT:
+            move = PASS
+            self.untried[node] = 0
+        else:
+            for _ in range(self.random.randrange(Count(untried))):
+                untried &= untried - 1
+            bit = untried & -untried
+            self.untried[node] ^= bit
+            move = bit.bit_length() - 1
+
+        own, opp = Play(own, opp, move)
+
+        return self.new_node(own, opp, move, node)
+
+
+    def iterate(self):
+        """Run one selection, expansion, playout and backup step.
+
+        Returns:
+            count (int): Number of playouts that were run.
+
+        """
+
+        # selection
+        node = self.root
+        while self.untried[node] == 0 and self.child[node] != NO_CHILD:
+            node = self.select(node)
+
+        # expansion, the tree stops growing when the pool is full
+        if self.untried[node] != 0 and self.free:
+            node = self.expand(node)
+
+        # batched playouts from the leaf
+        own = self.own[node]
+        opp = self.opp[node]
+        rand = self.random.random
+        count = self.batch
+        result = 0.0
+        for _ in range(count):
+            diff = Random_Playout(own, opp, self.corners, rand)
+            if diff > 0:
+                result += 1.0
+            elif diff == 0:
+                result += 0.5
+
+        # backup, the result is from the view of the side to play at the leaf
+        result = count - result
+        while True:
+            self.visits[node] += count
+            self.wins[node] += result
+            if node == self.root:
+                break
+            result = count - result
+            node = self.parent[node]
+
+        return count
+
+
+    def search(self, own, opp):
+        """Search the given position within the budget.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+
+        Returns:
+            move (int): Bit index of the best move, PASS if there is no
+                        legal move.
+            value (float): Winning rate of the best move.
+
+        """
+
+        start = time.time()
+        self.root = self.find_root(own, opp)
+
+        if Get_Moves(own, opp) == 0:
+            self.playouts = 0
+            self.elapsed = time.time() - start
+            return (PASS, 0.0)
+
+        deadline = start + self.ms / 1000.0
+        report = start + self.progress_ms / 1000.0
+        playouts = 0
+        while True:
+            playouts += self.iterate()
+            if self.nodes > 0 and playouts >= self.nodes:
+                break
+            now = time.time()
+            if self.ms > 0 and now >= deadline:
+                break
+            if self.progress is not None and now >= report:
+                self.progress(self, playouts, now - start)
+                report = now + self.progress_ms / 1000.0
+
+        self.playouts = playouts
+        self.elapsed = time.time() - start
+
+        return self.best_move()
+
+
+    def best_move(self):
+        """Get the most visited move of the last searched position.
+
+        Returns:
+            move (int): Bit index of the best move, PASS if there is none.
+            value (float): Winning rate of the best move.
+
+        """
+
+        best = NO_CHILD
+        if self.root != NO_CHILD:
+            c = self.child[self.root]
+            while c != NO_CHILD:
+                if best == NO_CHILD or self.visits[c] > self.visits[best]:
+                    best = c
+                c = self.sibling[c]
+
+        if best == NO_CHILD or self.visits[best] == 0:
+            return (PASS, 0.0)
+
+        return (self.move[best], self.wins[best] / self.visits[best])
+
+
+    def search_table(self, current_table, side):
+        """Search a position given as a current_table.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the current
+                                      condition of the board.
+            side (int): 1 if it is the black side to play, -1 if it is the
+                        write side to play.
+
+        Returns:
+            location (array): x and y axes of the calculated location.
+            value (float): Winning rate of the location.
+
+        """
+
+        own, opp = Table_To_Bitboard(current_table, side)
+        move, value = self.search(own, opp)
+        if move == PASS:
+            return ([-1, -1], value)
+
+        return (Location(move), value)
+
+
+    def root_moves(self):
+        """List the statistics of every move of the last searched position.
+
+        Returns:
+            moves (list): (move, visits, winning rate) of every expanded move
+                          of the root, the most visited move first.
+
+        """
+
+        moves = []
+        if self.root == NO_CHILD:
+            return moves
+
+        c = self.child[self.root]
+        while c != NO_CHILD:
+            if self.visits[c] > 0:
+                moves.append((self.move[c], self.visits[c],
+                              self.wins[c] / self.visits[c]))
+            c = self.sibling[c]
+        moves.sort(key=lambda item: -item[1])
+
+        return moves
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+"""position.py: Reversi Game Compact Positions.
+
+This program provides Position, a compact and hashable form of the condition
+of the game. A current_table is a list of 8 lists and takes about 1 KB, it
+can not be used as a dictionary key and copying it copies all 9 lists. A
+Position keeps the pieces of both sides, the side to play and its hash in one
+integer:
+
+    bits 0-63      pieces of the black side (bit x * 8 + y is (x, y))
+    bits 64-127    pieces of the write side
+    bit 128        set if the write side plays
+    bits 129-158   hash of the bits above
+
+which takes about 90 bytes, so stores of many positions (caches, keyframes,
+opening books) need less than a tenth of the memory of the tables. Positions
+are immutable: playing a move returns a new Position.
+
+Example:
+    position = Table_To_Position(current_table, side)
+    cache[position] = score
+    current_table = position.table()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+from control import *
+from bitboard import *
+
+WRITE_TO_PLAY = 1 << 128  # bit of the positions where the write side plays
+HASH_MASK = 0x3FFFFFFF
+
+
+class Position(object):
+    """An immutable condition of the game.
+
+    It is a new-style class, since only those can have __slots__.
+
+    Attributes:
+        key (int): The packed pieces, side to play and hash.
+
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, black, write, side):
+        """Pack a condition.
+
+        Args:
+            black (int): Bitboard of the black pieces.
+            write (int): Bitboard of the write pieces.
+            side (int): 1 if it is the black side to play, -1 if it is the
+                        write side to play.
+
+        """
+
+        state = black | (write << 64)
+        if side == -1:
+            state |= WRITE_TO_PLAY
+        self.key = state | ((hash(state) & HASH_MASK) << 129)
+
+
+    def __hash__(self):
+        return self.key >> 129
+
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.key == other.key
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def __repr__(self):
+        return "Position(0x%x, 0x%x, %d)" % self.state()
+
+
+    def state(self):
+        # The black pieces, the write pieces and the side to play
+        return (self.key & FULL, (self.key >> 64) & FULL,
+                -1 if self.key & WRITE_TO_PLAY else 1)
+
+
+    def side(self):
+        # 1 if it is the black side to play, -1 if it is the write side
+        return -1 if self.key & WRITE_TO_PLAY else 1
+
+
+    def bitboards(self):
+        # The pieces of the side to play and of the other side
+        black, write = self.key & FULL, (self.key >> 64) & FULL
+        if self.key & WRITE_TO_PLAY:
+            return (write, black)
+
+        return (black, write)
+
+
+    def table(self):
+        # Unpack to a new current_table
+        return Bitboard_To_Table(self.key & FULL, (self.key >> 64) & FULL, 1)
+
+
+    def count(self):
+        # Number of pieces on the board
+        return Count((self.key | (self.key >> 64)) & FULL)
+
+
+    def moves(self):
+        # Bitboard of the possible locations of the side to play
+        return Get_Moves(*self.bitboards())
+
+
+    def play(self, location):
+        """Play a move of the side to play.
+
+        Args:
+            location (array): x and y axes of the location, [-1, -1] for a
+                              pass.
+
+        Returns:
+            position (Position): The position after the move, None if the
+                                 move is not possible.
+
+        """
+
+        own, opp = self.bitboards()
+        side = self.side()
+        moves = Get_Moves(own, opp)
+        if location[0] < 0:
+            if moves:
+                return None
+            square = PASS
+        else:
+            square = Square(location[0], location[1])
+            if not moves >> square & 1:
+                return None
+
+        # the pieces of the next side to play come first
+        own, opp = Play(own, opp, square)
+        if side == 1:
+            return Position(opp, own, -side)
+
+        return Position(own, opp, -side)
+
+
+    def log_text(self):
+        # The text of the position in the format of the log files
+        return Table_Text(self.table(), self.side())
+
+
+def Table_To_Position(current_table, side):
+    """Pack a current_table and the side to play.
+
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the
+                    write side to play.
+
+    Returns:
+        position (Position): The packed condition.
+
+    """
+
+    black, write = Table_To_Bitboard(current_table, 1)
+
+    return Position(black, write, side)
+
+
+def Log_To_Position(lines):
+    """Read a position in the format of the log files.
+
+    Args:
+        lines (list): The side to play ("B" or "W") and the 8 rows of the
+                      board, e.g. the lines of Model/current.log.
+
+    Returns:
+        position (Position): The position of the lines.
+
+    """
+
+    current_table = [[0 for j in range(8)] for i in range(8)]
+    Get_Current_Table(current_table, lines[1:9])
+
+    return Table_To_Position(current_table,
+                             -1 if lines[0].strip() == "W" else 1)
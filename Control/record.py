@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+"""record.py: Reversi Game Binary Game Records.
+
+This program provides a compact binary format to store the move history of
+many games in one file. The file starts with the 4 bytes "RVR1", then the
+games follow one after another:
+
+    0xFE                  start of a game
+    flags (1 byte)        bit 0: the game starts from a custom position
+                          bit 1: the write side plays first
+    position (16 bytes)   only with a custom position: the black and the
+                          write pieces as two 64-bit little-endian bitboards
+                          (bit x * 8 + y is the location (x, y))
+    moves (1 byte each)   x * 8 + y of every move, PASS_BYTE for a pass
+    0xFF result (1 byte)  end of the game and the black piece count minus
+                          the write piece count, as a signed byte
+
+The moves are appended while the game is played, so a game that was not
+finished (e.g. the player pressed <Esc> or the program crashed) simply has no
+end marker. The reader returns such games with a result of None.
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import collections
+import mmap
+import os
+import struct
+from bitboard import *
+
+MAGIC = b"RVR1"
+GAME_START = 0xFE
+GAME_END = 0xFF
+PASS_BYTE = 64
+
+CUSTOM_POSITION = 1  # flag of a game that starts from a custom position
+WRITE_FIRST = 2  # flag of a game where the write side plays first
+
+# default start condition as (black, write) bitboards
+DEFAULT_BLACK = (1 << Square(3, 4)) | (1 << Square(4, 3))
+DEFAULT_WRITE = (1 << Square(3, 3)) | (1 << Square(4, 4))
+
+# A stored game: the start position, the side to play first, the move bytes
+# and the result (None if the game was not finished)
+Game_Record = collections.namedtuple("Game_Record",
+                                     ["black", "write", "side", "moves",
+                                      "result"])
+
+
+class Record_Writer:
+    """Appends games to a record file.
+
+    The bytes are collected in a buffer and written to the file with one
+    system call when the buffer holds flush_bytes bytes. With flush_bytes=1
+    every move reaches the operating system as soon as it is played, so it
+    survives a crash of the program. Set sync to also survive a power loss.
+
+    Without a path the games are only collected in the buffer, without the
+    file header, e.g. to send them to another process that appends them to
+    its record file.
+
+    Attributes:
+        path (str): The record file, None to keep the games in the buffer.
+        fd (int): File descriptor opened in append mode, -1 without a file.
+        buffer (bytearray): Bytes not written yet.
+        flush_bytes (int): Buffer size that triggers a write.
+        sync (bool): Whether to call fsync after every write.
+        in_game (bool): Whether a game was started and not ended.
+
+    """
+
+    def __init__(self, path, flush_bytes=1, sync=False):
+        self.path = path
+        self.fd = -1
+        self.buffer = bytearray()
+        self.flush_bytes = flush_bytes
+        self.sync = sync
+        self.in_game = False
+
+        if path is not None:
+            self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                              0o644)
+            if os.fstat(self.fd).st_size == 0:
+                self.buffer += MAGIC
+
+
+    def start_game(self, current_table, side):
+        """Start a new game from the given position.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the condition of
+                                      the board.
+            side (int): 1 if the black side plays first, otherwise -1.
+
+        """
+
+        black, write = Table_To_Bitboard(current_table, 1)
+        flags = 0 if side == 1 else WRITE_FIRST
+        if (black, write) != (DEFAULT_BLACK, DEFAULT_WRITE):
+            flags |= CUSTOM_POSITION
+
+        self.buffer.append(GAME_START)
+        self.buffer.append(flags)
+        if flags & CUSTOM_POSITION:
+            self.buffer += struct.pack("<QQ", black, write)
+        self.in_game = True
+        self.write(len(self.buffer) >= self.flush_bytes)
+
+
+    def move(self, location):
+        """Append a move of the current game.
+
+        Args:
+            location (array): x and y coordinates of the new piece, x is
+                              negative for a pass.
+
+        """
+
+        if location[0] < 0:
+            self.buffer.append(PASS_BYTE)
+        else:
+            self.buffer.append(Square(location[0], location[1]))
+        self.write(len(self.buffer) >= self.flush_bytes)
+
+
+    def end_game(self, current_table):
+        """Append the result and end the current game.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the final
+                                      condition of the board.
+
+        """
+
+        diff = sum(sum(row) for row in current_table)
+        self.buffer.append(GAME_END)
+        self.buffer += struct.pack("<b", diff)
+        self.in_game = False
+        self.write(len(self.buffer) >= self.flush_bytes)
+
+
+    def append(self, data):
+        # Append the complete games collected by a writer without a file
+        self.buffer += data
+        self.write(len(self.buffer) >= self.flush_bytes)
+
+
+    def write(self, flag=True):
+        # Write the buffer to the file with a single system call
+        if flag and self.buffer and self.fd >= 0:
+            os.write(self.fd, bytes(self.buffer))
+            del self.buffer[:]
+            if self.sync:
+                os.fsync(self.fd)
+
+
+    def close(self):
+        # Write the remaining bytes and close the file, once
+        if self.fd >= 0:
+            self.write()
+            os.close(self.fd)
+            self.fd = -1
+
+
+def Read_Records(path):
+    """Read the games of a record file one by one.
+
+    The file is memory-mapped, so only the pages of the games being read are
+    loaded and any number of games can be streamed.
+
+    Args:
+        path (str): The record file.
+
+    Yields:
+        record (Game_Record): The next stored game.
+
+    Raises:
+        ValueError: The file is not a record file.
+
+    """
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if data[:4] != MAGIC:
+            raise ValueError("%s is not a game record file" % path)
+
+        size = len(data)
+        start = b"\xfe"
+        end = b"\xff"
+        pos = data.find(start, 4)
+
+        while 0 <= pos < size - 1:
+            flags = bytearray(data[pos + 1:pos + 2])[0]
+            pos += 2
+            if flags & CUSTOM_POSITION:
+                if pos + 16 > size:
+                    break
+                black, write = struct.unpack("<QQ", data[pos:pos + 16])
+                pos += 16
+            else:
+                black, write = DEFAULT_BLACK, DEFAULT_WRITE
+            side = -1 if flags & WRITE_FIRST else 1
+
+            # the move bytes never contain the two marker values
+            next_start = data.find(start, pos)
+            next_end = data.find(end, pos)
+            if next_end >= 0 and (next_end < next_start or next_start < 0):
+                moves = data[pos:next_end]
+                if next_end + 1 < size:
+                    result = struct.unpack("<b", data[next_end + 1:
+                                                      next_end + 2])[0]
+                else:
+                    result = None
+                pos = data.find(start, next_end + 2)
+            else:
+                stop = next_start if next_start >= 0 else size
+                moves = data[pos:stop]
+                result = None
+                pos = next_start
+
+            yield Game_Record(black, write, side, moves, result)
+    finally:
+        data.close()
+
+
+def Replay(record):
+    """Replay a stored game on the compact board representation.
+
+    Args:
+        record (Game_Record): The stored game.
+
+    Yields:
+        own (int): Pieces of the side to play before every move.
+        opp (int): Pieces of the other side.
+        side (int): The side to play.
+        square (int): Bit index of the move, PASS for a pass.
+
+    """
+
+    side = record.side
+    if side == 1:
+        own, opp = record.black, record.write
+    else:
+        own, opp = record.write, record.black
+
+    for byte in bytearray(record.moves):
+        square = PASS if byte == PASS_BYTE else byte
+        yield (own, opp, side, square)
+        own, opp = Play(own, opp, square)
+        side = -side
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+
+"""search_table.py: Reversi Game Search Table.
+
+This program provides a fixed-size table of Min_Max results, so that a
+position that is reached again (through another move order, in the next move
+of the game or by another worker process) is not searched again.
+
+Every entry has 16 bytes, the two 64-bit words "check XOR data" and "data":
+
+    data bits 0-31     weight of the position plus 2^31
+    data bits 32-39    depth of the search
+    data bits 40-47    x * 8 + y of the best location, NO_MOVE if none
+    data bit 48        set in every stored entry
+
+check is a 64-bit hash of the position and the depth, the entry is found at
+check modulo the number of entries. An entry is only used if "check XOR
+data" gives the check of the position back. This verifies the position, and
+since the two words are written separately, it also detects an entry that is
+read while another process is writing it. Such an entry is treated as a miss,
+so the table needs no locks.
+
+Shared_Search_Table keeps the entries in a multiprocessing.shared_memory
+block, which needs python 3.8 or later. Search_Table keeps them in the memory
+of one process.
+
+A table can be saved to a file and loaded in the next run, so the positions
+searched in earlier games and analysis sessions are not searched again. The
+file starts with a header of FILE_HEADER_SIZE bytes:
+
+    magic (4 bytes)         "RVS1"
+    version (4 bytes)       FILE_VERSION
+    entries (8 bytes)       number of entries
+    evaluation (16 bytes)   name of the evaluation of the stored weights
+    check (4 bytes)         CRC-32 of the header fields above
+
+followed by the entries. Load_Search_Table memory-maps the file, so only the
+pages of the probed entries are read. A file with another version, another
+evaluation or a damaged header is ignored, and a damaged entry fails its own
+check like an entry that is being written.
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import mmap
+import os
+import struct
+import zlib
+from control import *
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+ENTRY = struct.Struct("<QQ")
+ENTRY_SIZE = ENTRY.size
+
+MASK = 0xFFFFFFFFFFFFFFFF
+NO_MOVE = 64
+USED = 1 << 48  # bit of every stored entry
+
+FILE_MAGIC = b"RVS1"
+FILE_VERSION = 1
+FILE_FIELDS = struct.Struct("<4sIQ16s")
+FILE_HEADER_SIZE = FILE_FIELDS.size + 4
+
+
+def Key_Hash(own, opp, depth):
+    """Calculate the 64-bit check of a position.
+
+    The hash only uses integer arithmetic, so it is the same in all
+    processes, unlike the built-in hash.
+
+    Args:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        depth (int): Depth of the search.
+
+    Returns:
+        check (int): 64-bit hash.
+
+    """
+
+    h = (own * 0x9E3779B97F4A7C15 ^ opp * 0xC2B2AE3D27D4EB4F ^
+         (depth + 1) * 0x165667B19E3779F9) & MASK
+    h = ((h ^ (h >> 31)) * 0xBF58476D1CE4E5B9) & MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK
+
+    return h ^ (h >> 31)
+
+
+class Search_Table:
+    """A fixed-size table of Min_Max results.
+
+    A table must only be used with one evaluation function, since the
+    evaluation is not part of the key.
+
+    Attributes:
+        entries (int): Number of entries.
+        buffer (memoryview): entries * ENTRY_SIZE bytes of the entries, a
+                             new local buffer if None.
+        probes (int): Number of lookups of this process.
+        hits (int): Number of lookups that found the position.
+        stores (int): Number of stored results, i.e. searched positions.
+        mapping (mmap): The mapped file of a loaded table, None otherwise.
+
+    """
+
+    def __init__(self, entries=1 << 20, buffer=None):
+        self.entries = entries
+        if buffer is None:
+            buffer = memoryview(bytearray(entries * ENTRY_SIZE))
+        self.buffer = buffer
+        self.mapping = None
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+
+    def probe(self, own, opp, depth):
+        """Look up the result of a position.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            depth (int): Depth of the search.
+
+        Returns:
+            result (tuple): (location, weight) as returned by Min_Max, None
+                            if the position is not in the table.
+
+        """
+
+        self.probes += 1
+        check = Key_Hash(own, opp, depth)
+        word, data = ENTRY.unpack_from(self.buffer,
+                                       (check % self.entries) * ENTRY_SIZE)
+        if (word ^ data != check or not data & USED or
+                (data >> 32) & 0xFF != depth):
+            return None
+
+        self.hits += 1
+        move = (data >> 40) & 0xFF
+        location = [-1, -1] if move == NO_MOVE else [move // 8, move % 8]
+
+        return (location, (data & 0xFFFFFFFF) - (1 << 31))
+
+
+    def store(self, own, opp, depth, location, weight):
+        """Store the result of a position, replacing the previous entry.
+
+        Args:
+            own (int): Pieces of the side to play.
+            opp (int): Pieces of the other side.
+            depth (int): Depth of the search.
+            location (array): x and y axes of the best location.
+            weight (int): Weight of the position.
+
+        """
+
+        self.stores += 1
+        check = Key_Hash(own, opp, depth)
+        move = NO_MOVE if location[0] < 0 else location[0] * 8 + location[1]
+        data = (USED | (move << 40) | (depth << 32) |
+                ((weight + (1 << 31)) & 0xFFFFFFFF))
+        ENTRY.pack_into(self.buffer, (check % self.entries) * ENTRY_SIZE,
+                        check ^ data, data)
+
+
+    def clear(self):
+        # Remove all entries
+        self.buffer[:] = bytearray(len(self.buffer))
+
+
+    def used(self):
+        # Number of occupied entries
+        return sum(1 for index in range(self.entries)
+                   if ENTRY.unpack_from(self.buffer,
+                                        index * ENTRY_SIZE)[1] & USED)
+
+
+    def save(self, path, evaluation="weights"):
+        """Save the table to a file.
+
+        The table is written to a temporary file that replaces the old file
+        when it is complete, so a crash never leaves a half-written table.
+
+        Args:
+            path (str): The table file.
+            evaluation (str): Name of the evaluation of the stored weights.
+
+        """
+
+        fields = FILE_FIELDS.pack(FILE_MAGIC, FILE_VERSION, self.entries,
+                                  evaluation.encode())
+        # every process has its own temporary file, e.g. self-play workers
+        # saving the same table, the last complete one is kept
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "wb") as file:
+            file.write(fields)
+            file.write(struct.pack("<I", zlib.crc32(fields) & 0xFFFFFFFF))
+            file.write(self.buffer.tobytes())
+        Replace_File(temp_path, path)
+
+
+    def close(self):
+        # Release the mapped file of a loaded table
+        if self.mapping is not None:
+            self.buffer.release()
+            self.mapping.close()
+            self.mapping = None
+
+
+def Load_Search_Table(path, evaluation="weights"):
+    """Load a table saved by Search_Table.save.
+
+    The file is mapped copy-on-write: the stored results are read on demand
+    and the new results stay in memory until the table is saved.
+
+    Args:
+        path (str): The table file.
+        evaluation (str): Name of the evaluation the table must be saved
+                          with.
+
+    Returns:
+        table (Search_Table): The loaded table, None if the file does not
+                              exist or cannot be used.
+
+    """
+
+    try:
+        file = open(path, "rb")
+    except (IOError, OSError):
+        return None
+
+    with file:
+        header = file.read(FILE_HEADER_SIZE)
+        if len(header) < FILE_HEADER_SIZE:
+            return None
+        fields, check = header[:-4], struct.unpack("<I", header[-4:])[0]
+        magic, version, entries, name = FILE_FIELDS.unpack(fields)
+        size = FILE_HEADER_SIZE + entries * ENTRY_SIZE
+        if (magic != FILE_MAGIC or version != FILE_VERSION or
+                zlib.crc32(fields) & 0xFFFFFFFF != check or not entries or
+                name.rstrip(b"\0") != evaluation.encode() or
+                os.fstat(file.fileno()).st_size != size):
+            return None
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    try:
+        buffer = memoryview(mapping)[FILE_HEADER_SIZE:]
+    except TypeError:
+        # the python 2 mmap has no buffer interface, the entries are copied
+        buffer = memoryview(bytearray(mapping[FILE_HEADER_SIZE:]))
+        mapping.close()
+        mapping = None
+    table = Search_Table(entries, buffer)
+    table.mapping = mapping
+
+    return table
+
+
+class Shared_Search_Table(Search_Table):
+    """A search table in shared memory, used by several processes.
+
+    The process that creates the table passes its name to the other
+    processes, which attach to it with create=False. The lookup counters stay
+    local to every process.
+
+    Attributes:
+        memory (SharedMemory): The shared memory block.
+        name (str): Name of the block.
+
+    """
+
+    def __init__(self, entries=1 << 20, name=None, create=True):
+        if shared_memory is None:
+            raise RuntimeError("shared memory needs python 3.8 or later")
+
+        if create:
+            self.memory = shared_memory.SharedMemory(
+                name=name, create=True, size=entries * ENTRY_SIZE)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        Search_Table.__init__(self, entries,
+                              self.memory.buf[:entries * ENTRY_SIZE])
+
+
+    def close(self):
+        # Detach this process from the table
+        self.buffer.release()
+        self.memory.close()
+
+
+    def unlink(self):
+        # Free the shared memory, called once by the creating process
+        self.memory.unlink()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+
+"""time_manager.py: Reversi Game Time Manager.
+
+This program plays Min_Max on a game clock instead of a fixed depth. A
+Time_Manager keeps the remaining time of one side and gives every move a
+budget, and Timed_Min_Max deepens the search until the budget is used.
+
+The budget of a move is its share of the remaining clock among the moves
+that are still to be played by the side, plus most of the increment. The
+moves just before the exact endgame get a larger share: they decide the
+outcome of the endgame, while the searches of the last moves reach the end
+of the game and stop early. Every budget has a soft and a hard limit:
+
+    soft    no new depth is started after it, it is lowered when the best
+            location stayed the same for the last depths and raised up to
+            the hard limit when the last depth changed it
+    hard    the running depth is aborted and its result is dropped, it is
+            never more than the remaining clock minus MOVE_OVERHEAD (or the
+            longest move of the clock, if any), and no depth is started
+            that is expected to end after it
+
+The depth 0 (Greedy) search is never aborted, so every move has a location.
+
+Example:
+    clock = Time_Manager(60000, 500)
+    clock.start_move()
+    location = Timed_Min_Max(current_table, side, clock)[0]
+    clock.end_move()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import time
+from AI import *
+
+MOVE_OVERHEAD = 50  # milliseconds of every move kept for everything else
+EXACT_EMPTIES = 10  # empty squares of the exact endgame phase
+PRE_ENDGAME_EMPTIES = 10  # empty squares before it that get extra time
+PRE_ENDGAME_SHARE = 2.0  # share of a move before the exact endgame
+EXACT_SHARE = 0.5  # share of a move in the exact endgame
+INCREMENT_SHARE = 0.9  # part of the increment spent on the move
+HARD_FACTOR = 3.0  # hard limit as a multiple of the soft limit
+HARD_SHARE = 0.5  # most of the remaining clock one move may use
+STABLE_FACTOR = 0.5  # soft limit when the best location is stable
+UNSTABLE_FACTOR = 2.0  # soft limit when the best location just changed
+BRANCHING = 6.0  # time factor of a new depth before it can be measured
+
+
+class Search_Timeout(Exception):
+    """Raised inside Min_Max when the hard limit of a move is reached."""
+
+
+class Time_Manager:
+    """The game clock of one side.
+
+    Attributes:
+        clock (int): Total time of the game in milliseconds.
+        increment (int): Time added after every move in milliseconds.
+        remaining (float): Time left in milliseconds.
+        started (float): time.time() when the running move started, None
+                         between the moves.
+        flagged (bool): Whether the clock ran out.
+        moves (int): Number of finished moves.
+        max_move (int): Longest budget of a move in milliseconds, 0 if only
+                        the clock limits it.
+
+    """
+
+    def __init__(self, clock, increment=0, max_move=0):
+        self.clock = clock
+        self.increment = increment
+        self.max_move = max_move
+        self.remaining = float(clock)
+        self.started = None
+        self.flagged = False
+        self.moves = 0
+
+
+    def start_move(self):
+        # Start the clock of a move
+        self.started = time.time()
+
+
+    def elapsed(self):
+        # Milliseconds since the running move started
+        if self.started is None:
+            return 0.0
+
+        return 1000.0 * (time.time() - self.started)
+
+
+    def end_move(self):
+        """Stop the clock of a move.
+
+        Returns:
+            elapsed (float): Milliseconds used by the move.
+
+        """
+
+        elapsed = self.elapsed()
+        self.started = None
+        self.remaining -= elapsed
+        if self.remaining < 0:
+            self.flagged = True
+            self.remaining = 0.0
+        self.remaining += self.increment
+        self.moves += 1
+
+        return elapsed
+
+
+    def budget(self, empties):
+        """Get the time limits of a move.
+
+        Args:
+            empties (int): Number of empty squares of the position.
+
+        Returns:
+            soft (float): Milliseconds after which no new depth is started.
+            hard (float): Milliseconds after which the search is aborted.
+
+        """
+
+        usable = max(0.0, self.remaining - MOVE_OVERHEAD)
+        # the shares of this move and of the later moves of the side
+        total = sum(Move_Share(e) for e in range(empties, 0, -2))
+        soft = usable * Move_Share(empties) / max(total, EXACT_SHARE)
+        soft = min(usable, soft + INCREMENT_SHARE * self.increment)
+        hard = min(usable, max(soft, min(HARD_FACTOR * soft,
+                                         HARD_SHARE * usable)))
+        if self.max_move:
+            hard = min(hard, self.max_move)
+            soft = min(soft, hard)
+
+        return (soft, hard)
+
+
+def Move_Share(empties):
+    # Weight of a move in the distribution of the remaining clock
+    if empties <= EXACT_EMPTIES:
+        return EXACT_SHARE
+    if empties <= EXACT_EMPTIES + PRE_ENDGAME_EMPTIES:
+        return PRE_ENDGAME_SHARE
+
+    return 1.0
+
+
+def Timed_Min_Max(current_table, side, clock, max_depth=60, evaluation=None,
+                  table=None):
+    """Find the best location with Min_Max within the budget of a move.
+
+    The depths 0, 1, 2 and so on are searched one after the other. The
+    depths of one move do not share results, since the table keeps them by
+    the remaining depth, but a later move finds the positions of this one.
+
+    Args:
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the write
+                    side to play.
+        clock (Time_Manager): The clock of the side, its move should have
+                              been started.
+        max_depth (int): Deepest search.
+        evaluation (function): Evaluation of a table, Weight_Calculation if
+                               None.
+        table (Search_Table): Results of the positions searched before.
+
+    Returns:
+        location (array): x and y axes of the calculated location.
+        weight (int): Weight of the location.
+        depth (int): Depth of the last finished search.
+
+    """
+
+    if evaluation is None:
+        evaluation = Weight_Calculation
+    if clock.started is None:
+        clock.start_move()
+    empties = sum(row.count(0) for row in current_table)
+    soft, hard = clock.budget(empties)
+    deadline = clock.started + hard / 1000.0
+
+    def timed_evaluation(table, side):
+        # Evaluate a table unless the hard limit is reached
+        if time.time() > deadline:
+            raise Search_Timeout()
+        return evaluation(table, side)
+
+    location, weight = Min_Max(current_table, side, 0, evaluation)
+    depth = 0
+    stable = 0
+    last_time = None
+    branching = BRANCHING
+    # depth d looks d + 1 moves ahead, no need to look past the last empty
+    while depth < min(max_depth, empties - 1):
+        depth_start = time.time()
+        try:
+            result = Min_Max(current_table, side, depth + 1, timed_evaluation,
+                             table)
+        except Search_Timeout:
+            break
+        depth += 1
+        depth_time = 1000.0 * (time.time() - depth_start)
+        if last_time:
+            branching = max(2.0, depth_time / last_time)
+        last_time = max(depth_time, 0.1)
+        stable = stable + 1 if result[0] == location else 0
+        location, weight = result
+
+        # spend less time on a clear move and more on an unclear one
+        if stable >= 2:
+            limit = STABLE_FACTOR * soft
+        elif stable == 0:
+            limit = min(hard, UNSTABLE_FACTOR * soft)
+        else:
+            limit = soft
+        elapsed = clock.elapsed()
+        if elapsed > limit or elapsed + branching * last_time > hard:
+            break
+
+    return (location, weight, depth)
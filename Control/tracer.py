@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+
+"""tracer.py: Reversi Game Search Tree Traces.
+
+This program writes the search tree of the AI to a trace file, so that the
+reasons behind a move can be inspected after the game. Every visited node
+becomes one record when its search is finished, i.e. the children are written
+before their parent and the root of every search is its last record.
+
+A trace file with the extension ".jsonl" has one JSON object per node, any
+other trace file starts with the 4 bytes "RVT1" followed by records of
+RECORD_SIZE bytes:
+
+    id (4 bytes)          node number, in the order the nodes were entered
+    parent (4 bytes)      number of the parent node, NO_NODE for a root
+    move (1 byte)         x * 8 + y of the move leading to the node,
+                          PASS_MOVE for a pass and ROOT_MOVE for a root
+    depth (1 byte)        plies from the root
+    side (1 byte)         side to play at the node, 1 or -1
+    alpha, beta (4 bytes) search window of the node
+    score (4 bytes)       value of the node for its side to play
+    flags (1 byte)        LEAF for an evaluated leaf, CUTOFF when the search
+                          of the node stopped early
+    best (4 bytes)        number of the best child, NO_NODE if none
+
+The records are collected in a buffer of at most flush_bytes bytes, so a
+trace of millions of nodes needs no more memory than a small one.
+
+Min_Max and Greedy are traced without changes to AI.py: Start_Trace()
+replaces them by tracing wrappers as "instrument.py" does. Min_Max searches
+with the full window, so its nodes have alpha = -WINDOW and beta = WINDOW and
+no cutoffs. Searches with a window call Tracer.enter, Tracer.leaf and
+Tracer.leave directly when TRACER is not None.
+
+Example:
+    Start_Trace("search.trace")
+    Min_Max(current_table, side, 3)
+    Stop_Trace()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import collections
+import json
+import mmap
+import os
+import struct
+from instrument import *
+
+MAGIC = b"RVT1"
+RECORD = struct.Struct("<IIBBbiiiBI")
+RECORD_SIZE = RECORD.size
+
+NO_NODE = 0xFFFFFFFF
+PASS_MOVE = 64
+ROOT_MOVE = 255
+WINDOW = 65536  # bound of the full search window
+
+LEAF = 1  # flag of an evaluated leaf
+CUTOFF = 2  # flag of a node whose search stopped early
+
+# One node of a trace
+Trace_Node = collections.namedtuple("Trace_Node",
+                                    ["id", "parent", "move", "depth", "side",
+                                     "alpha", "beta", "score", "flags",
+                                     "best"])
+
+TRACER = None  # the active tracer, None when no search is traced
+
+
+def Changed_Square(parent_table, table):
+    # Find the location of the piece placed between two tables
+    for x in range(8):
+        for y in range(8):
+            if parent_table[x][y] == 0 and table[x][y] != 0:
+                return x * 8 + y
+
+    return PASS_MOVE
+
+
+class Tracer:
+    """Streams the nodes of the searches to a trace file.
+
+    Attributes:
+        file (file): The trace file.
+        json (bool): Whether the records are written as JSON lines.
+        buffer (bytearray): Records not written yet.
+        flush_bytes (int): Buffer size that triggers a write.
+        next_id (int): Number of the next entered node.
+        stack (list): [id, parent, move, table, side, children] of the nodes
+                      being searched, children maps the moves to the child
+                      numbers.
+        nodes (int): Number of written records.
+
+    """
+
+    def __init__(self, path, flush_bytes=65536):
+        self.file = open(path, "wb")
+        self.json = path.endswith(".jsonl")
+        self.buffer = bytearray()
+        self.flush_bytes = flush_bytes
+        self.next_id = 0
+        self.stack = []
+        self.nodes = 0
+
+        if not self.json:
+            self.buffer += MAGIC
+
+
+    def enter(self, table, side):
+        """Start the search of a node.
+
+        Args:
+            table (2D array): 8*8 values indicating the condition of the board
+                              at the node. It must not change until leave.
+            side (int): Side to play at the node.
+
+        Returns:
+            node (int): Number of the node.
+
+        """
+
+        node = self.next_id
+        self.next_id += 1
+
+        if self.stack:
+            parent = self.stack[-1]
+            move = Changed_Square(parent[3], table)
+            parent[5][move] = node
+            self.stack.append([node, parent[0], move, table, side, {}])
+        else:
+            self.stack.append([node, NO_NODE, ROOT_MOVE, table, side, {}])
+
+        return node
+
+
+    def leaf(self, table, side, score):
+        """Write an evaluated leaf below the current node.
+
+        Args:
+            table (2D array): 8*8 values indicating the condition of the board
+                              at the leaf.
+            side (int): Side to play at the leaf.
+            score (int): Value of the leaf for the side to play.
+
+        """
+
+        parent = self.stack[-1]
+        node = self.next_id
+        self.next_id += 1
+        move = Changed_Square(parent[3], table)
+        parent[5][move] = node
+        self.write_node(Trace_Node(node, parent[0], move, len(self.stack),
+                                   side, -WINDOW, WINDOW, score, LEAF,
+                                   NO_NODE))
+
+
+    def leave(self, score, location=None, alpha=-WINDOW, beta=WINDOW,
+              cutoff=False):
+        """Finish the search of the current node and write it.
+
+        Args:
+            score (int): Value of the node for its side to play.
+            location (array): x and y axes of the best move, None if unknown.
+            alpha (int): Lower bound of the search window.
+            beta (int): Upper bound of the search window.
+            cutoff (bool): Whether the search of the node stopped early.
+
+        """
+
+        node, parent, move, table, side, children = self.stack.pop()
+        best = NO_NODE
+        if location is not None and location[0] >= 0:
+            best = children.get(location[0] * 8 + location[1], NO_NODE)
+        self.write_node(Trace_Node(node, parent, move, len(self.stack), side,
+                                   alpha, beta, score,
+                                   CUTOFF if cutoff else 0, best))
+
+
+    def write_node(self, node):
+        # Append a record and write the buffer when it is full
+        if self.json:
+            self.buffer += (json.dumps(node._asdict()) + "\n").encode()
+        else:
+            self.buffer += RECORD.pack(*node)
+        self.nodes += 1
+
+        if len(self.buffer) >= self.flush_bytes:
+            self.file.write(bytes(self.buffer))
+            del self.buffer[:]
+
+
+    def close(self):
+        # Write the remaining records and close the file
+        self.file.write(bytes(self.buffer))
+        del self.buffer[:]
+        self.file.close()
+
+
+def Trace_Search(function, min_max=False):
+    # Create the tracing wrapper of Min_Max, Greedy or Score_Moves
+    def wrapper(current_table, side, *args, **kwargs):
+        # the Greedy call traces the node of a depth 0 Min_Max call
+        if min_max and kwargs.get("depth",
+                                  args[0] if args else None) == 0:
+            return function(current_table, side, *args, **kwargs)
+
+        TRACER.enter(current_table, side)
+        finished = False
+        try:
+            result = function(current_table, side, *args, **kwargs)
+            finished = True
+        finally:
+            # the search was aborted, e.g. by Search_Timeout
+            if not finished:
+                TRACER.leave(-WINDOW, cutoff=True)
+        if not isinstance(result, list):
+            location, score = result
+        elif result:
+            # Score_Moves, the best location has the maximum weight
+            location, score = max(result, key=lambda item: item[1])
+        else:
+            location, score = [-1, -1], -WINDOW
+        TRACER.leave(score, location)
+
+        return result
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+
+    return wrapper
+
+
+def Trace_Weight(function):
+    # Create the tracing wrapper of Weight_Calculation or Feature_Evaluation
+    def wrapper(table, side):
+        weight = function(table, side)
+        # the weight is calculated for the side that played the move
+        if TRACER.stack:
+            TRACER.leaf(table, -side, -weight)
+
+        return weight
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+
+    return wrapper
+
+
+WRAPPERS = {}  # original function of every installed wrapper
+
+
+def Start_Trace(path, flush_bytes=65536):
+    """Trace all following Min_Max, Greedy and Score_Moves searches.
+
+    Args:
+        path (str): The trace file, JSON lines if it ends with ".jsonl".
+        flush_bytes (int): Size of the write buffer.
+
+    Raises:
+        RuntimeError: A trace is already running or the searches are
+                      instrumented, which replaces the same functions.
+
+    """
+
+    global TRACER
+    if TRACER is not None or PROBE.enabled:
+        raise RuntimeError("the searches are already traced or instrumented")
+
+    TRACER = Tracer(path, flush_bytes)
+    for name in ["Min_Max", "Greedy", "Score_Moves", "Weight_Calculation",
+                 "Feature_Evaluation"]:
+        original = getattr(AI, name)
+        if name in ("Weight_Calculation", "Feature_Evaluation"):
+            wrapper = Trace_Weight(original)
+        else:
+            wrapper = Trace_Search(original, name == "Min_Max")
+        WRAPPERS[wrapper] = original
+        Replace(original, wrapper)
+
+
+def Stop_Trace():
+    """Stop tracing and close the trace file.
+
+    Returns:
+        nodes (int): Number of written records.
+
+    """
+
+    global TRACER
+    if TRACER is None:
+        return 0
+
+    for wrapper, original in WRAPPERS.items():
+        Replace(wrapper, original)
+    WRAPPERS.clear()
+    TRACER.close()
+    nodes = TRACER.nodes
+    TRACER = None
+
+    return nodes
+
+
+def Read_Trace(path):
+    """Read the nodes of a trace file one by one.
+
+    Args:
+        path (str): The trace file.
+
+    Yields:
+        node (Trace_Node): The next record.
+
+    Raises:
+        ValueError: The file is not a trace file.
+
+    """
+
+    if path.endswith(".jsonl"):
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+                    yield Trace_Node(*[item[field]
+                                       for field in Trace_Node._fields])
+        return
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if data[:4] != MAGIC:
+            raise ValueError("%s is not a trace file" % path)
+        # a record cut off by a crash is ignored
+        for offset in range(4, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            yield Trace_Node(*RECORD.unpack_from(data, offset))
+    finally:
+        data.close()
@@ -17,8 +17,29 @@ sys.path.append("..")
 from View.view import *
 from Control.control import *
 from Control.AI import *
+from Control.bitboard import *
+from Control.mcts import *
+from Control.record import *
+from Control.search_table import *
+from Control.autosave import *
+from Control.audio import *
+from Control.position import *
+from Control.hints import *
+from Control.time_manager import *
+import itertools
 import time
-import pygame
+
+MCTS_TIME = 1000  # thinking time of the MCTS AI in milliseconds
+RECORD_FILE = "Model/games.rec"  # binary records of all played games
+KEYFRAME_INTERVAL = 8  # moves between two stored positions of a replay
+JUMP_MOVES = 10  # moves skipped by <up> and <down> in the replay mode
+AUTOSAVE_FILE = "Model/current.log"  # condition saved after every move
+SEARCH_TABLE_FILE = "Model/search.tbl"  # None to start every game cold
+SEARCH_TABLE_ENTRIES = 1 << 18  # positions kept by the hard AI
+HINT_DEPTH = 3  # deepest search of the move hints
+AI_CLOCK = 60000  # game clock of the hard AI in milliseconds
+AI_INCREMENT = 500  # milliseconds added to it after every move
+AI_MOVE_LIMIT = 2000  # longest search of a hard AI move, the view waits
 
 
 class Game_Model:
@@ -45,9 +66,32 @@ class Game_Model:
         music (bool): Whether to play music during the game.
         mode (int): 1 if the player chooses to play with an easy AI;
                     2 if the player chooses to play with a hard AI;
+                    3 if the player chooses to play with a MCTS AI;
                     0 if the player chooses to play with another player.
         AI_side (int): 1 if AI plays black; -1 if AI plays write.
         file_name (str): File that indicates the initial condition.
+        mcts (MCTS): Search engine of the MCTS AI, kept during the whole game
+                     so that its search tree is reused between moves.
+        search_table (Search_Table): Min_Max results of the hard AI, loaded
+                                     from SEARCH_TABLE_FILE and saved when
+                                     the game ends.
+        clock (Time_Manager): Game clock of the hard AI, which deepens its
+                              searches until the budget of the move is used.
+        record (Record_Writer): Appends every move to RECORD_FILE as soon as
+                                it is played.
+        record_restart (bool): Whether the record should start a new game
+                               before the next move, set after an undo.
+        history (list): [square, flips, side, passed] of every played move:
+                        the bit index of the new piece, the bitboard of the
+                        flipped pieces, the side that played and whether the
+                        other side had to pass afterwards.
+        redo_list (list): Moves taken back by undo, the last one first.
+        autosave (Autosaver): Saves the condition to AUTOSAVE_FILE after
+                              every move on a background thread.
+        hints (Hint_Search): Scores the locations of the player's position
+                             on a background thread.
+        show_hints (bool): Whether the hint overlay is shown.
+        hint_shown (tuple): (position, depth) of the shown hint scores.
 
     """
 
@@ -59,6 +103,7 @@ class Game_Model:
             size (int): Diameter of the piece unit in the game.
             mode (int): 1 if the player chooses to play with an easy AI;
                         2 if the player chooses to play with a hard AI;
+                        3 if the player chooses to play with a MCTS AI;
                         0 if the player chooses to play with another player.
             AI_side (int): 1 if AI plays black; -1 if AI plays write.
             music (bool): Whether to play music during the game.
@@ -77,20 +122,42 @@ class Game_Model:
         self.music = music
         self.mode = mode
         self.AI_side = AI_side
+        self.mcts = None
+        if self.mode == 3:
+            self.mcts = MCTS(ms=MCTS_TIME)
+        self.search_table = None
+        if self.mode == 2:
+            if SEARCH_TABLE_FILE is not None:
+                self.search_table = Load_Search_Table(SEARCH_TABLE_FILE)
+            if self.search_table is None:
+                self.search_table = Search_Table(SEARCH_TABLE_ENTRIES)
+        self.clock = Time_Manager(AI_CLOCK, AI_INCREMENT, AI_MOVE_LIMIT)
+        self.record = Record_Writer(RECORD_FILE)
+        self.record_restart = False
+        self.history = []
+        self.redo_list = []
+        self.autosave = Autosaver(AUTOSAVE_FILE)
+        self.hints = Hint_Search(HINT_DEPTH)
+        self.show_hints = False
+        self.hint_shown = (None, 0)
+        self.game_view.add_hints()
         
-        # play music if needed
-        if self.mode <= 1:
-            pygame.mixer.music.load("Music/easy.mp3")
-        else:
-            pygame.mixer.music.load("Music/hard.mp3")
-        
+        # play music if needed, the music is loaded in the background
         if self.music == True:
-            pygame.mixer.music.play(-1)
+            if self.mode <= 1:
+                MUSIC.play("Music/easy.mp3")
+            else:
+                MUSIC.play("Music/hard.mp3")
         
         # load the game starting condition
         self.load(file_name)
 
 
+    def position(self):
+        # The current condition as a compact, hashable Position
+        return Table_To_Position(self.current_table, self.side)
+
+
     def update_view(self):
         """Update the game view.
         
@@ -101,6 +168,37 @@ class Game_Model:
 
         self.game_view.update(self.side, self.location, self.current_table, 
                               self.available_table)
+        self.poll_hints()
+
+
+    def poll_hints(self):
+        """Search the hints of the current position and show new scores.
+
+        The hints are searched while it is the player's turn. Moving the
+        cursor keeps the shown scores, and the scores of another position are
+        never shown.
+
+        """
+
+        position = None
+        if (self.show_hints and not self.escape_flag and
+                not (self.mode > 0 and self.side == self.AI_side)):
+            position = self.position()
+        self.hints.set_position(position)
+
+        result = None
+        if position is not None:
+            result = self.hints.result(position)
+        depth = result[0] if result else 0
+        if (position, depth) != self.hint_shown:
+            self.hint_shown = (position, depth)
+            self.game_view.show_hints(result[1] if result else [], depth)
+
+
+    def toggle_hints(self):
+        # Show or hide the hint overlay
+        self.show_hints = not self.show_hints
+        self.poll_hints()
 
        
     def move(self, direction):
@@ -133,12 +231,28 @@ class Game_Model:
         else:
             update_flag = True
         
+        # after an undo the record continues from the current position
+        location = self.location[:]
+        if (self.record_restart and
+                Check_Location(self.current_table, self.side, location[0],
+                               location[1])):
+            self.record.start_game(self.current_table, self.side)
+            self.record_restart = False
+        
+        # keep the flipped pieces for undo
+        own, opp = Table_To_Bitboard(self.current_table, self.side)
+        square = Square(location[0], location[1])
+        
         # the Place_Piece function will return False if current location is
-        # not valid
+        # not valid, it also moves self.location when the piece is placed
         if Place_Piece(self.current_table, self.location, self.side,
                        update_flag):
                        
             self.count += 1
+            self.record.move(location)
+            self.history.append([square, Get_Flips(own, opp, square),
+                                 self.side, False])
+            self.redo_list = []
             
             # by default we should switch side
             self.side = -self.side
@@ -151,10 +265,20 @@ class Game_Model:
                 flag = Get_Available_Table(self.current_table, self.side,
                                            self.available_table)
                 
-                # if no valid place for both sides, end the game
+                # if no valid place for both sides, end the game; the
+                # autosave keeps the final position, so restoring a finished
+                # game shows its result instead of the move before the end
                 if flag == False:
+                    self.autosave.save(self.current_table, self.side)
                     self.end()
                     return
+                
+                # the other side passes
+                self.record.move([-1, -1])
+                self.history[-1][3] = True
+            
+            # a crash after this point can be restored from this move
+            self.autosave.save(self.current_table, self.side)
 
             
         self.update_view()
@@ -169,24 +293,128 @@ class Game_Model:
             self.AI_place()
         
     
+    def take_back(self):
+        """Take back the last move.
+
+        Only the new piece and the flipped pieces are changed back, so the
+        cost depends on the number of flipped pieces, not on the board size.
+
+        """
+
+        square, flips, side, passed = self.history.pop()
+        self.redo_list.append([square, flips, side, passed])
+
+        x, y = Location(square)
+        self.current_table[x][y] = 0
+        while flips:
+            bit = flips & -flips
+            i, j = Location(bit.bit_length() - 1)
+            self.current_table[i][j] = -side
+            flips ^= bit
+
+        self.side = side
+        self.count -= 1
+        self.location = [x, y]
+
+
+    def play_again(self):
+        # Play the last move taken back by undo, the reverse of take_back
+        square, flips, side, passed = self.redo_list.pop()
+        self.history.append([square, flips, side, passed])
+
+        x, y = Location(square)
+        self.current_table[x][y] = side
+        while flips:
+            bit = flips & -flips
+            i, j = Location(bit.bit_length() - 1)
+            self.current_table[i][j] = side
+            flips ^= bit
+
+        self.side = side if passed else -side
+        self.count += 1
+        self.location = [x, y]
+        if self.count < 64:
+            Move_Piece(self.current_table, self.location, "right")
+
+
+    def undo(self):
+        """Take back the last move of the player.
+
+        In a one player game the AI's answer is also taken back, so that it
+        is the player's turn again. The record file continues with a new
+        game from the resulting position at the next move.
+
+        """
+
+        if not self.history:
+            return
+
+        self.take_back()
+        while (self.history and self.mode > 0 and
+               self.side == self.AI_side):
+            self.take_back()
+
+        # all moves were taken back and the AI plays first: its first move
+        # is played again instead of searched again, so the player can still
+        # redo the moves taken back
+        if self.mode > 0 and self.side == self.AI_side and self.redo_list:
+            self.play_again()
+
+        self.record_restart = True
+        Get_Available_Table(self.current_table, self.side,
+                            self.available_table)
+        self.autosave.save(self.current_table, self.side)
+        self.update_view()
+
+        # the AI plays first and there is no move to play again
+        if self.mode > 0 and self.side == self.AI_side:
+            self.AI_place()
+
+
+    def redo(self):
+        # Play the moves taken back by undo until it is the player's turn
+        if not self.redo_list:
+            return
+
+        self.play_again()
+        while (self.redo_list and self.mode > 0 and
+               self.side == self.AI_side):
+            self.play_again()
+
+        self.record_restart = True
+        Get_Available_Table(self.current_table, self.side,
+                            self.available_table)
+        self.autosave.save(self.current_table, self.side)
+        self.update_view()
+
+
     def AI_place(self):
         """Call AI to place the piece.
 
-        This function will call Greedy (easy mode) or Min_MAX (hard mode)
-        function to calculate the location that the AI will place. Then
-        call self.place() function to place the piece.
+        This function will call Greedy (easy mode), Min_MAX (hard mode) or
+        the MCTS engine (MCTS mode) to calculate the location that the AI will
+        place. Then call self.place() function to place the piece.
         
-        Note: In order to let the player realize the AI's decision, we manually
-        delay an amount of time before AI place the piece.
+        Note: The hard AI searches as deep as its game clock allows instead of
+        a fixed depth. The flashing of the decision lets the player realize
+        it, so no extra delay is added.
 
         """
     
+        # the hints would slow down the search of the AI
+        self.hints.set_position(None)
         if self.mode == 1:
             self.location = Greedy(self.current_table, self.side)[0]
-            time.sleep(0.6)
+        elif self.mode == 2:
+            self.clock.start_move()
+            self.location = Timed_Min_Max(self.current_table, self.side,
+                                          self.clock, 60, None,
+                                          self.search_table)[0]
+            self.clock.end_move()
         else:
-            self.location = Min_Max(self.current_table, self.side, 3)[0]
-            time.sleep(0.2)
+            # the search itself takes MCTS_TIME, no need to delay
+            self.location = self.mcts.search_table(self.current_table,
+                                                   self.side)[0]
         
         # flash and show the AI's decision
         for _ in range(6):
@@ -217,6 +445,7 @@ class Game_Model:
             self.side = 1
             
         self.count = Get_Current_Table(self.current_table, file[1:])
+        self.record.start_game(self.current_table, self.side)
         if self.count == 64:
             self.end()
             return
@@ -234,6 +463,7 @@ class Game_Model:
             if flag == False:
                 self.end()
                 return
+            self.record.move([-1, -1])
         
         if self.mode > 0 and self.side == self.AI_side:
             self.AI_place()
@@ -249,9 +479,14 @@ class Game_Model:
 
         """
     
-        current_file = open("Model/current.log", "w")
+        # the autosave thread writes the last condition before it stops
+        self.autosave.save(self.current_table, self.side)
+        self.autosave.close()
+        self.hints.close()
         
-        Write_To_File(self.current_table, self.side, current_file)
+        # the unfinished game stays in the record file without a result
+        self.record.close()
+        self.save_search_table()
         
         self.escape_flag = True
         
@@ -267,13 +502,188 @@ class Game_Model:
         """
     
         time.sleep(0.3)
-        result_file = open("Model/result.log", "w")
+        with open("Model/result.log", "w") as result_file:
+            Write_To_File(self.current_table, self.side, result_file, True)
+        
+        # finish the last autosave
+        self.autosave.close()
+        self.hints.close()
         
-        Write_To_File(self.current_table, self.side, result_file, True)
+        self.record.end_game(self.current_table)
+        self.record.close()
+        self.save_search_table()
         
         self.escape_flag = True
         
         return
+    
+    
+    def save_search_table(self):
+        # Keep the Min_Max results for the next game, a failure only loses them
+        if self.search_table is None:
+            return
+        
+        if SEARCH_TABLE_FILE is not None:
+            try:
+                self.search_table.save(SEARCH_TABLE_FILE)
+            except (IOError, OSError) as error:
+                sys.stderr.write("cannot save the search table: %s\n" % error)
+        self.search_table.close()
+        self.search_table = None
+
+
+class Replay_Model:
+    """Model of the replay mode.
+
+    This class shows the games of a record file move by move. When a game is
+    loaded, the position after every KEYFRAME_INTERVAL moves is stored as a
+    keyframe. Showing any move then replays at most KEYFRAME_INTERVAL - 1
+    moves from the nearest keyframe instead of the whole game, and the view
+    only redraws the squares that changed.
+
+    Attributes:
+        game_view (Replay_View): The corresponding replay view.
+        file_name (str): The record file.
+        game_index (int): Number of the shown game in the record file.
+        moves (bytearray): Move bytes of the shown game.
+        keyframes (list): Position before every KEYFRAME_INTERVAL-th move.
+        ply (int): Number of moves played in the shown position.
+        escape_flag (bool): Whether to end the replay or not.
+
+    """
+
+    def __init__(self, scale, size, file_name, game_index=0):
+        """Initialize the replay model and show the first game.
+
+        Args:
+            scale (int): Side length of the square unit.
+            size (int): Diameter of the piece unit in the game.
+            file_name (str): The record file.
+            game_index (int): Number of the game to show first.
+
+        """
+
+        self.file_name = file_name
+        self.game_view = Replay_View(self, scale, size)
+        self.game_index = -1
+        self.moves = bytearray()
+        self.keyframes = []
+        self.ply = 0
+        self.escape_flag = False
+
+        if not self.load_game(game_index):
+            self.escape_flag = True
+
+
+    def load_game(self, index):
+        """Load a game of the record file and build its keyframes.
+
+        Args:
+            index (int): Number of the game in the record file.
+
+        Returns:
+            Return True if the game exists, otherwise return False.
+
+        """
+
+        if index < 0:
+            return False
+        record = next(itertools.islice(Read_Records(self.file_name), index,
+                                       None), None)
+        if record is None:
+            return False
+
+        self.game_index = index
+        self.moves = bytearray(record.moves)
+        self.keyframes = []
+
+        black, write, side = record.black, record.write, record.side
+        for ply in range(len(self.moves) + 1):
+            if ply % KEYFRAME_INTERVAL == 0:
+                self.keyframes.append(Position(black, write, side))
+            if ply < len(self.moves):
+                black, write, side = self.step(black, write, side,
+                                               self.moves[ply])
+
+        if record.result is None:
+            result = "unfinished"
+        else:
+            result = "black %+d" % record.result
+        self.game_view.set_game("Reversi Game Replay - game %d (%d moves, %s)"
+                                % (index + 1, len(self.moves), result),
+                                len(self.moves))
+        self.ply = -1
+        self.seek(0)
+
+        return True
+
+
+    def step(self, black, write, side, byte):
+        # Play one move byte on the bitboards of both sides
+        square = PASS if byte == PASS_BYTE else byte
+        if side == 1:
+            black, write = Play(black, write, square)
+            return (write, black, -side)
+
+        write, black = Play(write, black, square)
+        return (black, write, -side)
+
+
+    def seek(self, ply):
+        """Show the position after the given number of moves.
+
+        Args:
+            ply (int): Number of moves, limited to the length of the game.
+
+        """
+
+        ply = max(0, min(ply, len(self.moves)))
+        if ply == self.ply:
+            return
+
+        # replay from the nearest keyframe
+        black, write, side = self.keyframes[ply // KEYFRAME_INTERVAL].state()
+        for byte in self.moves[ply - ply % KEYFRAME_INTERVAL:ply]:
+            black, write, side = self.step(black, write, side, byte)
+
+        last_move = -1
+        if ply > 0 and self.moves[ply - 1] != PASS_BYTE:
+            last_move = self.moves[ply - 1]
+
+        self.ply = ply
+        self.game_view.update_cells(black, write, ply, last_move)
+
+
+    def move(self, direction):
+        """Step through the game.
+
+        Args:
+            direction (str): "left" or "right" for one move backward or
+                             forward, "up" or "down" for JUMP_MOVES moves.
+
+        """
+
+        steps = {"left": -1, "right": 1, "up": -JUMP_MOVES,
+                 "down": JUMP_MOVES}
+        self.seek(self.ply + steps[direction])
+
+
+    def place(self):
+        # <Space> shows the next move
+        self.seek(self.ply + 1)
+
+
+    def undo(self):
+        self.seek(self.ply - 1)
+
+
+    def redo(self):
+        self.seek(self.ply + 1)
+
+
+    def escape(self):
+        # Exit the replay mode
+        self.escape_flag = True
 
 
 class Pre_Game_Model:
@@ -290,6 +700,7 @@ class Pre_Game_Model:
         music (bool): Whether to play music during the game.
         mode (int): 1 if the player chooses to play with an easy AI;
                     2 if the player chooses to play with a hard AI;
+                    3 if the player chooses to play with a MCTS AI;
                     0 if the player chooses to play with another player.
         AI_side (int): 1 if AI plays black; -1 if AI plays write. 
         selection_complete (bool): Whether the selection has been completed.
@@ -305,9 +716,7 @@ class Pre_Game_Model:
         self.file_name = "default.log"
         self.selection_complete = False
         
-        pygame.mixer.init()
-        pygame.mixer.music.load("Music/start.mp3")
-        pygame.mixer.music.play(-1)
+        MUSIC.play("Music/start.mp3")
     
     def start_game(self):
         # Get the corresponding variables and start the game.
@@ -317,6 +726,6 @@ class Pre_Game_Model:
         self.music = self.pre_game_view.music.get()
         self.file_name = self.pre_game_view.file_name.get()
         self.selection_complete = True
-        pygame.mixer.music.stop()
+        MUSIC.stop()
         
         
\ No newline at end of file
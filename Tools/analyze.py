@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""analyze.py: Reversi Game Batch Position Analysis.
+
+This program scores every possible location of many positions without the
+game window. The positions are read one by one from a file or the standard
+input in the format of "Model/current.log": a line with the side to play ("B"
+or "W") followed by 8 lines of the board. Blank lines and the result lines of
+"Model/result.log" between the positions are skipped.
+
+The positions are analyzed by a pool of worker processes. At most a fixed
+number of positions is in flight at any time and the results are written in
+the input order as JSON lines, so the memory use does not depend on the size
+of the input.
+
+Example:
+    $ python Tools/analyze.py positions.log --engine minmax:depth=3 -j 4
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import collections
+import json
+import multiprocessing
+from tournament import *
+
+player = None  # player of the current worker process
+
+
+def Read_Positions(stream):
+    """Read the positions from a stream one by one.
+
+    Args:
+        stream (file): File or standard input in the log file format.
+
+    Yields:
+        record (list): The side line followed by up to 8 board lines. A record
+                       at the end of a truncated input can be shorter.
+
+    """
+
+    record = []
+    for line in stream:
+        line = line.strip()
+        if not record:
+            # skip everything until the side line of the next position
+            if line in ("B", "W"):
+                record = [line]
+            continue
+
+        record.append(line)
+        if len(record) == 9:
+            yield record
+            record = []
+
+    if record:
+        yield record
+
+
+def Init_Worker(spec, seed):
+    # Create the player of a worker process
+    global player
+    player = Player(spec, seed)
+
+
+def Analyze_Record(task):
+    """Score every possible location of one position.
+
+    Args:
+        task (tuple): Index of the position and its record.
+
+    Returns:
+        line (str): The result as one JSON line.
+
+    """
+
+    index, record = task
+    result = {"index": index}
+
+    if (len(record) != 9 or
+            any(len(line) != 8 or line.strip("BW*") for line in record[1:])):
+        result["error"] = "invalid position"
+        return json.dumps(result)
+
+    current_table = [[0 for j in range(8)] for i in range(8)]
+    Get_Current_Table(current_table, record[1:])
+    side = 1 if record[0] == "B" else -1
+
+    scores = player.score_moves(current_table, side)
+    result["side"] = record[0]
+    result["board"] = "".join(record[1:])
+    result["moves"] = [{"move": Location_Name(location), "score": score}
+                       for location, score in scores]
+    result["best"] = Location_Name(scores[0][0]) if scores else "pass"
+
+    return json.dumps(result)
+
+
+def Analyze_Stream(stream, output, spec, workers=1, window=0, seed=0):
+    """Analyze all positions of a stream and write the results in order.
+
+    Args:
+        stream (file): Positions in the log file format.
+        output (file): Output of the JSON lines.
+        spec (str): Player specification of the engine.
+        workers (int): Number of worker processes, 1 to analyze in this
+                       process.
+        window (int): Maximum number of positions in flight, 0 for 4 times
+                      the number of workers.
+
+    Returns:
+        count (int): Number of analyzed positions.
+
+    """
+
+    tasks = enumerate(Read_Positions(stream))
+    count = 0
+
+    if workers <= 1:
+        Init_Worker(spec, seed)
+        for task in tasks:
+            output.write(Analyze_Record(task) + "\n")
+            count += 1
+        return count
+
+    window = window or 4 * workers
+    pool = multiprocessing.Pool(workers, Init_Worker, (spec, seed))
+    pending = collections.deque()
+
+    try:
+        for task in tasks:
+            pending.append(pool.apply_async(Analyze_Record, (task,)))
+            # wait for the oldest position before reading more of the input
+            if len(pending) >= window:
+                output.write(pending.popleft().get() + "\n")
+                count += 1
+        while pending:
+            output.write(pending.popleft().get() + "\n")
+            count += 1
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi position analysis")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="positions file, - for the standard input")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSON lines file, - for the standard output")
+    parser.add_argument("-e", "--engine", default="minmax:depth=3",
+                        help="player specification, e.g. mcts:ms=200")
+    parser.add_argument("-j", "--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--window", type=int, default=0,
+                        help="maximum number of positions in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.input == "-" else open(args.input, "r")
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    try:
+        Analyze_Stream(stream, output, args.engine, args.workers,
+                       args.window, args.seed)
+    finally:
+        output.flush()
+        if output is not sys.stdout:
+            output.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+#!/usr/bin/env python
+
+"""benchmark.py: Reversi Game Engine Benchmarks.
+
+This program measures the speed and the strength of the AI engines. Every
+benchmark is a sub-command:
+
+    mcts: playouts per second of the MCTS engine, and its strength against
+          Min_Max when both engines are given the same time per move.
+    probe: cost of the search instrumentation of "instrument.py", measured
+           on Min_Max with the instrumentation off, on and off again.
+    stats: aggregate the JSON lines logs written by the instrumentation,
+           e.g. by "tournament.py --stats".
+    eval: speed of the feature evaluation of "evaluation.py" against the
+          weight matrix, and the strength of Min_Max with each of them.
+    table: searched nodes and time of worker processes that share one
+           search table of "search_table.py", against a table per process
+           and no table. The moves of every position are split among the
+           workers, so the positions reached by several move orders are
+           only searched once with the shared table.
+    sizes: move generation and alpha-beta search of "board_sizes.py" on
+           boards of several sizes, and the 64-bit move generation of
+           "bitboard.py" that the 8*8 engines use.
+    solve: solve a board of another size exactly from the start, e.g. 6*6.
+    check: compare the searches of "board_sizes.py" with a plain minimax
+           without pruning on endgames of boards of several sizes.
+
+Example:
+    $ python Tools/benchmark.py mcts --depth 3 --games 10
+    $ python Tools/benchmark.py stats moves.jsonl
+    $ python Tools/benchmark.py eval --depth 2 --games 20
+    $ python Tools/benchmark.py table --depth 3 --workers 4
+    $ python Tools/benchmark.py sizes --sizes 6 8 10 12 16
+    $ python Tools/benchmark.py solve --size 6
+    $ python Tools/benchmark.py check --sizes 4 8 10 16 --empties 7
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import multiprocessing
+import multiprocessing.util
+import random
+import time
+from tournament import *
+from bitboard import *
+from board_sizes import *
+
+
+def Bench_Playouts(seconds, corners):
+    """Measure the number of random playouts per second.
+
+    Args:
+        seconds (float): Duration of the measurement.
+        corners (bool): Whether to use the corner-first policy.
+
+    Returns:
+        rate (float): Playouts per second from the start condition.
+
+    """
+
+    own, opp = Table_To_Bitboard(Initial_Table(), 1)
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        Random_Playout(own, opp, corners)
+        count += 1
+
+    return count / (time.time() - start)
+
+
+def Bench_MCTS(args):
+    # Playout speed, then MCTS against Min_Max at equal time per move
+    for corners in [False, True]:
+        print("random playouts (corner policy %s): %.0f per second"
+              % (corners, Bench_Playouts(args.seconds, corners)))
+
+    engine = MCTS(ms=int(1000 * args.seconds), batch=args.batch)
+    engine.search_table(Initial_Table(), 1)
+    print("MCTS search (batch %d): %.0f playouts per second"
+          % (args.batch, engine.playouts / engine.elapsed))
+
+    # measure the time Min_Max needs per move in real games
+    minmax = Player("minmax:depth=%d" % args.depth)
+    Run_Match(minmax, Player("greedy"), 2, args.plies, args.seed)
+    ms = max(1, int(1000.0 * minmax.elapsed / minmax.moves))
+    print("Min_Max depth %d: %d ms per move" % (args.depth, ms))
+
+    first = Player("mcts:ms=%d,batch=%d" % (ms, args.batch), args.seed)
+    second = Player("minmax:depth=%d" % args.depth)
+    result = Run_Match(first, second, args.games, args.plies, args.seed)
+    Print_Result(first, second, result)
+
+
+def Time_Min_Max(positions, depth):
+    # Time Min_Max on a list of (table, side) positions
+    start = time.time()
+    for current_table, side in positions:
+        Min_Max(current_table, side, depth)
+
+    return time.time() - start
+
+
+def Bench_Probe(args):
+    # Min_Max time without, with and again without the instrumentation
+    rand = random.Random(args.seed)
+    positions = [Random_Opening(args.plies, rand)
+                 for _ in range(args.positions)]
+
+    Time_Min_Max(positions, args.depth)  # warm up
+    before = Time_Min_Max(positions, args.depth)
+    Enable()
+    PROBE.begin_move()
+    during = Time_Min_Max(positions, args.depth)
+    entry = PROBE.end_move("minmax:depth=%d" % args.depth, 1, [-1, -1])
+    Disable()
+    after = Time_Min_Max(positions, args.depth)
+
+    print("Min_Max depth %d on %d positions: %.3f s" % (args.depth,
+                                                        len(positions),
+                                                        before))
+    print("instrumented: %.3f s (%+.1f%%), %d nodes, %d leaves, "
+          "branching %.2f" % (during, 100.0 * (during / before - 1),
+                             entry["nodes"], entry["leaves"],
+                             entry["branching"]))
+    print("disabled again: %.3f s (%+.1f%%)"
+          % (after, 100.0 * (after / before - 1)))
+
+
+def Bench_Stats(args):
+    # Aggregate the search statistics of JSON lines logs
+    summary = {}
+    for path in args.files:
+        with open(path) as stream:
+            for engine, totals in Read_Summary(stream).items():
+                merged = summary.setdefault(engine, {})
+                for key, value in totals.items():
+                    if key == "max_depth":
+                        merged[key] = max(merged.get(key, 0), value)
+                    else:
+                        merged[key] = merged.get(key, 0) + value
+    Print_Summary(summary)
+
+
+def Bench_Evaluation(args):
+    # Evaluations and Min_Max nodes per second, then a match
+    rand = random.Random(args.seed)
+    positions = [Random_Opening(rand.randint(4, 40), rand)
+                 for _ in range(args.positions)]
+    Build_Edge_Table()
+
+    for name in ["weights", "features"]:
+        evaluation = Get_Evaluation(name)
+        start = time.time()
+        for current_table, side in positions:
+            evaluation(current_table, side)
+        rate = len(positions) / (time.time() - start)
+
+        spec = "minmax:depth=%d,eval=%s" % (args.depth, name)
+        Enable()
+        try:
+            PROBE.begin_move()
+            for current_table, side in positions:
+                Min_Max(current_table, side, args.depth,
+                        Get_Evaluation(name))
+            entry = PROBE.end_move(spec, 1, [-1, -1])
+        finally:
+            Disable()
+        print("%s: %.0f evaluations per second, Min_Max depth %d %.0f nodes "
+              "per second" % (name, rate, args.depth, entry["nps"]))
+
+    first = Player("minmax:depth=%d,eval=features" % args.depth)
+    second = Player("minmax:depth=%d,eval=weights" % args.depth)
+    result = Run_Match(first, second, args.games, args.plies, args.seed)
+    Print_Result(first, second, result)
+
+
+WORKER_TABLE = None  # search table of a worker process
+
+
+def Init_Worker(entries, name):
+    # Create the search table of a worker, attach to the shared one if named
+    global WORKER_TABLE
+    if name is not None:
+        WORKER_TABLE = Shared_Search_Table(entries, name, create=False)
+        # detach when the worker exits, pool workers skip the atexit handlers
+        multiprocessing.util.Finalize(WORKER_TABLE, WORKER_TABLE.close,
+                                      exitpriority=10)
+    elif entries:
+        WORKER_TABLE = Search_Table(entries)
+    else:
+        WORKER_TABLE = None
+
+
+def Search_Task(task):
+    # Search one move of a position, returns (weight, searched nodes, hits)
+    current_table, side, depth = task
+    table = WORKER_TABLE
+    if table is None:
+        return (Min_Max(current_table, side, depth)[1], 0, 0)
+
+    stores, hits = table.stores, table.hits
+    weight = Min_Max(current_table, side, depth, None, table)[1]
+
+    return (weight, table.stores - stores, table.hits - hits)
+
+
+def Run_Workers(tasks, workers, entries, name):
+    # Search the tasks in a pool of worker processes
+    pool = multiprocessing.Pool(workers, Init_Worker, (entries, name))
+    try:
+        start = time.time()
+        results = pool.map(Search_Task, tasks, 1)
+        elapsed = time.time() - start
+    finally:
+        pool.close()
+        pool.join()
+
+    return results, elapsed
+
+
+def Bench_Table(args):
+    # Worker processes without a table, with their own and with a shared one
+    if shared_memory is None:
+        raise SystemExit("the shared search table needs python 3.8 or later")
+
+    rand = random.Random(args.seed)
+    tasks = []
+    for _ in range(args.positions):
+        current_table, side = Random_Opening(rand.randint(4, 30), rand)
+        for x in range(8):
+            for y in range(8):
+                temp_table = [row[:] for row in current_table]
+                if Place_Piece(temp_table, [x, y], side):
+                    tasks.append((temp_table, -side, args.depth - 1))
+
+    shared = Shared_Search_Table(args.entries)
+    try:
+        modes = [("no table", 0, None),
+                 ("table per process", args.entries, None),
+                 ("shared table", args.entries, shared.name)]
+        results = {}
+        for mode, entries, name in modes:
+            results[mode] = Run_Workers(tasks, args.workers, entries, name)
+    finally:
+        shared.close()
+        shared.unlink()
+
+    print("%d moves of %d positions, Min_Max depth %d, %d workers"
+          % (len(tasks), args.positions, args.depth, args.workers))
+    weights = [weight for weight, _, _ in results["no table"][0]]
+    base_nodes = base_time = None
+    for mode, _, _ in modes:
+        items, elapsed = results[mode]
+        line = "%s: %.2f s" % (mode, elapsed)
+        if mode != "no table":
+            nodes = sum(item[1] for item in items)
+            hits = sum(item[2] for item in items)
+            line += ", %d searched nodes, %d hits" % (nodes, hits)
+            if base_nodes is None:
+                base_nodes, base_time = nodes, elapsed
+            else:
+                line += " (%.1f%% fewer nodes, %.2fx speed)" % (
+                    100.0 * (1 - nodes / float(base_nodes)),
+                    base_time / elapsed)
+        if [item[0] for item in items] != weights:
+            line += ", DIFFERENT WEIGHTS"
+        print(line)
+
+
+def Random_Games(games, rand, get_moves, play, own, opp):
+    # Play random games, returns the number of moves
+    moves = 0
+    for _ in range(games):
+        own_bits, opp_bits = own, opp
+        passed = False
+        while True:
+            legal = get_moves(own_bits, opp_bits)
+            if legal == 0:
+                if passed:
+                    break
+                passed = True
+                own_bits, opp_bits = opp_bits, own_bits
+                continue
+            passed = False
+            own_bits, opp_bits = play(own_bits, opp_bits,
+                                      rand.choice(Squares(legal)))
+            moves += 1
+
+    return moves
+
+
+def Bench_Sizes(args):
+    # Move generation and search speed on boards of several sizes
+    print("size   moves per second   nodes per second   ms per search")
+    for size in args.sizes:
+        board = Board(size)
+        rand = random.Random(args.seed)
+        start = time.time()
+        moves = Random_Games(args.games, rand, board.get_moves, board.play,
+                             *board.start())
+        move_rate = moves / (time.time() - start)
+
+        # positions after random openings of a tenth of the squares
+        positions = []
+        for _ in range(args.positions):
+            own, opp = board.start()
+            for _ in range(board.squares // 10):
+                legal = board.get_moves(own, opp)
+                if legal == 0:
+                    break
+                own, opp = board.play(own, opp, rand.choice(Squares(legal)))
+            positions.append((own, opp))
+        board.nodes = 0
+        start = time.time()
+        for own, opp in positions:
+            board.search(own, opp, args.depth)
+        elapsed = time.time() - start
+        print("%2dx%-2d  %16.0f   %16.0f   %13.1f"
+              % (size, size, move_rate, board.nodes / elapsed,
+                 1000.0 * elapsed / len(positions)))
+
+    # the fixed 64-bit move generator of the 8*8 engines
+    rand = random.Random(args.seed)
+    start = time.time()
+    moves = Random_Games(args.games, rand, Get_Moves, Play,
+                         *Table_To_Bitboard(Initial_Table(), 1))
+    print("8x8 bitboard.py: %.0f moves per second"
+          % (moves / (time.time() - start)))
+
+
+def Plain_Score(board, own, opp):
+    # Final piece difference with perfect play, searched without pruning
+    moves = board.get_moves(own, opp)
+    if moves == 0:
+        if board.get_moves(opp, own) == 0:
+            return Count(own) - Count(opp)
+        return -Plain_Score(board, opp, own)
+
+    return max(-Plain_Score(board, *board.play(own, opp, square))
+               for square in Squares(moves))
+
+
+def Check_Sizes(args):
+    # Compare search, solve and solve_move with Plain_Score on endgames
+    for size in args.sizes:
+        board = Board(size)
+        rand = random.Random(args.seed)
+        largest = 0
+        for index in range(args.positions):
+            # one side plays the moves that flip the most pieces and the
+            # other one the fewest, so that the endgames are lost by a
+            # large difference, by the side to play in every other one
+            own, opp = board.start()
+            greedy = index % 2
+            while board.squares - Count(own | opp) > args.empties:
+                legal = board.get_moves(own, opp)
+                if legal == 0:
+                    if board.get_moves(opp, own) == 0:
+                        break
+                    own, opp = opp, own
+                    greedy = 1 - greedy
+                    continue
+                squares = Squares(legal)
+                rand.shuffle(squares)
+                flips = [Count(board.get_flips(own, opp, square))
+                         for square in squares]
+                square = squares[flips.index(max(flips) if greedy else
+                                             min(flips))]
+                own, opp = board.play(own, opp, square)
+                greedy = 1 - greedy
+
+            score = Plain_Score(board, own, opp)
+            square, solved = board.solve_move(own, opp)
+            results = (board.search(own, opp, board.squares)[1],
+                       board.solve(own, opp), solved)
+            if results != (1000 * score, score, score) or (
+                    square != PASS and -Plain_Score(
+                        board, *board.play(own, opp, square)) != score):
+                raise RuntimeError("%dx%d: %s instead of %d for the position "
+                                   "%x %x" % (size, size, results, score, own,
+                                              opp))
+            largest = max(largest, abs(score))
+        print("%2dx%-2d  %d endgames with %d empties agree, largest "
+              "difference %d" % (size, size, args.positions, args.empties,
+                                 largest))
+
+
+def Bench_Solve(args):
+    # Solve a board exactly from the start
+    board = Board(args.size)
+    own, opp = board.start()
+    start = time.time()
+    square, score = board.solve_move(own, opp, Search_Table(args.entries))
+    elapsed = time.time() - start
+    print("%dx%d: %s with perfect play, the black side scores %+d, best "
+          "first move %s" % (args.size, args.size, "black wins" if score > 0
+                             else "write wins" if score < 0 else "draw",
+                             score, board.location(square)))
+    print("%d nodes in %.1f s, %.0f nodes per second"
+          % (board.nodes, elapsed, board.nodes / max(elapsed, 1e-9)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi engine benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    command = commands.add_parser("mcts", help="MCTS speed and strength")
+    command.add_argument("--depth", type=int, default=3,
+                         help="depth of the Min_Max opponent")
+    command.add_argument("--games", type=int, default=10)
+    command.add_argument("--batch", type=int, default=1)
+    command.add_argument("--plies", type=int, default=4)
+    command.add_argument("--seconds", type=float, default=2.0)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Bench_MCTS)
+
+    command = commands.add_parser("probe", help="instrumentation overhead")
+    command.add_argument("--depth", type=int, default=2)
+    command.add_argument("--positions", type=int, default=20)
+    command.add_argument("--plies", type=int, default=10)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Bench_Probe)
+
+    command = commands.add_parser("eval", help="feature evaluation")
+    command.add_argument("--depth", type=int, default=2)
+    command.add_argument("--positions", type=int, default=200)
+    command.add_argument("--games", type=int, default=20)
+    command.add_argument("--plies", type=int, default=4)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Bench_Evaluation)
+
+    command = commands.add_parser("table", help="shared search table")
+    command.add_argument("--depth", type=int, default=3)
+    command.add_argument("--positions", type=int, default=10)
+    command.add_argument("--workers", type=int, default=2)
+    command.add_argument("--entries", type=int, default=1 << 20)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Bench_Table)
+
+    command = commands.add_parser("sizes", help="speed on other board sizes")
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[6, 8, 10, 12, 16])
+    command.add_argument("--depth", type=int, default=3)
+    command.add_argument("--games", type=int, default=20)
+    command.add_argument("--positions", type=int, default=10)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Bench_Sizes)
+
+    command = commands.add_parser("solve", help="exact solution of a board")
+    command.add_argument("--size", type=int, default=6)
+    command.add_argument("--entries", type=int, default=1 << 24)
+    command.set_defaults(run=Bench_Solve)
+
+    command = commands.add_parser("check", help="check the searches of other "
+                                  "board sizes")
+    command.add_argument("--sizes", type=int, nargs="+",
+                         default=[4, 6, 8, 10, 12, 16])
+    command.add_argument("--empties", type=int, default=7)
+    command.add_argument("--positions", type=int, default=10)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Check_Sizes)
+
+    command = commands.add_parser("stats", help="aggregate search logs")
+    command.add_argument("files", nargs="+", help="JSON lines logs")
+    command.set_defaults(run=Bench_Stats)
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+    else:
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
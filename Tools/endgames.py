@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+"""endgames.py: Reversi Game Endgame Database Tool.
+
+This program works on the endgame databases of "endgame.py":
+
+    load: solve the endgame positions of the games of a record file and
+          store their results, e.g. after a self-play run.
+    bench: solve a suite of endgame positions without a database and twice
+           with one, and report the speedup of the repeated suite.
+    compact: remove the results of the positions with few empty squares,
+             which are solved quickly anyway, and shrink the file.
+    stats: count the stored results by the number of empty squares.
+
+Example:
+    $ python Tools/endgames.py load games.rec endgame.db --empties 12
+    $ python Tools/endgames.py bench games.rec --empties 10 --positions 50
+    $ python Tools/endgames.py compact endgame.db --min-empties 8
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import os
+import tempfile
+import time
+from tournament import *
+from endgame import *
+
+
+def Endgame_Positions(path, empties, limit=0):
+    """Collect the positions of the games of a record file.
+
+    Args:
+        path (str): The record file.
+        empties (int): Number of empty squares of the positions.
+        limit (int): Most positions to collect, 0 for all.
+
+    Returns:
+        positions (list): (own, opp) of the first position of every game
+                          with the given number of empty squares and a
+                          legal move, in the order of the games.
+
+    """
+
+    positions = []
+    for record in Read_Records(path):
+        for own, opp, side, square in Replay(record):
+            if 64 - Count(own | opp) == empties and Get_Moves(own, opp):
+                positions.append((own, opp))
+                break
+        if limit and len(positions) >= limit:
+            break
+
+    return positions
+
+
+def File_Size(path):
+    # Size of a database file with its write-ahead log
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal")
+               if os.path.exists(path + suffix))
+
+
+def Solve_Suite(positions, database=None):
+    # Solve a list of positions, returning the scores and the time
+    start = time.time()
+    scores = [Solve(own, opp, database=database) for own, opp in positions]
+    if database is not None:
+        database.commit()
+
+    return (scores, time.time() - start)
+
+
+def Load(args):
+    # Solve the endgame positions of a record file into a database
+    positions = Endgame_Positions(args.records, args.empties, args.games)
+    database = Endgame_Database(args.database, args.min_empties)
+    try:
+        scores, elapsed = Solve_Suite(positions, database)
+        print("%d positions with %d empties solved in %.1f s, %d results "
+              "inserted, %d found" % (len(positions), args.empties, elapsed,
+                                      database.inserts, database.hits))
+    finally:
+        database.close()
+
+
+def Bench(args):
+    # Compare the suite without a database, cold and repeated
+    positions = Endgame_Positions(args.records, args.empties,
+                                  args.positions)
+    if not positions:
+        print("no positions with %d empties" % args.empties)
+        return
+    path = args.database
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        os.remove(path)
+
+    try:
+        scores, plain = Solve_Suite(positions)
+        database = Endgame_Database(path, args.min_empties)
+        cold_scores, cold = Solve_Suite(positions, database)
+        inserts = database.inserts
+        database.hits = database.misses = 0
+        warm_scores, warm = Solve_Suite(positions, database)
+        hits = database.hits
+        database.close()
+    finally:
+        if args.database is None:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    if cold_scores != scores or warm_scores != scores:
+        raise RuntimeError("the database changed the results")
+    n = len(positions)
+    print("%d positions with %d empties" % (n, args.empties))
+    print("no database: %.1f ms per position" % (1000.0 * plain / n))
+    print("cold database: %.1f ms per position, %d results inserted"
+          % (1000.0 * cold / n, inserts))
+    print("repeated suite: %.2f ms per position, %d lookups found, "
+          "%.0fx faster" % (1000.0 * warm / n, hits,
+                            plain / max(warm, 1e-9)))
+
+
+def Compact(args):
+    # Remove the cheap results and shrink the database file
+    size = File_Size(args.database)
+    database = Endgame_Database(args.database)
+    try:
+        removed = database.compact(args.min_empties)
+        left = sum(database.count().values())
+    finally:
+        database.close()
+    print("%d results removed, %d left, %d -> %d bytes"
+          % (removed, left, size, File_Size(args.database)))
+
+
+def Stats(args):
+    # Count the stored results by the number of empty squares
+    database = Endgame_Database(args.database)
+    try:
+        counts = database.count()
+    finally:
+        database.close()
+    for empties in sorted(counts):
+        print("%2d empties: %d results" % (empties, counts[empties]))
+    print("total: %d results, %d bytes"
+          % (sum(counts.values()), File_Size(args.database)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi endgame database")
+    commands = parser.add_subparsers(dest="command")
+
+    command = commands.add_parser("load", help="solve the endgames of a "
+                                  "record file into a database")
+    command.add_argument("records")
+    command.add_argument("database")
+    command.add_argument("--empties", type=int, default=12)
+    command.add_argument("--games", type=int, default=0,
+                         help="most games to solve, 0 for all")
+    command.add_argument("--min-empties", type=int, default=DB_MIN_EMPTIES)
+    command.set_defaults(run=Load)
+
+    command = commands.add_parser("bench", help="measure the speedup on a "
+                                  "repeated endgame suite")
+    command.add_argument("records")
+    command.add_argument("--database", help="keep the results in this file")
+    command.add_argument("--empties", type=int, default=10)
+    command.add_argument("--positions", type=int, default=50)
+    command.add_argument("--min-empties", type=int, default=DB_MIN_EMPTIES)
+    command.set_defaults(run=Bench)
+
+    command = commands.add_parser("compact", help="remove the cheap results "
+                                  "and shrink the file")
+    command.add_argument("database")
+    command.add_argument("--min-empties", type=int, default=DB_MIN_EMPTIES)
+    command.set_defaults(run=Compact)
+
+    command = commands.add_parser("stats", help="count the stored results")
+    command.add_argument("database")
+    command.set_defaults(run=Stats)
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+    else:
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,553 @@
+#!/usr/bin/env python
+
+"""engine.py: Reversi Game Text Engine Protocol.
+
+This program runs an AI engine as a long-running process that reads commands
+from the standard input and writes the responses to the standard output, in
+the style of the Go Text Protocol (GTP). Every command is one line, it may
+start with a numeric id. Every response starts with "=" (success) or "?"
+(failure) followed by the id, and ends with an empty line. While searching,
+the engine writes "info" lines before the response.
+
+Commands:
+    name, version, protocol_version, list_commands
+    engine <spec>             select the engine, e.g. minmax:depth=4
+    new                       start from the default start condition
+    position <B|W> <board>    set the position, 64 characters of "*", "B"
+                              and "W" in the order of the log files
+    play <move>               play a move for the side to play, e.g. d3
+    moves                     list the possible locations
+    show                      show the position in the log file format
+    go [ms N] [nodes N] [depth N]
+                              search and return the best move and its score
+    analyze [ms N] [nodes N] [depth N]
+                              score every possible location
+    clear_cache               forget the results of the previous searches
+    quit
+
+The engine keeps the MCTS search tree and the Min_Max results between the
+commands, so repeated queries of the same or following positions are cheap.
+With the "cache" option, e.g. "minmax:depth=4,cache=search.tbl", the Min_Max
+results are also saved when the engine is replaced or quits, and reused by
+the next session.
+The Engine_Process and Engine_Pool classes start and drive engine processes
+for harnesses written in python.
+
+Example:
+    $ python Tools/engine.py
+    engine minmax:depth=3
+    =
+
+    go
+    info depth 0 best c4 score 4 time 0
+    ...
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from tournament import *
+from position import *
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+VERSION = "1.0"
+CACHE_SIZE = 100000  # maximum number of cached Min_Max results
+
+COMMANDS = ["name", "version", "protocol_version", "list_commands", "engine",
+            "new", "position", "play", "moves", "show", "go", "analyze",
+            "clear_cache", "quit"]
+
+
+class Engine_Error(Exception):
+    # A command that cannot be executed, reported as a "?" response
+    pass
+
+
+class Engine:
+    """State of a running text engine.
+
+    Attributes:
+        output (file): Stream of the responses and progress lines.
+        player (Player): The selected engine.
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): 1 if it is the black side to play, -1 if it is the
+                    write side to play.
+        cache (dict): Min_Max scores of the searched positions, keyed by the
+                      Position, the depth and the evaluation.
+
+    """
+
+    def __init__(self, output, spec="minmax:depth=3"):
+        self.output = output
+        self.player = Player(spec)
+        self.current_table = Initial_Table()
+        self.side = 1
+        self.cache = {}
+
+
+    def info(self, text):
+        # Write a progress line immediately
+        self.output.write("info " + text + "\n")
+        self.output.flush()
+
+
+    def execute(self, line):
+        """Execute one command line.
+
+        Args:
+            line (str): The command line.
+
+        Returns:
+            response (str): The response, including the empty last line, or
+                            None when the engine should quit.
+
+        """
+
+        words = line.split()
+        command_id = ""
+        if words and words[0].isdigit():
+            command_id = words.pop(0)
+        if not words:
+            return ""
+
+        command, args = words[0], words[1:]
+        if command == "quit":
+            return None
+
+        try:
+            if command not in COMMANDS:
+                raise Engine_Error("unknown command")
+            result = getattr(self, "do_" + command)(args)
+        except Engine_Error as error:
+            return "?%s %s\n\n" % (command_id, error)
+
+        if result:
+            return "=%s %s\n\n" % (command_id, result)
+
+        return "=%s\n\n" % command_id
+
+
+    def do_name(self, args):
+        return "reversi"
+
+
+    def do_version(self, args):
+        return VERSION
+
+
+    def do_protocol_version(self, args):
+        return "1"
+
+
+    def do_list_commands(self, args):
+        return "\n".join(COMMANDS)
+
+
+    def do_engine(self, args):
+        # Select a new engine, the cache of the old one is kept
+        if len(args) != 1:
+            raise Engine_Error("engine needs a player specification")
+        try:
+            player = Player(args[0])
+        except (ValueError, TypeError) as error:
+            raise Engine_Error(str(error))
+        self.player.close()
+        self.player = player
+
+
+    def do_new(self, args):
+        self.current_table = Initial_Table()
+        self.side = 1
+
+
+    def do_position(self, args):
+        # Set the position from the side and the 64 board characters
+        if (len(args) != 2 or args[0] not in ("B", "W") or
+                len(args[1]) != 64 or args[1].strip("BW*")):
+            raise Engine_Error("position needs B|W and 64 board characters")
+
+        board = args[1]
+        Get_Current_Table(self.current_table,
+                          [board[i * 8:i * 8 + 8] for i in range(8)])
+        self.side = 1 if args[0] == "B" else -1
+
+
+    def available_locations(self):
+        # List the possible locations of the side to play
+        return [[x, y] for x in range(8) for y in range(8)
+                if Check_Location(self.current_table, self.side, x, y)]
+
+
+    def do_play(self, args):
+        if len(args) != 1:
+            raise Engine_Error("play needs a move")
+        location = Parse_Location(args[0])
+        if location is None:
+            raise Engine_Error("invalid move")
+
+        if location[0] < 0:
+            if self.available_locations():
+                raise Engine_Error("illegal move")
+        elif not Place_Piece(self.current_table, location, self.side):
+            raise Engine_Error("illegal move")
+        self.side = -self.side
+
+
+    def do_moves(self, args):
+        locations = self.available_locations()
+        if not locations:
+            return "pass"
+
+        return " ".join(Location_Name(location) for location in locations)
+
+
+    def do_show(self, args):
+        symbols = {0: "*", 1: "B", -1: "W"}
+        lines = ["B" if self.side == 1 else "W"]
+        for y in range(8):
+            lines.append("".join(symbols[self.current_table[x][y]]
+                                 for x in range(8)))
+
+        return "\n".join(lines)
+
+
+    def do_clear_cache(self, args):
+        self.cache.clear()
+        if self.player.engine is not None:
+            self.player.engine.reset()
+
+
+    def parse_limits(self, args):
+        # Parse the "ms N", "nodes N" and "depth N" search limits
+        limits = {}
+        if len(args) % 2:
+            raise Engine_Error("limits are given as name-value pairs")
+        for name, value in zip(args[::2], args[1::2]):
+            # only the depth may be 0, a time or node budget of 0 never ends
+            if (name not in ("ms", "nodes", "depth") or not value.isdigit() or
+                    name != "depth" and int(value) == 0):
+                raise Engine_Error("invalid limit %s %s" % (name, value))
+            limits[name] = int(value)
+        if "depth" in limits and self.player.engine is not None:
+            raise Engine_Error("%s has no depth limit" % self.player.name)
+
+        return limits
+
+
+    def score_min_max(self, depth, evaluation=None):
+        # Score every location with Min_Max, reusing the cached results
+        key = (Table_To_Position(self.current_table, self.side), depth,
+               self.player.options["eval"])
+        scores = self.cache.get(key)
+        if scores is None:
+            if evaluation is None:
+                evaluation = self.player.evaluation()
+            scores = Score_Moves(self.current_table, self.side, depth,
+                                 evaluation, self.player.table)
+            scores.sort(key=lambda item: -item[1])
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = scores
+
+        return scores
+
+
+    def search(self, limits):
+        """Search the current position within the limits.
+
+        Min_Max and Greedy search with iterative deepening, one info line per
+        depth. Without a depth limit, Min_Max deepens until the "ms" or
+        "nodes" limit is reached, or up to the depth option if neither is
+        given. A time limit stops the deepening when the next depth is not
+        expected to finish in time, and both limits abort the running depth
+        and keep the result of the last finished one. The "nodes" limit
+        counts the evaluated positions, the depth 0 search is never aborted
+        so there is always a best location. MCTS writes an info line every
+        progress interval.
+
+        Args:
+            limits (dict): Search limits "ms", "nodes" and "depth".
+
+        Returns:
+            scores (list): (location, score) of every possible location, the
+                           best location first.
+
+        """
+
+        start = time.time()
+        player = self.player
+
+        if player.engine is None:
+            empties = sum(row.count(0) for row in self.current_table)
+            if player.name == "greedy":
+                max_depth = 0
+            elif "depth" in limits:
+                max_depth = limits["depth"]
+            elif "ms" in limits or "nodes" in limits:
+                # depth d looks d + 1 moves ahead
+                max_depth = max(0, empties - 1)
+            else:
+                max_depth = player.options["depth"]
+            evaluation = player.evaluation()
+            evaluated = [0]
+
+            def limited_evaluation(table, side):
+                # Evaluate a table unless a limit of the search is reached
+                evaluated[0] += 1
+                if ("nodes" in limits and evaluated[0] > limits["nodes"] or
+                        "ms" in limits and
+                        time.time() - start > limits["ms"] / 1000.0):
+                    raise Search_Timeout()
+                return evaluation(table, side)
+
+            scores = []
+            for depth in range(max_depth + 1):
+                depth_start = time.time()
+                try:
+                    scores = self.score_min_max(
+                        depth, evaluation if depth == 0 else
+                        limited_evaluation)
+                except Search_Timeout:
+                    break
+                now = time.time()
+                if scores:
+                    self.info("depth %d best %s score %d time %d"
+                              % (depth, Location_Name(scores[0][0]),
+                                 scores[0][1], 1000 * (now - start)))
+                # the next depth takes several times longer than this one
+                if ("ms" in limits and
+                        (now - start) + 6 * (now - depth_start) >
+                        limits["ms"] / 1000.0):
+                    break
+            return scores
+
+        engine = player.engine
+        saved = (engine.ms, engine.nodes)
+        if "ms" in limits or "nodes" in limits:
+            engine.ms = limits.get("ms", 0)
+            engine.nodes = limits.get("nodes", 0)
+
+        def progress(engine, playouts, elapsed):
+            move, value = engine.best_move()
+            self.info("playouts %d best %s winrate %.3f time %d"
+                      % (playouts, Location_Name(Location(move)), value,
+                         1000 * elapsed))
+
+        engine.progress = progress
+        try:
+            engine.search_table(self.current_table, self.side)
+        finally:
+            engine.progress = None
+            engine.ms, engine.nodes = saved
+
+        self.info("playouts %d time %d"
+                  % (engine.playouts, 1000 * engine.elapsed))
+
+        return [(Location(move), value)
+                for move, visits, value in engine.root_moves()]
+
+
+    def do_go(self, args):
+        scores = self.search(self.parse_limits(args))
+        if not scores:
+            return "pass"
+
+        return "%s %s" % (Location_Name(scores[0][0]), scores[0][1])
+
+
+    def do_analyze(self, args):
+        scores = self.search(self.parse_limits(args))
+
+        return " ".join("%s %s" % (Location_Name(location), score)
+                        for location, score in scores)
+
+
+def Run_Engine(stream, output, spec="minmax:depth=3"):
+    """Read commands until "quit" or the end of the input.
+
+    Args:
+        stream (file): Input of the commands.
+        output (file): Output of the responses.
+        spec (str): Player specification of the initial engine.
+
+    """
+
+    engine = Engine(output, spec)
+    try:
+        while True:
+            line = stream.readline()
+            if not line:
+                break
+            response = engine.execute(line.strip())
+            if response is None:
+                output.write("=\n\n")
+                output.flush()
+                break
+            output.write(response)
+            output.flush()
+    finally:
+        engine.player.close()
+
+
+class Engine_Process:
+    """A text engine running in a child process.
+
+    Attributes:
+        process (subprocess.Popen): The engine process.
+
+    """
+
+    def __init__(self, spec="minmax:depth=3"):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--engine", spec],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, bufsize=1)
+
+
+    def send(self, command, progress=None):
+        """Send a command and wait for its response.
+
+        Args:
+            command (str): The command line without the id.
+            progress (function): Called with every info line, None to
+                                 ignore them.
+
+        Returns:
+            result (str): The response text after "=".
+
+        Raises:
+            Engine_Error: The engine answered with "?".
+
+        """
+
+        self.process.stdin.write(command + "\n")
+        self.process.stdin.flush()
+
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise Engine_Error("engine process exited")
+            line = line.rstrip("\n")
+            if not lines and line.startswith("info "):
+                if progress is not None:
+                    progress(line[5:])
+                continue
+            if line == "" and lines:
+                break
+            if line != "" or lines:
+                lines.append(line)
+
+        response = "\n".join(lines)
+        if response.startswith("?"):
+            raise Engine_Error(response[1:].strip())
+
+        return response[1:].strip()
+
+
+    def close(self):
+        # Ask the engine to quit and wait for the process
+        try:
+            self.send("quit")
+        except (Engine_Error, IOError, OSError):
+            pass
+        self.process.wait()
+
+
+class Engine_Pool:
+    """A pool of engine processes shared by several harness threads.
+
+    Attributes:
+        engines (list): All engine processes.
+        idle (queue.Queue): Engine processes that are not in use.
+
+    """
+
+    def __init__(self, size, spec="minmax:depth=3"):
+        self.engines = [Engine_Process(spec) for _ in range(size)]
+        self.idle = queue.Queue()
+        for engine in self.engines:
+            self.idle.put(engine)
+
+
+    def run(self, commands):
+        """Run a list of commands on one idle engine.
+
+        Args:
+            commands (list): Command lines, e.g. a position and a search.
+
+        Returns:
+            results (list): The response of every command.
+
+        """
+
+        engine = self.idle.get()
+        try:
+            return [engine.send(command) for command in commands]
+        finally:
+            self.idle.put(engine)
+
+
+    def map(self, jobs):
+        """Run many command lists on all engines in parallel.
+
+        Args:
+            jobs (list): Lists of command lines.
+
+        Returns:
+            results (list): The responses of every job in the input order.
+
+        """
+
+        results = [None] * len(jobs)
+        tasks = queue.Queue()
+        for index, commands in enumerate(jobs):
+            tasks.put((index, commands))
+
+        def work():
+            while True:
+                try:
+                    index, commands = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                results[index] = self.run(commands)
+
+        threads = [threading.Thread(target=work) for _ in self.engines]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+
+    def close(self):
+        for engine in self.engines:
+            engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi text engine")
+    parser.add_argument("--engine", default="minmax:depth=3",
+                        help="initial player specification")
+    args = parser.parse_args()
+
+    Run_Engine(sys.stdin, sys.stdout, args.engine)
+
+
+if __name__ == "__main__":
+    main()
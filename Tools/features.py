@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+
+"""features.py: Reversi Game Training Data Extraction.
+
+This program turns the game record files of "record.py" into NumPy arrays to
+train evaluation models. The games are streamed through a chain of
+generators, so archives larger than the memory can be converted:
+
+    Positions       replays the finished games on the compact representation
+                    of "bitboard.py" and yields every position with a move
+    Batches         groups the positions into chunks of a fixed size
+    Encode_Batch    converts a chunk to feature planes and targets
+    Augment         adds the 7 rotated and mirrored copies of every position
+    Write_Chunks    saves every chunk as numbered .npy files
+
+For every position the arrays are:
+
+    features (uint8, N*3*8*8)   planes of the pieces of the side to play, the
+                                pieces of the other side and the possible
+                                locations, indexed [plane][x][y]
+    moves (int8, N)             x * 8 + y of the played move
+    values (int8, N)            final piece count of the side to play minus
+                                the other side
+
+Load_Chunks opens the saved chunks memory-mapped, so a training loop only
+reads the pages it uses. This program needs NumPy.
+
+Example:
+    $ python Tools/features.py Model/games.rec -o /tmp/data --augment
+    $ python Tools/features.py a.rec b.rec -o /tmp/data --chunk 100000
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import glob
+import itertools
+import os
+import sys
+import time
+from tournament import *
+from bitboard import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the 8 symmetries of the board as (transpose, flip x, flip y), applied to
+# arrays whose last two axes are x and y
+SYMMETRIES = list(itertools.product([False, True], repeat=3))
+
+
+def Positions(paths):
+    """Replay the finished games of record files.
+
+    Args:
+        paths (list): The record files.
+
+    Yields:
+        own (int): Pieces of the side to play.
+        opp (int): Pieces of the other side.
+        moves (int): Possible locations of the side to play.
+        square (int): Bit index of the played move.
+        value (int): Final piece count of the side to play minus the other
+                     side.
+
+    """
+
+    for path in paths:
+        for record in Read_Records(path):
+            # an unfinished game has no target value
+            if record.result is None:
+                continue
+            for own, opp, side, square in Replay(record):
+                if square != PASS:
+                    yield (own, opp, Get_Moves(own, opp), square,
+                           record.result * side)
+
+
+def Batches(positions, size):
+    # Group the positions into lists of at most size positions
+    batch = []
+    for position in positions:
+        batch.append(position)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def Bitboard_Planes(bitboards):
+    """Convert bitboards to 8*8 planes.
+
+    Args:
+        bitboards (numpy.ndarray): 64-bit boards of any shape.
+
+    Returns:
+        planes (numpy.ndarray): uint8 array of the same shape plus the x and
+                                y axes, bit x * 8 + y becomes [x][y].
+
+    """
+
+    data = numpy.ascontiguousarray(bitboards, dtype="<u8")
+    bits = numpy.unpackbits(data.view(numpy.uint8), bitorder="little")
+
+    return bits.reshape(data.shape + (8, 8))
+
+
+def Encode_Batch(batch):
+    """Convert a batch of positions to feature planes and targets.
+
+    Args:
+        batch (list): Positions yielded by Positions.
+
+    Returns:
+        features (numpy.ndarray): uint8 array of N*3*8*8 planes.
+        moves (numpy.ndarray): int8 array of the N played moves.
+        values (numpy.ndarray): int8 array of the N final piece differences.
+
+    """
+
+    own, opp, legal, squares, values = zip(*batch)
+    bitboards = numpy.array([own, opp, legal], dtype="<u8").T
+    features = Bitboard_Planes(bitboards)
+
+    return (features, numpy.array(squares, dtype=numpy.int8),
+            numpy.array(values, dtype=numpy.int8))
+
+
+def Transform(planes, symmetry):
+    # Apply a symmetry to the last two axes (x, y) of an array
+    transpose, flip_x, flip_y = symmetry
+    if transpose:
+        planes = numpy.swapaxes(planes, -1, -2)
+    if flip_x:
+        planes = planes[..., ::-1, :]
+    if flip_y:
+        planes = planes[..., :, ::-1]
+
+    return planes
+
+
+def Augment(features, moves, values):
+    """Add the rotated and mirrored copies of every position.
+
+    Args:
+        features (numpy.ndarray): N*3*8*8 feature planes.
+        moves (numpy.ndarray): The N played moves.
+        values (numpy.ndarray): The N final piece differences.
+
+    Returns:
+        features (numpy.ndarray): 8N*3*8*8 feature planes, the symmetries of
+                                  a position are N positions apart.
+        moves (numpy.ndarray): The 8N moves on the transformed boards.
+        values (numpy.ndarray): The 8N final piece differences.
+
+    """
+
+    squares = numpy.arange(64).reshape(8, 8)
+    all_features = []
+    all_moves = []
+    for symmetry in SYMMETRIES:
+        all_features.append(Transform(features, symmetry))
+        # the square that ends up at [x][y] came from squares[x][y]
+        mapping = numpy.empty(64, dtype=numpy.int8)
+        mapping[Transform(squares, symmetry).ravel()] = numpy.arange(64)
+        all_moves.append(mapping[moves])
+
+    return (numpy.ascontiguousarray(numpy.concatenate(all_features)),
+            numpy.concatenate(all_moves),
+            numpy.tile(values, len(SYMMETRIES)))
+
+
+def Write_Chunks(batches, output, augment=False, report=5.0):
+    """Encode the batches and save every chunk as numbered .npy files.
+
+    Args:
+        batches (iterator): Batches of positions.
+        output (str): Output directory, created if needed.
+        augment (bool): Whether to add the symmetries of every position.
+        report (float): Seconds between the throughput reports, 0 for none.
+
+    Returns:
+        count (int): Number of saved positions.
+
+    """
+
+    if not os.path.isdir(output):
+        os.makedirs(output)
+
+    count = chunks = 0
+    start = last_report = time.time()
+    for batch in batches:
+        features, moves, values = Encode_Batch(batch)
+        if augment:
+            features, moves, values = Augment(features, moves, values)
+        for name, data in [("features", features), ("moves", moves),
+                           ("values", values)]:
+            numpy.save(os.path.join(output, "%s_%05d.npy" % (name, chunks)),
+                       data)
+        chunks += 1
+        count += len(values)
+
+        now = time.time()
+        if report and now - last_report >= report:
+            sys.stderr.write("%d positions, %.0f positions per second\n"
+                             % (count, count / (now - start)))
+            last_report = now
+
+    return count
+
+
+def Load_Chunks(output):
+    """Open the saved chunks without reading them.
+
+    Args:
+        output (str): Directory written by Write_Chunks.
+
+    Returns:
+        chunks (list): (features, moves, values) memory-mapped arrays of
+                       every chunk.
+
+    """
+
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(output, "features_*.npy"))):
+        number = path[-9:-4]
+        chunks.append(tuple(
+            numpy.load(os.path.join(output, "%s_%s.npy" % (name, number)),
+                       mmap_mode="r")
+            for name in ["features", "moves", "values"]))
+
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi training data")
+    parser.add_argument("records", nargs="+", help="game record files")
+    parser.add_argument("-o", "--output", required=True,
+                        help="directory of the .npy chunks")
+    parser.add_argument("--chunk", type=int, default=65536,
+                        help="positions per chunk before augmentation")
+    parser.add_argument("--augment", action="store_true",
+                        help="add the 8 symmetries of every position")
+    parser.add_argument("--report", type=float, default=5.0,
+                        help="seconds between the throughput reports")
+    args = parser.parse_args()
+
+    if numpy is None:
+        sys.exit("features.py needs NumPy")
+
+    start = time.time()
+    count = Write_Chunks(Batches(Positions(args.records), args.chunk),
+                         args.output, args.augment, args.report)
+    elapsed = max(time.time() - start, 1e-9)
+    print("%d positions in %.1f s, %.0f positions per second"
+          % (count, elapsed, count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""load_client.py: Reversi Game Server Load Generator.
+
+This program plays many games at the same time against the AI of
+"server.py" and measures the number of moves per second and the latency of
+the requests. The human side of every game plays random moves. The games are
+shared by a few connections, and every connection sends the requests of its
+games without waiting for the other responses. A finished game is replaced
+by a new one until the time is over.
+
+This program needs python 3.7 or later.
+
+Example:
+    $ python3 Tools/load_client.py --port 7700 --games 1000 --duration 30
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+
+class Connection:
+    """A client connection that matches the responses by request id.
+
+    Attributes:
+        reader (asyncio.StreamReader): Response stream.
+        writer (asyncio.StreamWriter): Request stream.
+        pending (dict): Futures of the requests waiting for a response.
+        latencies (list): Latency of every request in seconds.
+
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.latencies = []
+        self.receiver = asyncio.ensure_future(self.receive())
+
+
+    async def receive(self):
+        # Hand every response to the request that is waiting for it
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("server closed"))
+
+
+    async def request(self, **request):
+        # Send a request and wait for its response
+        request["id"] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request["id"]] = future
+        start = time.time()
+        self.writer.write((json.dumps(request) + "\n").encode())
+        await self.writer.drain()
+        response = await future
+        self.latencies.append(time.time() - start)
+
+        return response
+
+
+async def Play_Games(connection, args, deadline, counters, rand):
+    # Play games one after another until the deadline
+    while time.time() < deadline:
+        # the thinking time of mcts, the depth of minmax
+        limit = ({"depth": args.depth} if args.engine == "minmax" else
+                 {"ms": args.ms})
+        state = await connection.request(op="new", ai_side=args.ai_side,
+                                         engine=args.engine, **limit)
+        while not state.get("over") and time.time() < deadline:
+            state = await connection.request(op="move", game=state["game"],
+                                             move=rand.choice(state["moves"]))
+            if "error" in state:
+                raise RuntimeError(state["error"])
+        if state.get("over"):
+            counters["games"] += 1
+        counters["moves"] += state["black"] + state["write"] - 4
+        await connection.request(op="close", game=state["game"])
+
+
+def Percentile(samples, rate):
+    # Percentile of sorted samples in milliseconds
+    index = min(len(samples) - 1, int(rate * len(samples)))
+    return 1000.0 * samples[index]
+
+
+async def Run(args):
+    # Open the connections, play the games and print the results
+    connections = []
+    for _ in range(args.connections):
+        if args.unix:
+            reader, writer = await asyncio.open_unix_connection(args.unix)
+        else:
+            reader, writer = await asyncio.open_connection(args.host,
+                                                           args.port)
+        connections.append(Connection(reader, writer))
+
+    rand = random.Random(args.seed)
+    counters = {"games": 0, "moves": 0}
+    start = time.time()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        Play_Games(connections[i % len(connections)], args, deadline,
+                   counters, rand)
+        for i in range(args.games)])
+    elapsed = time.time() - start
+
+    stats = await connections[0].request(op="stats")
+    samples = sorted(itertools.chain(*[c.latencies for c in connections]))
+    print("%d concurrent games, %d finished in %.1f s"
+          % (args.games, counters["games"], elapsed))
+    print("%.0f moves per second, %.0f requests per second"
+          % (counters["moves"] / elapsed, len(samples) / elapsed))
+    print("client latency: p50 %.1f ms, p90 %.1f ms, p99 %.1f ms, max %.1f ms"
+          % (Percentile(samples, 0.5), Percentile(samples, 0.9),
+             Percentile(samples, 0.99), Percentile(samples, 1.0)))
+    print("server: %s" % json.dumps(stats))
+
+    for connection in connections:
+        connection.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi server load test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7700)
+    parser.add_argument("--unix", help="connect to a Unix socket instead")
+    parser.add_argument("--games", type=int, default=1000,
+                        help="number of concurrent games")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--engine", default="greedy")
+    parser.add_argument("--ms", type=int, default=20,
+                        help="AI thinking time of mcts")
+    parser.add_argument("--depth", type=int, default=2,
+                        help="AI search depth of minmax")
+    parser.add_argument("--ai-side", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(Run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""records.py: Reversi Game Record File Tool.
+
+This program works on the binary game record files of "record.py":
+
+    stats: count the games, moves and results of a record file and measure
+           how fast it can be read (and replayed with --replay).
+    random: append games of random moves, e.g. to test the readers with
+            millions of games.
+
+Example:
+    $ python Tools/records.py random /tmp/random.rec --games 100000
+    $ python Tools/records.py stats /tmp/random.rec --replay
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import random
+import time
+from tournament import *
+
+
+def Record_Stats(args):
+    # Count the games of a record file and measure the reading speed
+    games = finished = moves = 0
+    results = {1: 0, -1: 0, 0: 0}
+    start = time.time()
+
+    for record in Read_Records(args.file):
+        games += 1
+        moves += len(record.moves)
+        if record.result is not None:
+            finished += 1
+            results[(record.result > 0) - (record.result < 0)] += 1
+        if args.replay:
+            for own, opp, side, square in Replay(record):
+                pass
+
+    elapsed = max(time.time() - start, 1e-9)
+    print("%d games (%d finished), %d moves, %.1f moves per game"
+          % (games, finished, moves, moves / float(max(games, 1))))
+    print("black wins %d, write wins %d, draws %d"
+          % (results[1], results[-1], results[0]))
+    print("read %.0f games per second, %.0f moves per second%s"
+          % (games / elapsed, moves / elapsed,
+             " (with replay)" if args.replay else ""))
+
+
+def Random_Games(args):
+    # Append games of random moves played on the compact representation
+    rand = random.Random(args.seed)
+    writer = Record_Writer(args.file, flush_bytes=65536)
+    start = time.time()
+
+    try:
+        for _ in range(args.games):
+            writer.start_game(Initial_Table(), 1)
+            own, opp = Table_To_Bitboard(Initial_Table(), 1)
+            side = 1
+            passed = False
+            while True:
+                moves = Get_Moves(own, opp)
+                if moves == 0:
+                    if passed or Get_Moves(opp, own) == 0:
+                        break
+                    passed = True
+                    writer.move([-1, -1])
+                    own, opp = opp, own
+                    side = -side
+                    continue
+                passed = False
+                square = rand.choice(Squares(moves))
+                writer.move(Location(square))
+                own, opp = Play(own, opp, square)
+                side = -side
+            writer.end_game(Bitboard_To_Table(own, opp, side))
+    finally:
+        writer.close()
+
+    print("%d games in %.1f s" % (args.games, time.time() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi game records")
+    commands = parser.add_subparsers(dest="command")
+
+    command = commands.add_parser("stats", help="count and read the games")
+    command.add_argument("file")
+    command.add_argument("--replay", action="store_true",
+                         help="also replay every move")
+    command.set_defaults(run=Record_Stats)
+
+    command = commands.add_parser("random", help="append random games")
+    command.add_argument("file")
+    command.add_argument("--games", type=int, default=1000)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=Random_Games)
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+    else:
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
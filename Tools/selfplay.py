@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+
+"""selfplay.py: Reversi Game Distributed Self-Play.
+
+This program plays many headless games between two engines on several
+processes and hosts. A coordinator hands out jobs over TCP with one JSON
+object per line, the workers play them with the players of "tournament.py"
+and send the games back in the binary format of "record.py":
+
+    coordinator: splits the games into jobs, every job is a batch of game
+                 pairs that start from random openings as in a tournament,
+                 and appends the returned games to a record file.
+    worker: connects to a coordinator and plays its jobs until all are done,
+            --processes starts several worker processes.
+    local: a coordinator and worker processes on this host.
+
+The workers ask for a job whenever they are idle, so the faster workers and
+hosts play more games. A job is leased to the worker that got it: when the
+connection of the worker breaks (e.g. the process was killed) or the lease
+times out, the job goes back to the front of the queue. When the queue is
+empty, an idle worker gets a copy of the oldest running job, so one slow
+worker cannot hold up the end of the run. The first result of a job is used
+and the later copies are ignored.
+
+Requests of the workers and the answers:
+    {"op": "get", "worker": "host:pid"}
+        {"op": "job", "job": 3, "first": "minmax:depth=2", "second":
+        "greedy", "seeds": [...], "plies": 4}, {"op": "wait", "seconds":
+        0.2} while the last jobs are running, or {"op": "done"}
+    {"op": "result", "job": 3, "diffs": [...], "records": "<base64>",
+     "first": [seconds, moves], "second": [seconds, moves]}
+        {"op": "ok"}
+
+The diffs are the disc differences of the games from the view of the first
+player. local --kill kills a worker during the run to test the recovery.
+
+This program needs python 3.7 or later.
+
+Example:
+    $ python3 Tools/selfplay.py local minmax:depth=2 greedy --games 200 \\
+          --workers 4 --output games.rec
+    $ python3 Tools/selfplay.py coordinator mcts:ms=100 minmax:depth=3 \\
+          --games 1000 --host 0.0.0.0 --port 7800
+    $ python3 Tools/selfplay.py worker --connect 10.0.0.1:7800 --processes 8
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import asyncio
+import base64
+import collections
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from tournament import *
+
+WAIT_SECONDS = 0.2  # pause of an idle worker while the last jobs run
+GRACE_SECONDS = 1.0  # time the workers get to hear "done" at the end
+FILE_OPTIONS = ("cache", "endgame")  # player options that open files
+
+
+class Coordinator:
+    """Hands out the jobs and collects the games.
+
+    All methods run in the event loop, so they need no locks.
+
+    Attributes:
+        first (str): Specification of the first player.
+        second (str): Specification of the second player.
+        plies (int): Random opening moves of every game pair.
+        jobs (list): Opening seeds of every job.
+        pending (collections.deque): Numbers of the jobs not handed out.
+        running (dict): [worker, start time] of the copies of every running
+                        job, keyed by the job number.
+        results (dict): Decoded results of the finished jobs.
+        writer (Record_Writer): Appends the games in job order, None if the
+                                games are not stored.
+        next_write (int): Number of the next job to append.
+        lease (float): Seconds a worker may spend on a job.
+        requeued (int): Number of jobs taken back from a worker.
+        duplicates (int): Number of copies of running jobs handed out.
+        games (dict): Number of games played by every worker.
+        connections (set): Stream writers of the connected workers.
+        finished (asyncio.Event): Set when all jobs are finished.
+
+    """
+
+    def __init__(self, first, second, games, batch, plies, seed, output,
+                 lease):
+        # check the specifications before any worker gets them
+        for spec in (first, second):
+            Spec_Player(spec).close()
+
+        self.first = first
+        self.second = second
+        self.plies = plies
+        rand = random.Random(seed)
+        seeds = [rand.getrandbits(32) for _ in range((games + 1) // 2)]
+        self.jobs = [seeds[i:i + batch] for i in range(0, len(seeds), batch)]
+        self.pending = collections.deque(range(len(self.jobs)))
+        self.running = {}
+        self.results = {}
+        self.writer = None
+        if output:
+            self.writer = Record_Writer(output, flush_bytes=65536)
+        self.next_write = 0
+        self.lease = lease
+        self.requeued = 0
+        self.duplicates = 0
+        self.games = collections.Counter()
+        self.connections = set()
+        self.finished = None
+        self.start = time.time()
+
+
+    def done(self):
+        # Whether all jobs are finished
+        return len(self.results) == len(self.jobs)
+
+
+    def assign(self, worker):
+        """Choose the next job of an idle worker.
+
+        Args:
+            worker (str): Name of the worker.
+
+        Returns:
+            job (int): Number of the job, None if there is no job to hand out.
+
+        """
+
+        self.expire()
+        if self.pending:
+            job = self.pending.popleft()
+            self.running[job] = []
+        else:
+            # copy the oldest job that no other worker is copying
+            candidates = [(copies[0][1], job)
+                          for job, copies in self.running.items()
+                          if len(copies) == 1 and copies[0][0] != worker]
+            if not candidates:
+                return None
+            job = min(candidates)[1]
+            self.duplicates += 1
+
+        self.running[job].append([worker, time.time()])
+
+        return job
+
+
+    def take_back(self, job, keep):
+        # Keep only some copies of a running job, requeue it if none is left
+        copies = self.running[job]
+        copies[:] = [copy for copy in copies if keep(copy)]
+        if not copies:
+            del self.running[job]
+            self.pending.appendleft(job)
+            self.requeued += 1
+
+
+    def expire(self):
+        # Take back the jobs whose lease is over
+        limit = time.time() - self.lease
+        for job in list(self.running):
+            self.take_back(job, lambda copy: copy[1] > limit)
+
+
+    def release(self, worker):
+        # Take back the jobs of a worker whose connection broke
+        for job in list(self.running):
+            self.take_back(job, lambda copy: copy[0] != worker)
+
+
+    def complete(self, worker, message):
+        """Store the result of a job.
+
+        Args:
+            worker (str): Name of the worker.
+            message (dict): The "result" message of the worker.
+
+        """
+
+        job = message["job"]
+        if job in self.results or not 0 <= job < len(self.jobs):
+            return
+
+        self.running.pop(job, None)
+        if job in self.pending:
+            self.pending.remove(job)
+        self.results[job] = {"diffs": message["diffs"],
+                             "first": message["first"],
+                             "second": message["second"],
+                             "records": base64.b64decode(message["records"])}
+        self.games[worker] += len(message["diffs"])
+
+        # the games are appended in the order of the jobs
+        while self.next_write in self.results:
+            result = self.results[self.next_write]
+            if self.writer is not None:
+                self.writer.append(result["records"])
+            result["records"] = None
+            self.next_write += 1
+
+        if self.done():
+            self.finished.set()
+
+
+    def handle(self, worker, message):
+        # Answer one message of a worker
+        op = message.get("op")
+        if op == "get":
+            if self.done():
+                return {"op": "done"}
+            job = self.assign(worker)
+            if job is None:
+                return {"op": "wait", "seconds": WAIT_SECONDS}
+            return {"op": "job", "job": job, "first": self.first,
+                    "second": self.second, "seeds": self.jobs[job],
+                    "plies": self.plies}
+
+        if op == "result":
+            self.complete(worker, message)
+            return {"op": "ok"}
+
+        return {"op": "error", "error": "unknown op"}
+
+
+    async def serve_worker(self, reader, writer):
+        # Answer the messages of one worker connection in turn
+        worker = None
+        self.connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                worker = message.get("worker", worker)
+                response = self.handle(worker, message)
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            if worker is not None:
+                self.release(worker)
+            writer.close()
+
+
+    def progress(self):
+        # One line of the progress of the run
+        games = sum(len(result["diffs"]) for result in self.results.values())
+        elapsed = time.time() - self.start
+
+        return ("%d/%d jobs, %d games, %.1f games per second, %d workers, "
+                "%d requeued, %d copies"
+                % (len(self.results), len(self.jobs), games,
+                   games / max(elapsed, 1e-9), len(self.games),
+                   self.requeued, self.duplicates))
+
+
+    def match_result(self):
+        # Combine the finished jobs like Run_Match
+        result = {"wins": 0, "losses": 0, "draws": 0, "discs": 0}
+        times = {"first": [0.0, 0], "second": [0.0, 0]}
+        for item in self.results.values():
+            for diff in item["diffs"]:
+                if diff > 0:
+                    result["wins"] += 1
+                elif diff < 0:
+                    result["losses"] += 1
+                else:
+                    result["draws"] += 1
+                result["discs"] += diff
+            for name in times:
+                times[name][0] += item[name][0]
+                times[name][1] += item[name][1]
+
+        played = result["wins"] + result["losses"] + result["draws"]
+        result["score"] = (result["wins"] + 0.5 * result["draws"]) / played
+        for name in times:
+            result[name + "_ms"] = (1000.0 * times[name][0] /
+                                    max(1, times[name][1]))
+
+        return result
+
+
+async def Coordinate(coordinator, host, port, report, started=None,
+                     check=None):
+    """Serve the workers until all jobs are finished.
+
+    Args:
+        coordinator (Coordinator): The jobs.
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 for any free port.
+        report (float): Seconds between the progress lines.
+        started (function): Called with the port once the server listens.
+        check (function): Called with every progress line, it may raise
+                          SystemExit to stop the run.
+
+    """
+
+    coordinator.finished = asyncio.Event()
+    server = await asyncio.start_server(coordinator.serve_worker, host, port)
+    port = server.sockets[0].getsockname()[1]
+    print("coordinator listening on %s:%d" % (host, port), flush=True)
+    if started is not None:
+        started(port)
+
+    try:
+        while not coordinator.done():
+            try:
+                await asyncio.wait_for(coordinator.finished.wait(), report)
+            except asyncio.TimeoutError:
+                coordinator.expire()
+                print(coordinator.progress(), flush=True)
+                if check is not None:
+                    check()
+    finally:
+        server.close()
+        if coordinator.writer is not None:
+            coordinator.writer.close()
+
+    # the idle workers ask again and hear "done", the others are cut off
+    deadline = time.time() + GRACE_SECONDS
+    while coordinator.connections and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    for writer in list(coordinator.connections):
+        writer.close()
+    await asyncio.sleep(0.1)
+
+
+def Spec_Player(spec):
+    """Create a player of a specification without opening its files.
+
+    The coordinator only checks and prints the specifications, the search
+    table and endgame database files are used by the workers.
+
+    Args:
+        spec (str): Player specification.
+
+    Returns:
+        player (Player): The player without the FILE_OPTIONS, its spec is the
+                         given one. It should be closed after use.
+
+    """
+
+    name, _, args = spec.partition(":")
+    items = [item for item in args.split(",")
+             if item and item.partition("=")[0] not in FILE_OPTIONS]
+    player = Player(name + (":" + ",".join(items) if items else ""))
+    player.spec = spec
+
+    return player
+
+
+def Play_Job(message, players):
+    """Play the games of a job.
+
+    Args:
+        message (dict): The "job" message of the coordinator.
+        players (dict): Players of this worker, keyed by ("first" or
+                        "second", specification), so an engine playing
+                        itself has two players with their own times and
+                        search states.
+
+    Returns:
+        result (dict): The "result" message of the job.
+
+    """
+
+    for key in (("first", message["first"]), ("second", message["second"])):
+        if key not in players:
+            players[key] = Player(key[1])
+    first = players[("first", message["first"])]
+    second = players[("second", message["second"])]
+    before = [(first.elapsed, first.moves), (second.elapsed, second.moves)]
+
+    writer = Record_Writer(None)
+    diffs = []
+    for seed in message["seeds"]:
+        opening = Random_Opening(message["plies"], random.Random(seed))
+        for black, white in [(first, second), (second, first)]:
+            current_table = [row[:] for row in opening[0]]
+            black_count, write_count = Play_Game(black, white,
+                                                 current_table, opening[1],
+                                                 writer)
+            diff = black_count - write_count
+            diffs.append(-diff if black is second else diff)
+
+    return {"op": "result", "job": message["job"], "diffs": diffs,
+            "records": base64.b64encode(bytes(writer.buffer)).decode(),
+            "first": [first.elapsed - before[0][0],
+                      first.moves - before[0][1]],
+            "second": [second.elapsed - before[1][0],
+                       second.moves - before[1][1]]}
+
+
+def Run_Worker(address, retry=10.0):
+    """Play the jobs of a coordinator until all are done.
+
+    Args:
+        address (tuple): Host and port of the coordinator.
+        retry (float): Seconds to retry the connection while the coordinator
+                       is starting.
+
+    Returns:
+        jobs (int): Number of played jobs.
+
+    """
+
+    deadline = time.time() + retry
+    while True:
+        try:
+            connection = socket.create_connection(address)
+            break
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+    name = "%s:%d" % (socket.gethostname(), os.getpid())
+    stream = connection.makefile("rwb")
+    players = {}
+    jobs = 0
+
+    def request(message):
+        message["worker"] = name
+        stream.write((json.dumps(message) + "\n").encode())
+        stream.flush()
+        line = stream.readline()
+        if not line:
+            raise ConnectionError("the coordinator closed the connection")
+        return json.loads(line)
+
+    try:
+        while True:
+            answer = request({"op": "get"})
+            if answer["op"] == "done":
+                break
+            if answer["op"] == "wait":
+                time.sleep(answer["seconds"])
+                continue
+            request(Play_Job(answer, players))
+            jobs += 1
+    finally:
+        # save the search tables and commit the endgame results
+        for player in players.values():
+            player.close()
+        stream.close()
+        connection.close()
+
+    return jobs
+
+
+def Parse_Address(text):
+    # Split "host:port" into a (host, port) tuple
+    host, _, port = text.rpartition(":")
+
+    return (host or "127.0.0.1", int(port))
+
+
+def Worker_Process(address):
+    # Entry of a worker process, ends quietly when the coordinator is gone
+    try:
+        Run_Worker(address)
+    except (ConnectionError, OSError) as error:
+        sys.stderr.write("worker %d stopped: %s\n" % (os.getpid(), error))
+
+
+def Start_Workers(address, count):
+    # Start worker processes of this script
+    return [subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                              "worker", "--connect", "%s:%d" % address])
+            for _ in range(count)]
+
+
+def New_Coordinator(args):
+    # Create the coordinator of the command line arguments
+    return Coordinator(args.first, args.second, args.games, args.batch,
+                       args.plies, args.seed, args.output, args.lease)
+
+
+def Run_Coordinator(args):
+    coordinator = New_Coordinator(args)
+    asyncio.run(Coordinate(coordinator, args.host, args.port, args.report))
+    Print_Run(coordinator)
+
+
+def Run_Workers(args):
+    address = Parse_Address(args.connect)
+    if args.processes == 1:
+        Worker_Process(address)
+        return
+
+    processes = [multiprocessing.Process(target=Worker_Process,
+                                         args=(address,))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def Run_Local(args):
+    # A coordinator on localhost with worker processes
+    coordinator = New_Coordinator(args)
+    workers = []
+    killed = []
+
+    def started(port):
+        workers.extend(Start_Workers(("127.0.0.1", port), args.workers))
+
+    def check():
+        if (args.kill and not killed and
+                time.time() - coordinator.start >= args.kill):
+            killed.append(workers[0])
+            workers[0].kill()
+            print("killed worker process %d" % workers[0].pid, flush=True)
+        if all(worker.poll() is not None for worker in workers):
+            raise SystemExit("all workers stopped before the end of the run")
+
+    try:
+        asyncio.run(Coordinate(coordinator, "127.0.0.1", 0, args.report,
+                               started, check))
+    finally:
+        for worker in workers:
+            try:
+                worker.wait(10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+    Print_Run(coordinator)
+
+
+def Print_Run(coordinator):
+    # Print the match result and the games of every worker
+    print(coordinator.progress())
+    for worker, games in sorted(coordinator.games.items()):
+        print("%s: %d games" % (worker, games))
+    first = Spec_Player(coordinator.first)
+    second = Spec_Player(coordinator.second)
+    try:
+        Print_Result(first, second, coordinator.match_result())
+    finally:
+        first.close()
+        second.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi self-play")
+    commands = parser.add_subparsers(dest="command")
+
+    for name in ["coordinator", "local"]:
+        command = commands.add_parser(name)
+        command.add_argument("first", help="first player, e.g. mcts:ms=100")
+        command.add_argument("second", help="second player, e.g. greedy")
+        command.add_argument("--games", type=int, default=100)
+        command.add_argument("--batch", type=int, default=2,
+                             help="game pairs of every job")
+        command.add_argument("--plies", type=int, default=4,
+                             help="random opening moves of every game pair")
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("--output", help="append the games to a record "
+                             "file")
+        command.add_argument("--lease", type=float, default=600.0,
+                             help="seconds before a job is handed out again")
+        command.add_argument("--report", type=float, default=5.0,
+                             help="seconds between the progress lines")
+    commands.choices["coordinator"].add_argument("--host",
+                                                 default="127.0.0.1")
+    commands.choices["coordinator"].add_argument("--port", type=int,
+                                                 default=7800)
+    commands.choices["coordinator"].set_defaults(run=Run_Coordinator)
+    commands.choices["local"].add_argument(
+        "--workers", type=int, default=os.cpu_count())
+    commands.choices["local"].add_argument(
+        "--kill", type=float, help="kill a worker after this many seconds")
+    commands.choices["local"].set_defaults(run=Run_Local)
+
+    command = commands.add_parser("worker")
+    command.add_argument("--connect", default="127.0.0.1:7800",
+                         help="host:port of the coordinator")
+    command.add_argument("--processes", type=int, default=1)
+    command.set_defaults(run=Run_Workers)
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+    else:
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+
+"""server.py: Reversi Game Multi-Game Server.
+
+This program hosts many independent games in one process. The clients talk to
+the server over a local TCP or Unix socket with one JSON object per line.
+Every request may carry an "id" that is copied to its response, so that a
+client can send requests for many games over one connection without waiting
+for the previous responses.
+
+Requests:
+    {"op": "new", "ai_side": -1, "engine": "mcts", "ms": 100}
+        start a game, ai_side is 1 or -1 for a game against the AI and 0 for
+        a game between two human players. The engine is "greedy", "minmax"
+        or "mcts"; ms is the thinking time of every AI move of "mcts", and
+        "minmax" takes a "depth" instead, e.g. {"engine": "minmax",
+        "depth": 3}. The response is the state of the new game.
+    {"op": "move", "game": 1, "move": "d3"}
+        play a move for the human player, the response is the state of the
+        game after the AI has answered.
+    {"op": "state", "game": 1}
+    {"op": "close", "game": 1}
+    {"op": "stats"}
+        number of games, moves and the latency percentiles in milliseconds.
+
+The game rules are the functions of "control.py". The AI moves run in a shared
+pool of worker processes. When more AI moves are waiting than there are
+workers, they are dispatched by start-time fair queuing on the AI time, so a
+few games with long budgets cannot starve the others.
+
+This program needs python 3.7 or later.
+
+Example:
+    $ python3 Tools/server.py --port 7700 --workers 4
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import json
+import os
+import time
+from tournament import *
+
+MAX_MS = 5000  # largest thinking time a client may ask for
+MAX_DEPTH = 4  # largest min-max depth a client may ask for
+LATENCY_SAMPLES = 100000  # latencies kept for the percentiles
+
+players = {}  # players of the current worker process, keyed by the spec
+
+
+def Board_String(current_table):
+    # Convert the table to the 64 characters of the log file order
+    symbols = {0: "*", 1: "B", -1: "W"}
+    return "".join(symbols[current_table[x][y]]
+                   for y in range(8) for x in range(8))
+
+
+def AI_Move(spec, board, side):
+    """Calculate an AI move in a worker process.
+
+    Args:
+        spec (str): Player specification of the engine.
+        board (str): The board in the order of Board_String.
+        side (int): Side to play.
+
+    Returns:
+        location (array): x and y axes of the calculated location.
+        elapsed (float): CPU time of the search in seconds. Unlike the wall
+                         time, it does not grow when the machine is busy.
+
+    """
+
+    player = players.get(spec)
+    if player is None:
+        player = players[spec] = Player(spec)
+
+    current_table = [[0 for j in range(8)] for i in range(8)]
+    Get_Current_Table(current_table, [board[i * 8:i * 8 + 8]
+                                      for i in range(8)])
+    start = time.process_time()
+    location = player.choose(current_table, side)
+
+    return (location, time.process_time() - start)
+
+
+class Game:
+    """State of one hosted game.
+
+    Attributes:
+        id (int): Game number.
+        current_table (2D array): 8*8 values indicating the current condition
+                                  of the board.
+        side (int): Side to play, 0 when the game is over.
+        ai_side (int): 1 or -1 for the AI side, 0 if there is no AI.
+        spec (str): Player specification of the AI.
+        ai_time (float): AI CPU time used so far in seconds.
+        finish_tag (float): Virtual time at which the last AI move of the
+                            game finished, used by the fair scheduler.
+        moves (int): Number of moves played.
+        lock (asyncio.Lock): Serializes the requests of the game.
+
+    """
+
+    def __init__(self, game_id, ai_side, spec):
+        self.id = game_id
+        self.current_table = Initial_Table()
+        self.side = 1
+        self.ai_side = ai_side
+        self.spec = spec
+        self.ai_time = 0.0
+        self.finish_tag = 0.0
+        self.moves = 0
+        self.lock = asyncio.Lock()
+
+
+    def play(self, location):
+        """Play a move for the side to play and find the next side.
+
+        Args:
+            location (array): x and y coordinates of the new piece.
+
+        Returns:
+            Return True if the move is legal, otherwise return False.
+
+        """
+
+        if self.side == 0 or not Place_Piece(self.current_table, location,
+                                             self.side):
+            return False
+        self.moves += 1
+
+        # switch side unless the other side has to pass
+        available_table = [[False for j in range(8)] for i in range(8)]
+        for side in [-self.side, self.side]:
+            if Get_Available_Table(self.current_table, side,
+                                   available_table):
+                self.side = side
+                return True
+        self.side = 0
+
+        return True
+
+
+    def state(self):
+        # The state of the game as a JSON object
+        locations = [[x, y] for x in range(8) for y in range(8)
+                     if self.side != 0 and
+                     Check_Location(self.current_table, self.side, x, y)]
+
+        return {"game": self.id, "board": Board_String(self.current_table),
+                "side": self.side, "over": self.side == 0,
+                "moves": [Location_Name(location) for location in locations],
+                "black": sum(row.count(1) for row in self.current_table),
+                "write": sum(row.count(-1) for row in self.current_table)}
+
+
+class Fair_Scheduler:
+    """Dispatches the AI moves of all games to a process pool.
+
+    At most 2 AI moves per worker are handed to the pool at the same time, so
+    that the workers stay busy while the results travel back. The other
+    waiting moves are ordered by start-time fair queuing: the start tag of a
+    move is the later of the current virtual time and the finish tag of the
+    previous move of its game, and the finish tag adds the thinking time.
+    Games with short moves therefore get their turns in between the long
+    moves of the other games, while equal games are served in turn.
+
+    Attributes:
+        executor (ProcessPoolExecutor): The shared worker processes.
+        slots (int): Maximum number of AI moves running at the same time.
+        waiting (list): Heap of (start tag, order, game, future).
+        virtual_time (float): Start tag of the last dispatched move.
+
+    """
+
+    def __init__(self, workers):
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+        self.slots = 2 * workers
+        self.waiting = []
+        self.order = itertools.count()
+        self.virtual_time = 0.0
+
+
+    async def ai_move(self, game):
+        """Wait for a slot and calculate the AI move of a game.
+
+        Args:
+            game (Game): The game, its AI side should be the side to play.
+
+        Returns:
+            location (array): x and y axes of the calculated location.
+
+        """
+
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        start_tag = max(self.virtual_time, game.finish_tag)
+        heapq.heappush(self.waiting, (start_tag, next(self.order), game.id,
+                                      ready))
+        self.dispatch()
+        try:
+            await ready
+        except asyncio.CancelledError:
+            # give back the slot when it was granted just before the cancel
+            if ready.done() and not ready.cancelled():
+                self.slots += 1
+                self.dispatch()
+            raise
+
+        try:
+            location, elapsed = await loop.run_in_executor(
+                self.executor, AI_Move, game.spec,
+                Board_String(game.current_table), game.side)
+        finally:
+            self.slots += 1
+            self.dispatch()
+        game.ai_time += elapsed
+        game.finish_tag = start_tag + elapsed
+
+        return location
+
+
+    def dispatch(self):
+        # Give the free slots to the waiting games that used the least time
+        while self.slots > 0 and self.waiting:
+            key, _, _, future = heapq.heappop(self.waiting)
+            if not future.cancelled():
+                self.virtual_time = key
+                self.slots -= 1
+                future.set_result(None)
+
+
+class Server:
+    """The multi-game server.
+
+    Attributes:
+        games (dict): Hosted games keyed by the game number.
+        scheduler (Fair_Scheduler): Dispatcher of the AI moves.
+        latencies (collections.deque): Recent request latencies in seconds.
+        requests (int): Number of handled requests.
+        moves (int): Number of played moves, including the AI moves.
+
+    """
+
+    def __init__(self, workers):
+        self.games = {}
+        self.game_ids = itertools.count(1)
+        self.scheduler = Fair_Scheduler(workers)
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.moves = 0
+        self.start = time.time()
+
+
+    async def play_ai(self, game):
+        # Let the AI play until it is the human's turn or the game is over
+        while game.side != 0 and game.side == game.ai_side:
+            location = await self.scheduler.ai_move(game)
+            game.play(location)
+            self.moves += 1
+
+
+    async def handle(self, request):
+        """Handle one request.
+
+        Args:
+            request (dict): The decoded request.
+
+        Returns:
+            response (dict): The response without the request id.
+
+        """
+
+        op = request.get("op")
+
+        if op == "new":
+            ai_side = request.get("ai_side", -1)
+            engine = request.get("engine", "greedy")
+            if ai_side not in (1, -1, 0):
+                return {"error": "ai_side must be 1, -1 or 0"}
+            if engine == "mcts":
+                ms = min(max(int(request.get("ms", 100)), 1), MAX_MS)
+                spec = "mcts:ms=%d,capacity=20000" % ms
+            elif engine == "minmax":
+                if "ms" in request:
+                    return {"error": "minmax takes a depth instead of ms"}
+                depth = min(max(int(request.get("depth", 2)), 1), MAX_DEPTH)
+                spec = "minmax:depth=%d" % depth
+            elif engine == "greedy":
+                spec = "greedy"
+            else:
+                return {"error": "unknown engine"}
+
+            game = Game(next(self.game_ids), ai_side, spec)
+            self.games[game.id] = game
+            async with game.lock:
+                await self.play_ai(game)
+                return game.state()
+
+        if op == "stats":
+            return self.stats()
+
+        game = self.games.get(request.get("game"))
+        if game is None:
+            return {"error": "unknown game"}
+
+        if op == "state":
+            return game.state()
+
+        if op == "close":
+            del self.games[game.id]
+            return {"game": game.id, "closed": True}
+
+        if op == "move":
+            location = Parse_Location(str(request.get("move", "")))
+            async with game.lock:
+                if (location is None or game.side == game.ai_side or
+                        not game.play(location)):
+                    response = game.state()
+                    response["error"] = "illegal move"
+                    return response
+                self.moves += 1
+                await self.play_ai(game)
+                return game.state()
+
+        return {"error": "unknown op"}
+
+
+    def stats(self):
+        # Server counters and the latency percentiles in milliseconds
+        samples = sorted(self.latencies)
+        result = {"games": len(self.games), "requests": self.requests,
+                  "moves": self.moves,
+                  "uptime": round(time.time() - self.start, 3)}
+        for name, rate in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99),
+                           ("max", 1.0)]:
+            if samples:
+                index = min(len(samples) - 1, int(rate * len(samples)))
+                result[name] = round(1000.0 * samples[index], 3)
+
+        return result
+
+
+    async def serve_client(self, reader, writer):
+        # Read the requests of one connection and answer them concurrently
+        tasks = set()
+
+        async def answer(line):
+            start = time.time()
+            request = {}
+            try:
+                request = json.loads(line)
+                response = await self.handle(request)
+            except (ValueError, TypeError, AttributeError) as error:
+                response = {"error": "bad request: %s" % error}
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                # e.g. a broken worker pool, the client still gets its answer
+                response = {"error": "server error: %s: %s"
+                            % (type(error).__name__, error)}
+            if isinstance(request, dict) and "id" in request:
+                response["id"] = request["id"]
+            writer.write((json.dumps(response) + "\n").encode())
+            self.requests += 1
+            self.latencies.append(time.time() - start)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+async def Serve(args):
+    # Start the server and report the statistics periodically
+    server = Server(args.workers)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.serve_client,
+                                                   path=args.unix)
+    else:
+        listener = await asyncio.start_server(server.serve_client,
+                                              host=args.host, port=args.port)
+    print("listening on %s" % (args.unix or "%s:%d" % (args.host, args.port)),
+          flush=True)
+
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            if server.requests:
+                print(json.dumps(server.stats()), flush=True)
+    finally:
+        listener.close()
+        server.scheduler.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi multi-game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7700)
+    parser.add_argument("--unix", help="listen on a Unix socket instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--report", type=float, default=10.0,
+                        help="seconds between the statistics reports")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(Serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
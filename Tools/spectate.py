@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""spectate.py: Reversi Game Match Spectator.
+
+This program plays the games of an engine match on worker processes and
+shows all of them at once in the tiled window of "spectator.py". Every
+worker plays a group of boards, one move on every board in turn, and sends
+the positions after the moves as one batch of events. A board starts its
+next game when its game is over, the first player plays black in the odd
+games of a board and write in the even ones.
+
+The window draws the last position of every board at most --fps times per
+second, so the workers are never slowed down by the drawing. When the
+window is closed, the results and the drawing statistics are printed.
+
+Example:
+    $ python Tools/spectate.py minmax:depth=2 greedy --boards 64 --games 4
+    $ python Tools/spectate.py mcts:ms=100 minmax:depth=3 --boards 16 \\
+          --workers 8 --fps 20
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from tournament import *
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "View"))
+from spectator import *
+
+try:
+    import queue as Queue
+except ImportError:
+    import Queue
+
+
+def Status(game, current_table, side):
+    # Short text above a board: game number, piece counts and side to play
+    black_count = sum(row.count(1) for row in current_table)
+    write_count = sum(row.count(-1) for row in current_table)
+    mark = {1: "B", -1: "W", 0: "end"}[side]
+
+    return "#%d %d-%d %s" % (game, black_count, write_count, mark)
+
+
+def Play_Boards(first, second, boards, games, plies, seed, delay, events):
+    """Play the games of a group of boards and send their moves.
+
+    Args:
+        first (str): Player specification of the first player.
+        second (str): Player specification of the second player.
+        boards (list): Indexes of the boards of this worker.
+        games (int): Number of games of every board.
+        plies (int): Number of random opening moves of every game.
+        seed (int): Seed of the random openings and engines.
+        delay (int): Milliseconds to wait after every round of moves.
+        events (Queue): Receives lists of (board, black, write, side,
+                        status) events, and (None, diffs) at the end, the
+                        disc differences from the view of the first player.
+
+    """
+
+    rand = random.Random(seed)
+    players = [Player(first, seed), Player(second, seed + 1)]
+    available_table = [[False for j in range(8)] for i in range(8)]
+    # [current_table, side, game] of every board, side 0 after the last game
+    state = dict((board, [None, 0, 0]) for board in boards)
+    diffs = []
+
+    while any(item[2] < games or item[1] != 0 for item in state.values()):
+        batch = []
+        for board in boards:
+            current_table, side, game = state[board]
+            if side == 0:
+                if game >= games:
+                    continue
+                current_table, side = Random_Opening(plies, rand)
+                game += 1
+                state[board] = [current_table, side, game]
+            else:
+                black = players[(game - 1) % 2]
+                white = players[game % 2]
+                player = black if side == 1 else white
+                Place_Piece(current_table, player.choose(current_table, side),
+                            side)
+                side = -side
+
+            # the side to play after the passes, 0 at the end of the game
+            if not Get_Available_Table(current_table, side, available_table):
+                side = -side
+                if not Get_Available_Table(current_table, side,
+                                           available_table):
+                    side = 0
+                    diff = (sum(row.count(1) for row in current_table) -
+                            sum(row.count(-1) for row in current_table))
+                    diffs.append(diff if game % 2 == 1 else -diff)
+            state[board][1] = side
+
+            black_bits, write_bits = Table_To_Bitboard(current_table, 1)
+            batch.append((board, black_bits, write_bits, side,
+                          Status(game, current_table, side)))
+        events.put(batch)
+        if delay:
+            time.sleep(delay / 1000.0)
+
+    for player in players:
+        player.close()
+    events.put((None, diffs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi match spectator")
+    parser.add_argument("first", help="first player, e.g. minmax:depth=2")
+    parser.add_argument("second", help="second player, e.g. greedy")
+    parser.add_argument("--boards", type=int, default=16)
+    parser.add_argument("--games", type=int, default=2,
+                        help="games played on every board")
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--plies", type=int, default=4,
+                        help="random opening moves of every game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=int, default=30,
+                        help="largest number of frames per second")
+    parser.add_argument("--delay", type=int, default=0,
+                        help="milliseconds between two moves of a board")
+    args = parser.parse_args()
+
+    events = multiprocessing.Queue()
+    workers = []
+    for index in range(min(args.workers, args.boards)):
+        worker = multiprocessing.Process(target=Play_Boards, args=(
+            args.first, args.second,
+            list(range(index, args.boards, args.workers)), args.games,
+            args.plies, args.seed + 2 * index, args.delay, events))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    diffs = []
+    running = [len(workers)]
+
+    def poll():
+        # Take all batches that arrived since the last frame
+        batch = []
+        while True:
+            try:
+                item = events.get_nowait()
+            except Queue.Empty:
+                return batch
+            if item[0] is None:
+                diffs.extend(item[1])
+                running[0] -= 1
+            else:
+                batch.extend(item)
+
+    start = time.time()
+    view = Spectator_View(args.boards, poll, args.fps,
+                          title="%s vs %s" % (args.first, args.second))
+    view.tk.mainloop()
+    elapsed = time.time() - start
+    for worker in workers:
+        worker.terminate()
+
+    print("%s vs %s: +%d -%d =%d in %d finished games%s"
+          % (args.first, args.second, sum(d > 0 for d in diffs),
+             sum(d < 0 for d in diffs), sum(d == 0 for d in diffs),
+             len(diffs), "" if running[0] == 0 else " (closed early)"))
+    print("%d frames in %.1f s, %d pieces changed, %.2f ms per frame"
+          % (view.frames, elapsed, view.changes,
+             1000.0 * view.draw_time / max(1, view.frames)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+
+"""tournament.py: Reversi Game Engine Tournament.
+
+This program plays headless games between two AI engines and reports the
+results. The engines are given as player specifications such as "greedy",
+"minmax:depth=3,eval=features" or "mcts:ms=200,batch=4". Since Greedy and
+Min_Max always play the same moves, every pair of games starts from an
+opening of a few random moves, and each opening is played twice with the
+colors swapped.
+
+With --clock, the games are timed: every player has a game clock of the given
+seconds plus --increment seconds per move, and Min_Max and MCTS spend the
+budgets of "time_manager.py" instead of their fixed depth or time. The depth
+option of Min_Max is then its deepest search. A player whose clock runs out
+loses the game on time, the forfeits are reported after the match.
+
+With --stats, the searches are instrumented by "instrument.py": every move is
+written as a JSON line to the given file and the search statistics of both
+players are printed after the match. --profile also runs the searches under
+cProfile.
+
+Example:
+    $ python Tools/tournament.py mcts:ms=200 minmax:depth=3 --games 20
+    $ python Tools/tournament.py greedy minmax:depth=2 --stats moves.jsonl
+    $ python Tools/tournament.py minmax mcts --clock 30 --increment 0.5
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "Control"))
+from control import *
+from AI import *
+from mcts import *
+from record import *
+from instrument import *
+from search_table import *
+from time_manager import *
+from endgame import *
+
+
+class Player:
+    """A headless AI player built from a player specification.
+
+    Attributes:
+        spec (str): The player specification, e.g. "minmax:depth=3".
+        name (str): Engine name, "greedy", "minmax" or "mcts".
+        options (dict): Engine options parsed from the specification, e.g.
+                        "eval" selects the evaluation of Greedy and Min_Max,
+                        "table" the number of search table entries of
+                        Min_Max and "cache" the file the search table is
+                        loaded from and saved to. "exact" solves the
+                        positions with at most that many empty squares
+                        exactly, "endgame" keeps the exact results in that
+                        database file.
+        engine (MCTS): Engine object of the stateful engines, otherwise None.
+        table (Search_Table): Search table of Min_Max, None if not used.
+        endgame (Endgame_Database): Exact endgame results, None if not used.
+        clock_ms (int): Game clock in milliseconds, 0 for untimed games.
+        increment_ms (int): Time added after every move in milliseconds.
+        clock (Time_Manager): Clock of the running game, None if untimed.
+        forfeits (int): Number of games lost on time.
+        moves (int): Number of moves played.
+        elapsed (float): Total thinking time in seconds.
+
+    """
+
+    def __init__(self, spec, seed=None, clock_ms=0, increment_ms=0):
+        """Parse the player specification and create the engine.
+
+        Args:
+            spec (str): "name" or "name:key=value,key=value".
+            seed (int): Seed of the random engines.
+            clock_ms (int): Game clock in milliseconds, 0 for untimed games.
+            increment_ms (int): Time added after every move in milliseconds.
+
+        """
+
+        self.spec = spec
+        self.name, _, args = spec.partition(":")
+        self.options = {}
+        for item in args.split(","):
+            if item:
+                key, _, value = item.partition("=")
+                if key in ("eval", "cache", "endgame"):
+                    self.options[key] = value
+                else:
+                    self.options[key] = (float(value) if "." in value else
+                                         int(value))
+
+        self.engine = None
+        if self.name == "mcts":
+            self.engine = MCTS(seed=seed, **self.options)
+        elif self.name == "minmax":
+            self.options.setdefault("depth", 60 if clock_ms else 3)
+        elif self.name != "greedy":
+            raise ValueError("unknown engine: %s" % self.name)
+        if self.engine is None:
+            Get_Evaluation(self.options.setdefault("eval", "weights"))
+        self.table = None
+        if "cache" in self.options:
+            self.table = Load_Search_Table(self.options["cache"],
+                                           self.options["eval"])
+        if self.table is None and ("cache" in self.options or
+                                   self.options.get("table")):
+            self.table = Search_Table(self.options.get("table", 1 << 20))
+        self.endgame = None
+        if "endgame" in self.options:
+            self.options.setdefault("exact", EXACT_EMPTIES)
+            self.endgame = Endgame_Database(self.options["endgame"])
+
+        self.clock_ms = clock_ms
+        self.increment_ms = increment_ms
+        self.clock = None
+        self.forfeits = 0
+        self.moves = 0
+        self.elapsed = 0.0
+
+
+    def choose(self, current_table, side):
+        """Choose the location to place the piece.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the current
+                                      condition of the board.
+            side (int): 1 if it is the black side to play, -1 if it is the
+                        write side to play.
+
+        Returns:
+            location (array): x and y axes of the chosen location.
+
+        """
+
+        if PROBE.enabled:
+            PROBE.begin_move()
+        start = time.time()
+        if self.clock is not None:
+            self.clock.start_move()
+        if self.name == "greedy":
+            location = Greedy(current_table, side, self.evaluation())[0]
+        elif self.name == "minmax" and self.options.get("exact", 0) >= \
+                sum(row.count(0) for row in current_table):
+            location = Solve_Endgame(current_table, side, self.endgame)[0]
+        elif self.name == "minmax" and self.clock is not None:
+            location = Timed_Min_Max(current_table, side, self.clock,
+                                     self.options["depth"], self.evaluation(),
+                                     self.table)[0]
+        elif self.name == "minmax":
+            location = Min_Max(current_table, side, self.options["depth"],
+                               self.evaluation(), self.table)[0]
+        else:
+            if self.clock is not None:
+                empties = sum(row.count(0) for row in current_table)
+                self.engine.ms = max(1, int(self.clock.budget(empties)[0]))
+            location = self.engine.search_table(current_table, side)[0]
+        if self.clock is not None:
+            self.clock.end_move()
+        self.elapsed += time.time() - start
+        self.moves += 1
+        if PROBE.enabled:
+            PROBE.end_move(self.spec, side, location,
+                           MCTS_Stats(self.engine) if self.engine else None)
+
+        return location
+
+
+    def score_moves(self, current_table, side):
+        """Score every possible location of a position.
+
+        The score is the weight of the location for Greedy and Min_Max, and
+        the winning rate of the location for MCTS.
+
+        Args:
+            current_table (2D array): 8*8 values indicating the current
+                                      condition of the board.
+            side (int): 1 if it is the black side to play, -1 if it is the
+                        write side to play.
+
+        Returns:
+            scores (list): (location, score) of every possible location, the
+                           best location first.
+
+        """
+
+        start = time.time()
+        if self.name == "greedy":
+            scores = Score_Moves(current_table, side, 0, self.evaluation())
+        elif self.name == "minmax":
+            scores = Score_Moves(current_table, side, self.options["depth"],
+                                 self.evaluation(), self.table)
+        else:
+            self.engine.search_table(current_table, side)
+            scores = [(Location(move), value)
+                      for move, visits, value in self.engine.root_moves()]
+        self.elapsed += time.time() - start
+        self.moves += 1
+
+        # the MCTS moves are already sorted by the number of visits
+        if self.engine is None:
+            scores.sort(key=lambda item: -item[1])
+
+        return scores
+
+
+    def evaluation(self):
+        # The evaluation function of Greedy and Min_Max
+        return Get_Evaluation(self.options["eval"])
+
+
+    def new_game(self):
+        # Forget the search tree of the previous game and reset the clock
+        if self.engine is not None:
+            self.engine.reset()
+        if self.clock_ms:
+            self.clock = Time_Manager(self.clock_ms, self.increment_ms)
+
+
+    def flagged(self):
+        # Whether the clock of the running game ran out
+        return self.clock is not None and self.clock.flagged
+
+
+    def close(self):
+        # Save the search table to the cache file and release it
+        if self.endgame is not None:
+            self.endgame.close()
+            self.endgame = None
+        if self.table is None:
+            return
+        if "cache" in self.options:
+            self.table.save(self.options["cache"], self.options["eval"])
+        self.table.close()
+        self.table = None
+
+
+def Initial_Table():
+    # Create the table of the default start condition
+    current_table = [[0 for j in range(8)] for i in range(8)]
+    current_table[3][3] = current_table[4][4] = -1
+    current_table[3][4] = current_table[4][3] = 1
+
+    return current_table
+
+
+def Random_Opening(plies, rand):
+    """Play a number of random moves from the default start condition.
+
+    Args:
+        plies (int): Number of random moves.
+        rand (random.Random): Random generator.
+
+    Returns:
+        current_table (2D array): Table after the random moves.
+        side (int): Side to play after the random moves.
+
+    """
+
+    current_table = Initial_Table()
+    side = 1
+    available_table = [[False for j in range(8)] for i in range(8)]
+
+    for _ in range(plies):
+        if not Get_Available_Table(current_table, side, available_table):
+            break
+        locations = [[i, j] for i in range(8) for j in range(8)
+                     if available_table[i][j]]
+        Place_Piece(current_table, rand.choice(locations), side)
+        side = -side
+
+    return (current_table, side)
+
+
+def Play_Game(black, white, current_table=None, side=1, writer=None):
+    """Play one game between two players.
+
+    Args:
+        black (Player): Player of the black side.
+        white (Player): Player of the write side.
+        current_table (2D array): Start condition, the default one if None.
+        side (int): Side to play in the start condition.
+        writer (Record_Writer): Stores the game if given.
+
+    Returns:
+        black_count (int): Number of black pieces at the end of the game.
+        write_count (int): Number of write pieces at the end of the game.
+
+    """
+
+    if current_table is None:
+        current_table = Initial_Table()
+    available_table = [[False for j in range(8)] for i in range(8)]
+    players = {1: black, -1: white}
+    black.new_game()
+    white.new_game()
+    if writer is not None:
+        writer.start_game(current_table, side)
+
+    while True:
+        if not Get_Available_Table(current_table, side, available_table):
+            side = -side
+            if not Get_Available_Table(current_table, side, available_table):
+                break
+            if writer is not None:
+                writer.move([-1, -1])
+        location = players[side].choose(current_table, side)
+        if not Place_Piece(current_table, location, side):
+            raise RuntimeError("%s played an illegal move %s"
+                               % (players[side].spec, location))
+        if writer is not None:
+            writer.move(location)
+        side = -side
+
+    if writer is not None:
+        writer.end_game(current_table)
+
+    black_count = sum(row.count(1) for row in current_table)
+    write_count = sum(row.count(-1) for row in current_table)
+
+    return (black_count, write_count)
+
+
+def Run_Match(first, second, games, plies=4, seed=0, verbose=False,
+              writer=None):
+    """Play a match between two players with swapped colors.
+
+    Args:
+        first (Player): The first player.
+        second (Player): The second player.
+        games (int): Number of games, rounded up to an even number.
+        plies (int): Number of random opening moves of every game pair.
+        seed (int): Seed of the random openings.
+        verbose (bool): Whether to print the result of every game.
+        writer (Record_Writer): Stores the games if given.
+
+    Returns:
+        result (dict): Wins, losses and draws of the first player, its score
+                       rate and the average time per move of both players.
+
+    """
+
+    rand = random.Random(seed)
+    result = {"wins": 0, "losses": 0, "draws": 0, "discs": 0}
+
+    for game in range((games + 1) // 2):
+        opening = Random_Opening(plies, rand)
+        for black, white in [(first, second), (second, first)]:
+            current_table = [row[:] for row in opening[0]]
+            black_count, write_count = Play_Game(black, white,
+                                                 current_table, opening[1],
+                                                 writer)
+            diff = black_count - write_count
+            # running out of time loses the game, whatever the discs say
+            for player in (black, white):
+                if player.flagged():
+                    player.forfeits += 1
+            if black.flagged() != white.flagged():
+                diff = -64 if black.flagged() else 64
+            if black is second:
+                diff = -diff
+            if diff > 0:
+                result["wins"] += 1
+            elif diff < 0:
+                result["losses"] += 1
+            else:
+                result["draws"] += 1
+            result["discs"] += diff
+            if verbose:
+                print("%s (black) vs %s (write): %d-%d"
+                      % (black.spec, white.spec, black_count, write_count))
+
+    played = result["wins"] + result["losses"] + result["draws"]
+    result["score"] = (result["wins"] + 0.5 * result["draws"]) / played
+    result["first_ms"] = 1000.0 * first.elapsed / max(1, first.moves)
+    result["second_ms"] = 1000.0 * second.elapsed / max(1, second.moves)
+
+    return result
+
+
+def Print_Result(first, second, result):
+    # Print the summary of a match
+    print("%s vs %s: +%d -%d =%d, score %.1f%%, disc diff %+d"
+          % (first.spec, second.spec, result["wins"], result["losses"],
+             result["draws"], 100.0 * result["score"], result["discs"]))
+    print("average time per move: %s %.1f ms, %s %.1f ms"
+          % (first.spec, result["first_ms"], second.spec,
+             result["second_ms"]))
+    if first.clock_ms:
+        print("time forfeits: %s %d, %s %d"
+              % (first.spec, first.forfeits, second.spec, second.forfeits))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi engine tournament")
+    parser.add_argument("first", help="first player, e.g. mcts:ms=200")
+    parser.add_argument("second", help="second player, e.g. minmax:depth=3")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--plies", type=int, default=4,
+                        help="random opening moves of every game pair")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clock", type=float, default=0,
+                        help="game clock of every player in seconds")
+    parser.add_argument("--increment", type=float, default=0,
+                        help="seconds added to the clock after every move")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--record", help="append the games to a record file")
+    parser.add_argument("--stats", help="write the search statistics of every "
+                        "move to a JSON lines file")
+    parser.add_argument("--profile", help="profile the searches and save the "
+                        "pstats data to a file")
+    args = parser.parse_args()
+
+    clock_ms = int(1000 * args.clock)
+    increment_ms = int(1000 * args.increment)
+    first = Player(args.first, args.seed, clock_ms, increment_ms)
+    second = Player(args.second, args.seed + 1, clock_ms, increment_ms)
+    writer = None
+    if args.record:
+        writer = Record_Writer(args.record, flush_bytes=65536)
+    if args.stats or args.profile:
+        if args.stats:
+            PROBE.log = open(args.stats, "w")
+        Enable(profile=bool(args.profile))
+    try:
+        result = Run_Match(first, second, args.games, args.plies, args.seed,
+                           args.verbose, writer)
+    finally:
+        if writer is not None:
+            writer.close()
+        first.close()
+        second.close()
+        Disable()
+        if PROBE.log is not None:
+            PROBE.log.close()
+    Print_Result(first, second, result)
+    if PROBE.summary:
+        Print_Summary(PROBE.summary)
+    if args.profile:
+        Dump_Profile(args.profile)
+
+
+if __name__ == "__main__":
+    main()
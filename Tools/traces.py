@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+"""traces.py: Reversi Game Search Trace Tool.
+
+This program works on the search tree traces of "tracer.py":
+
+    run: search a position with a traced engine, e.g. the position saved in
+         Model/current.log after a strange AI move.
+    summary: count the searches, nodes, leaves and cutoffs of a trace, and
+             the nodes and the branching factor of every depth.
+    pv: print the principal variation of every search of a trace, i.e. the
+        moves both sides are expected to play.
+
+Example:
+    $ python Tools/traces.py run Model/current.log --output /tmp/search.trace
+    $ python Tools/traces.py summary /tmp/search.trace
+    $ python Tools/traces.py pv /tmp/search.trace
+
+"""
+
+from __future__ import print_function
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+import argparse
+import array
+import time
+from tournament import *
+from tracer import *
+
+
+def Move_Name(move):
+    # Name of the move of a trace record
+    if move == ROOT_MOVE:
+        return "root"
+    if move == PASS_MOVE:
+        return "pass"
+
+    return Location_Name(Location(move))
+
+
+def Run_Trace(args):
+    # Search one position with tracing on
+    current_table = Initial_Table()
+    side = 1
+    if args.position:
+        file = open(args.position, "r").readlines()
+        side = -1 if file[0].strip() == "W" else 1
+        Get_Current_Table(current_table, file[1:])
+
+    player = Player(args.engine)
+    if player.engine is not None:
+        raise SystemExit("only the Min_Max and Greedy searches are traced")
+
+    Start_Trace(args.output)
+    start = time.time()
+    try:
+        location = player.choose(current_table, side)
+    finally:
+        nodes = Stop_Trace()
+    print("%s plays %s, %d nodes traced in %.2f s"
+          % (args.engine, Location_Name(location), nodes,
+             time.time() - start))
+
+
+def Trace_Summary(args):
+    # Count the nodes of a trace by depth
+    searches = leaves = cutoffs = 0
+    nodes = {}  # nodes of every depth
+    inner = {}  # searched (not evaluated) nodes of every depth
+    scores = []
+
+    for node in Read_Trace(args.file):
+        nodes[node.depth] = nodes.get(node.depth, 0) + 1
+        if node.flags & LEAF:
+            leaves += 1
+        else:
+            inner[node.depth] = inner.get(node.depth, 0) + 1
+        if node.flags & CUTOFF:
+            cutoffs += 1
+        if node.parent == NO_NODE:
+            searches += 1
+            scores.append(node.score)
+
+    print("%d searches, %d nodes, %d leaves, %d cutoffs"
+          % (searches, sum(nodes.values()), leaves, cutoffs))
+    if scores:
+        print("root scores: min %d, max %d" % (min(scores), max(scores)))
+    for depth in sorted(nodes):
+        line = "depth %d: %d nodes" % (depth, nodes[depth])
+        if inner.get(depth) and depth + 1 in nodes:
+            line += ", branching %.2f" % (nodes[depth + 1] /
+                                          float(inner[depth]))
+        print(line)
+
+
+def Principal_Variations(path):
+    """Extract the principal variation of every search of a trace.
+
+    Only the best child, the move and the score of every node are kept, in
+    compact arrays indexed by the node number.
+
+    Args:
+        path (str): The trace file.
+
+    Returns:
+        variations (list): (root score, [(move, score), ...]) of every search.
+
+    """
+
+    best = array.array("L")
+    moves = bytearray()
+    scores = array.array("l")
+    roots = []
+
+    for node in Read_Trace(path):
+        if node.id >= len(best):
+            grow = node.id + 1 - len(best) + len(best) // 2
+            best.extend([NO_NODE] * grow)
+            moves.extend([ROOT_MOVE] * grow)
+            scores.extend([0] * grow)
+        best[node.id] = node.best
+        moves[node.id] = node.move
+        scores[node.id] = node.score
+        if node.parent == NO_NODE:
+            roots.append(node.id)
+
+    variations = []
+    for root in roots:
+        line = []
+        node = best[root]
+        while node != NO_NODE:
+            line.append((moves[node], scores[node]))
+            node = best[node]
+        variations.append((scores[root], line))
+
+    return variations
+
+
+def Print_Variations(args):
+    # Print the principal variation of every search
+    for index, (score, line) in enumerate(Principal_Variations(args.file)):
+        if args.search is not None and index != args.search:
+            continue
+        print("search %d: score %d, pv %s"
+              % (index, score, " ".join(Move_Name(move)
+                                        for move, _ in line) or "-"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reversi search traces")
+    commands = parser.add_subparsers(dest="command")
+
+    command = commands.add_parser("run", help="trace the search of a position")
+    command.add_argument("position", nargs="?",
+                         help="position in the log file format, the default "
+                         "start condition if omitted")
+    command.add_argument("--engine", default="minmax:depth=3")
+    command.add_argument("--output", default="search.trace",
+                         help="trace file, JSON lines if it ends with .jsonl")
+    command.set_defaults(run=Run_Trace)
+
+    command = commands.add_parser("summary", help="count the traced nodes")
+    command.add_argument("file")
+    command.set_defaults(run=Trace_Summary)
+
+    command = commands.add_parser("pv", help="principal variations")
+    command.add_argument("file")
+    command.add_argument("--search", type=int,
+                         help="only the search with this number")
+    command.set_defaults(run=Print_Variations)
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+    else:
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+"""spectator.py: Reversi Game Spectator View.
+
+This program shows many games at once in one window, e.g. the games of an
+engine match. The boards are tiled on a single canvas, and every board is
+updated from move events:
+
+    (board, black, write, side, status)
+
+where black and write are the bitboards of the pieces (bit x * 8 + y is the
+location (x, y)), side is the side to play (0 when the game is over) and
+status is the text shown above the board.
+
+The events are not drawn when they arrive. Only the last event of every
+board is kept, and a timer draws the kept events at most FPS times per
+second: the pieces that differ from the drawn ones are changed, all other
+canvas items are left alone, and Tk redraws the window once per frame. So
+the cost of a frame depends on the number of changed pieces, not on the
+number of boards or events.
+
+Example:
+    view = Spectator_View(64, poll=lambda: events, fps=30)
+    view.tk.mainloop()
+
+"""
+
+__author__ = "Tiansong Cui"
+__email__ = "tcui@usc.edu"
+
+try:
+    from Tkinter import *
+except ImportError:
+    from tkinter import *
+import math
+import time
+
+WINDOW_SIZE = 960  # largest width of the tiled boards in pixels
+MIN_SCALE = 6  # smallest side length of a square in pixels
+LABEL_HEIGHT = 16  # height of the status text above every board
+GAP = 8  # pixels between two boards
+
+PIECE_COLORS = {1: "black", -1: "white", 0: "green"}
+
+
+class Spectator_View:
+    """Tiled boards of many games in one window.
+
+    Attributes:
+        tk (Tkinter.Tk): The top level module of the view.
+        canvas (Tkinter.Canvas): The canvas of all boards.
+        boards (int): Number of boards.
+        scale (int): Side length of the square unit.
+        poll (function): Returns the list of the new events, called once per
+                         frame, None if the events are only pushed.
+        frame_ms (int): Shortest time between two frames in milliseconds.
+        piece_list (list): 64 piece IDs of every board, index x * 8 + y.
+        label_list (list): Status text ID of every board.
+        drawn (list): [black, write, side, status] shown on every board.
+        pending (dict): The last event of every board that changed since
+                        the last frame.
+        frames (int): Number of drawn frames.
+        changes (int): Number of changed pieces.
+        draw_time (float): Total time of the drawn frames in seconds.
+
+    """
+
+    def __init__(self, boards, poll=None, fps=30, scale=None,
+                 title="Reversi Spectator"):
+        """Create the window and the empty boards.
+
+        Args:
+            boards (int): Number of boards.
+            poll (function): Returns the list of the new events, called once
+                             per frame.
+            fps (int): Largest number of frames per second.
+            scale (int): Side length of the square unit, chosen to fit
+                         WINDOW_SIZE if None.
+            title (str): Title of the window.
+
+        """
+
+        self.boards = boards
+        self.poll = poll
+        self.frame_ms = max(1, 1000 // fps)
+        columns = int(math.ceil(math.sqrt(boards)))
+        rows = int(math.ceil(boards / float(columns)))
+        if scale is None:
+            scale = max(MIN_SCALE, (WINDOW_SIZE - GAP * columns)
+                        // (8 * columns))
+        self.scale = scale
+
+        self.tk = Tk()
+        self.tk.title(title)
+        self.tk.resizable(0, 0)
+        width = columns * (8 * scale + GAP)
+        height = rows * (8 * scale + GAP + LABEL_HEIGHT)
+        self.canvas = Canvas(self.tk, width=width, height=height, bd=0,
+                             highlightthickness=0)
+        self.canvas.pack()
+        self.canvas.bind_all("<Escape>", self.escape)
+
+        self.piece_list = []
+        self.label_list = []
+        self.drawn = []
+        for board in range(boards):
+            left = (board % columns) * (8 * scale + GAP) + GAP // 2
+            top = ((board // columns) * (8 * scale + GAP + LABEL_HEIGHT) +
+                   LABEL_HEIGHT)
+            self.label_list.append(self.canvas.create_text(
+                left, top - LABEL_HEIGHT // 2, anchor="w", text="",
+                font=("Helvetica", 9)))
+            self.canvas.create_rectangle(left, top, left + 8 * scale,
+                                         top + 8 * scale, fill="green")
+            for i in range(1, 8):
+                self.canvas.create_line(left + i * scale, top,
+                                        left + i * scale, top + 8 * scale)
+                self.canvas.create_line(left, top + i * scale,
+                                        left + 8 * scale, top + i * scale)
+            margin = max(1, scale // 8)
+            # x is the column and y the row, as in the game view
+            self.piece_list.append([self.canvas.create_oval(
+                left + x * scale + margin, top + y * scale + margin,
+                left + (x + 1) * scale - margin,
+                top + (y + 1) * scale - margin, fill="green",
+                outline="green") for x in range(8) for y in range(8)])
+            self.drawn.append([0, 0, 0, ""])
+
+        self.pending = {}
+        self.frames = 0
+        self.changes = 0
+        self.draw_time = 0.0
+        self.tk.after(self.frame_ms, self.frame)
+
+
+    def push(self, board, black, write, side, status):
+        # Keep the last event of a board until the next frame
+        self.pending[board] = (black, write, side, status)
+
+
+    def draw(self):
+        """Draw the kept events.
+
+        Returns:
+            changes (int): Number of pieces that changed.
+
+        """
+
+        changes = 0
+        for board, (black, write, side, status) in self.pending.items():
+            drawn = self.drawn[board]
+            pieces = self.piece_list[board]
+            changed = (black ^ drawn[0]) | (write ^ drawn[1])
+            while changed:
+                bit = changed & -changed
+                square = bit.bit_length() - 1
+                color = PIECE_COLORS[1 if black & bit else
+                                     -1 if write & bit else 0]
+                self.canvas.itemconfig(pieces[square], fill=color,
+                                       outline=color)
+                changed ^= bit
+                changes += 1
+            if status != drawn[3]:
+                self.canvas.itemconfig(self.label_list[board], text=status)
+            self.drawn[board] = [black, write, side, status]
+        self.pending.clear()
+
+        return changes
+
+
+    def frame(self):
+        # Take the new events and draw them, at most once per frame_ms
+        start = time.time()
+        if self.poll is not None:
+            for event in self.poll():
+                self.push(*event)
+        if self.pending:
+            self.changes += self.draw()
+            self.tk.update_idletasks()
+            self.frames += 1
+            self.draw_time += time.time() - start
+        elapsed = time.time() - start
+        self.tk.after(max(1, self.frame_ms - int(1000 * elapsed)),
+                      self.frame)
+
+
+    def escape(self, event):
+        # Close the window
+        self.tk.destroy()
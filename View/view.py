@@ -18,6 +18,8 @@ import sys
 sys.path.append("..")
 from Model.model import *
 
+HINT_POLL_MS = 100  # interval of the checks for new hint scores
+
 
 class Square:
     """View of the unit square in the board.
@@ -122,6 +124,8 @@ class Game_View:
         game_model (Game_Model): The corresponding game model.
         square_list (2D array): 8*8 squares showing the game board.
         piece_list (2D array): 8*8 pieces on the board.
+        hint_list (2D array): 8*8 texts of the hint scores, None if the
+                              hints are not added.
 
     """
 
@@ -157,6 +161,8 @@ class Game_View:
         self.canvas.bind_all("<KeyPress-Down>", self.move_down)
         self.canvas.bind_all("<space>", self.place)
         self.canvas.bind_all("<Escape>", self.escape)
+        self.canvas.bind_all("<KeyPress-u>", self.undo)
+        self.canvas.bind_all("<KeyPress-r>", self.redo)
         
         # Initialize the board using 8*8 squares
         self.square_list = [[Square(self.canvas, "green", i, j, scale)
@@ -165,10 +171,73 @@ class Game_View:
         # Initialize the 8*8 pieces on the board
         self.piece_list = [[Piece(self.canvas, "green", i, j, scale, size)
                             for j in range(8)] for i in range(8)]
+        self.scale = scale
+        self.hint_list = None
         
         self.tk.update_idletasks()
         self.tk.update()
 
+
+    def add_hints(self):
+        """Add the hint overlay, shown and hidden with <h>.
+
+        A text item on every square shows the score of the location, and a
+        timer asks the model for new scores while the game runs, so the
+        scores appear without a key press.
+
+        """
+
+        self.hint_list = [[self.canvas.create_text(
+                               (i + 0.5) * self.scale, (j + 0.5) * self.scale,
+                               text="", fill="yellow",
+                               font=("Helvetica", self.scale // 5, "bold"))
+                           for j in range(8)] for i in range(8)]
+        self.canvas.bind_all("<KeyPress-h>", self.toggle_hints)
+        self.tk.after(HINT_POLL_MS, self.poll_hints)
+
+
+    def show_hints(self, scores, depth=0):
+        """Show the hint scores on the board.
+
+        Args:
+            scores (list): (location, weight) of the scored locations, the
+                           best first, empty to hide the hints.
+            depth (int): Depth of the search of the scores.
+
+        """
+
+        if self.hint_list is None:
+            return
+
+        texts = {}
+        for location, weight in scores:
+            texts[location[0], location[1]] = "%+d" % weight
+        for i in range(8):
+            for j in range(8):
+                self.canvas.itemconfig(self.hint_list[i][j],
+                                       text=texts.get((i, j), ""),
+                                       fill="white")
+        if scores:
+            best = scores[0][0]
+            self.canvas.itemconfig(self.hint_list[best[0]][best[1]],
+                                   fill="yellow")
+            self.tk.title("Reversi Game - hints of depth %d" % depth)
+        else:
+            self.tk.title("Reversi Game")
+
+
+    def poll_hints(self):
+        # Show the new hint scores and check again later
+        if self.game_model.escape_flag:
+            return
+        self.game_model.poll_hints()
+        self.tk.after(HINT_POLL_MS, self.poll_hints)
+
+
+    def toggle_hints(self, evt):
+        # Show or hide the hints when the player presses <h>
+        self.game_model.toggle_hints()
+
         
     def update(self, side, location, current_table, available_table):
         """Updates the game view given the game model.
@@ -250,6 +319,134 @@ class Game_View:
         self.game_model.escape()
 
 
+    def undo(self, evt):
+        # Take back the last move when the player presses <u>
+        self.game_model.undo()
+
+
+    def redo(self, evt):
+        # Play the taken back move again when the player presses <r>
+        self.game_model.redo()
+
+
+class Replay_View(Game_View):
+    """User interface of the replay mode.
+
+    This class shows a recorded game on the same board as Game_View. Below
+    the board, a slider selects the move to show. Only the squares that
+    differ from the shown position are redrawn, so moving the slider stays
+    smooth for long games.
+
+    Key-press events handled by the replay model:
+    |      key       |              action               |
+    | <left>/<right> |    one move backward / forward    |
+    |   <up>/<down>  |  several moves backward / forward |
+    |  <Home>/<End>  |   first move / end of the game    |
+    |  <PgUp>/<PgDn> |      previous / next game         |
+
+    Attributes:
+        slider (Tkinter.Scale): Selects the move to show.
+        black (int): Bitboard of the shown black pieces.
+        write (int): Bitboard of the shown write pieces.
+        last_move (int): Bit index of the highlighted move, -1 if none.
+
+    """
+
+    def __init__(self, replay_model, scale, size):
+        """Initialize the replay view.
+
+        Args:
+            replay_model (Replay_Model): Model of the replay mode.
+            scale (int): Side length of the square unit.
+            size (int): Diameter of the piece unit in the game.
+
+        """
+
+        Game_View.__init__(self, replay_model, scale, size)
+        self.tk.title("Reversi Game Replay")
+
+        self.slider = Scale(self.tk, from_=0, to=0, orient=HORIZONTAL,
+                            length=8*scale, command=self.scrub)
+        self.slider.pack()
+
+        self.canvas.bind_all("<Home>", self.first)
+        self.canvas.bind_all("<End>", self.last)
+        self.canvas.bind_all("<Prior>", self.previous_game)
+        self.canvas.bind_all("<Next>", self.next_game)
+
+        self.black = 0
+        self.write = 0
+        self.last_move = -1
+
+
+    def set_game(self, title, length):
+        # Show the title of a new game and the number of its moves
+        self.tk.title(title)
+        self.slider.config(to=length)
+
+
+    def update_cells(self, black, write, ply, last_move):
+        """Redraw the squares that differ from the shown position.
+
+        Args:
+            black (int): Bitboard of the black pieces.
+            write (int): Bitboard of the write pieces.
+            ply (int): Number of the shown move, for the slider.
+            last_move (int): Bit index of the move to highlight, -1 if none.
+
+        """
+
+        changes = (black ^ self.black) | (write ^ self.write)
+        if self.last_move >= 0:
+            changes |= 1 << self.last_move
+        if last_move >= 0:
+            changes |= 1 << last_move
+
+        while changes:
+            bit = changes & -changes
+            square = bit.bit_length() - 1
+            piece = self.piece_list[square // 8][square % 8]
+            if black & bit:
+                color = "black"
+            elif write & bit:
+                color = "white"
+            else:
+                color = "green"
+            piece.config(color, "red" if square == last_move else color)
+            changes ^= bit
+
+        self.black = black
+        self.write = write
+        self.last_move = last_move
+        if self.slider.get() != ply:
+            self.slider.set(ply)
+
+
+    def scrub(self, value):
+        # Show the move selected by the slider
+        self.game_model.seek(int(value))
+
+
+    def first(self, evt):
+        # Show the start of the game when the player presses <Home>
+        self.game_model.seek(0)
+
+
+    def last(self, evt):
+        # Show the end of the game when the player presses <End>
+        self.game_model.seek(len(self.game_model.moves))
+
+
+    def previous_game(self, evt):
+        # Show the previous game when the player presses <PgUp>
+        self.game_model.load_game(self.game_model.game_index - 1)
+
+
+    def next_game(self, evt):
+        # Show the next game when the player presses <PgDn>
+        self.game_model.load_game(self.game_model.game_index + 1)
+
+
 class Pre_Game_View:
     """User interface of the pre-game selection window.
 
@@ -265,6 +462,7 @@ class Pre_Game_View:
         music (BooleanVar): Whether to play music during the game.
         mode (IntVar): 1 if the player chooses to play with an easy AI;
                        2 if the player chooses to play with a hard AI;
+                       3 if the player chooses to play with a MCTS AI;
                        0 if the player chooses to play with another player.
         AI_side (IntVar): 1 if AI plays black; -1 if AI plays write.                     
 
@@ -342,8 +540,9 @@ class Pre_Game_View:
         """A radiobutton that selects the mode of the game.
         
         The mode variable is set as 1 if the player chooses to play with an
-        easy AI, 2 if the player chooses to play with a hard AI, and 0 if the
-        player chooses to play with another player.
+        easy AI, 2 if the player chooses to play with a hard AI, 3 if the
+        player chooses to play with a MCTS AI, and 0 if the player chooses to
+        play with another player.
         
         """
         
@@ -356,13 +555,17 @@ class Pre_Game_View:
         button2 = Radiobutton(self.tk, text="One Player Game - Hard",
                               variable=self.mode, value=2,
                               height=2, width = 30)
-        button3 = Radiobutton(self.tk, text="Two Player Game",
+        button3 = Radiobutton(self.tk, text="One Player Game - MCTS",
+                              variable=self.mode, value=3,
+                              height=2, width = 30)
+        button4 = Radiobutton(self.tk, text="Two Player Game",
                               variable=self.mode, value=0,
                               height=2, width = 30)
         
         button1.pack()
         button2.pack()
         button3.pack()
+        button4.pack()
     
     
     def add_AI_side_selection(self):
@@ -7,8 +7,12 @@ model. After the user makes a section, it initializes a game for the user to
 play. When the game ends or the user presses the "ESC" button, the program
 exits.
 
+With the "--replay" option, it shows the games of a record file instead (by
+default Model/games.rec), starting from the given game number.
+
 Example:
     $ python main.py
+    $ python main.py --replay Model/games.rec 1
         
 """
 
@@ -22,6 +26,27 @@ import time
 SCALE = 65  # side length of the square unit in the game
 SIZE = 55  # diameter of the piece unit in the game
 
+# replay the recorded games instead of playing
+if len(sys.argv) > 1 and sys.argv[1] == "--replay":
+    file_name = sys.argv[2] if len(sys.argv) > 2 else RECORD_FILE
+    try:
+        game_index = int(sys.argv[3]) - 1 if len(sys.argv) > 3 else 0
+        replay = Replay_Model(SCALE, SIZE, file_name, game_index)
+    except (IOError, ValueError) as error:
+        sys.exit("cannot replay %s: %s" % (file_name, error))
+    
+    # the requested game is not in the record file
+    if replay.escape_flag:
+        replay.game_view.tk.destroy()
+        sys.exit("%s has no game %d" % (file_name, game_index + 1))
+    
+    while replay.escape_flag == False:
+        replay.game_view.tk.update_idletasks()
+        replay.game_view.tk.update()
+        time.sleep(0.01)
+    
+    sys.exit()
+
 # start the pre_game model
 pre_game = Pre_Game_Model()
 